@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Shared arXiv API client with a persistent on-disk response cache.
+
+- One pooled requests.Session for every query.
+- Responses are cached under `cache_dir` keyed by the full query. A cached
+  response younger than `ttl` is served without any network call; an older
+  one is revalidated with If-None-Match / If-Modified-Since, and a 304 just
+  refreshes it.
+- The cache is bounded by `max_bytes`; least recently used responses are
+  evicted first.
+- Network requests are spaced at least `min_interval` seconds apart per host
+  (arXiv asks API clients for no more than one request every 3 seconds),
+  across every thread sharing the client. Cache hits are not limited.
+- With `replay=True` the client never touches the network and answers only
+  from the cache (regardless of age), so engines can run offline / in tests.
+- get()/search() return the whole document; stream()/search_entries() feed
+  the response to the Atom pull parser chunk by chunk as it arrives and write
+  the cache copy on the way, so the body is never held in memory as a whole.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+from atom_feed import CHUNK, parse_feed
+
+ARXIV_API = "https://export.arxiv.org/api/query"
+DEFAULT_CACHE_DIR = ".arxiv_cache"
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MIN_INTERVAL = 3.0
+
+
+class HostRateLimiter:
+    """Spaces calls to each host at least `min_interval` seconds apart (thread-safe)."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ArxivClient:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 replay=False, timeout=10, session=None, min_interval=DEFAULT_MIN_INTERVAL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", "InfinityResearchBot/2.0")
+        self.limiter = HostRateLimiter(min_interval)
+        self.stats = {"fresh": 0, "revalidated": 0, "fetched": 0, "misses": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    # --- CACHE INDEX ---
+
+    def _load_index(self):
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Drop entries whose body file has gone missing
+        return {k: v for k, v in index.items() if os.path.exists(self._body_path(k))}
+
+    def _save_index(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key + ".xml")
+
+    @staticmethod
+    def cache_key(params):
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def _store(self, key, params, text, headers):
+        body = text.encode("utf-8")
+        tmp = self._body_path(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        self._commit(key, params, tmp, len(body), headers)
+
+    def _commit(self, key, params, tmp, size, headers):
+        """Moves a complete body from `tmp` into the cache and indexes it (lock held)."""
+        os.replace(tmp, self._body_path(key))
+        now = time.time()
+        self._index[key] = {
+            "params": params,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched": now,
+            "accessed": now,
+            "size": size,
+        }
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        """Removes least recently accessed responses until the cache fits `max_bytes`."""
+        total = sum(e["size"] for e in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1]["accessed"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            del self._index[key]
+
+    def _read(self, key):
+        """Cached body, or None if it was evicted (by another thread or process) since the lookup (lock held)."""
+        f = self._open(key)
+        if f is None:
+            return None
+        with f:
+            return f.read().decode("utf-8")
+
+    def _open(self, key):
+        """Binary file object for a cached body, or None (dropped from the index) if it is gone (lock held)."""
+        try:
+            return open(self._body_path(key), "rb")
+        except FileNotFoundError:
+            self._index.pop(key, None)
+            return None
+
+    @staticmethod
+    def _chunks(f):
+        # An open file survives a later eviction, so this needs no lock
+        with f:
+            while True:
+                chunk = f.read(CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+
+    # --- QUERIES ---
+
+    def _lookup(self, key):
+        """
+        ("cached", None) if the cached copy can be served as is, ("miss", None)
+        if it cannot be served at all (replay), else ("fetch", entry to
+        revalidate or None). Lock held.
+        """
+        entry = self._index.get(key)
+        if entry and (self.replay or time.time() - entry["fetched"] < self.ttl):
+            entry["accessed"] = time.time()
+            self.stats["fresh"] += 1
+            return "cached", None
+        if self.replay:
+            self.stats["misses"] += 1
+            return "miss", None
+        return "fetch", dict(entry) if entry else None
+
+    def _request(self, params, entry, stream=False):
+        """Conditional GET for `params` (lock not held); None on a connection error."""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        self.limiter.wait(urlsplit(ARXIV_API).netloc)
+        try:
+            return self.session.get(ARXIV_API, params=params, headers=headers, timeout=self.timeout, stream=stream)
+        except requests.exceptions.RequestException:
+            return None
+
+    def _settle(self, key, entry, r):
+        """
+        Handles a 304 or a failed request (lock held): True if the cached copy
+        should be served, False if nothing can be, None if `r` has a new body.
+        """
+        cached = bool(entry) and key in self._index
+        if r is not None and r.status_code == 304:
+            if cached:
+                self._index[key]["fetched"] = self._index[key]["accessed"] = time.time()
+                self._save_index()
+                self.stats["revalidated"] += 1
+            # If the body was evicted meanwhile the caller's read misses and it refetches
+            return True
+        if r is None or not r.ok:
+            self.stats["errors"] += 1
+            # Serve a stale copy rather than nothing when arXiv is unavailable
+            return cached
+        return None
+
+    def get(self, params):
+        """Returns the Atom XML for an arXiv API query (dict of params), or None."""
+        key = self.cache_key(params)
+        with self._lock:
+            action, entry = self._lookup(key)
+            if action == "cached":
+                text = self._read(key)
+                if text is not None:
+                    return text
+                self.stats["fresh"] -= 1
+                action, entry = self._lookup(key)  # evicted: now a miss
+            if action == "miss":
+                return None
+
+        while True:
+            # The network call runs without the lock so several threads can fetch at once
+            r = self._request(params, entry)
+            with self._lock:
+                served = self._settle(key, entry, r)
+                if served is None:
+                    self._store(key, params, r.text, r.headers)
+                    self.stats["fetched"] += 1
+                    return r.text
+                if not served:
+                    return None
+                text = self._read(key)
+                if text is not None:
+                    return text
+            entry = None  # revalidated a body evicted meanwhile: fetch it unconditionally
+
+    def stream(self, params):
+        """
+        Yields the Atom XML for a query as byte chunks, for atom_feed.iter_entries.
+        A fetched response is passed on as it arrives and written to the cache
+        on the way (committed only once complete, so a dropped connection or a
+        consumer that stops early leaves the cache as it was); cached copies
+        are read from disk in chunks. Yields nothing if the query is unavailable.
+        """
+        key = self.cache_key(params)
+        with self._lock:
+            action, entry = self._lookup(key)
+            f = self._open(key) if action == "cached" else None
+            if action == "cached" and f is None:
+                self.stats["fresh"] -= 1
+                action, entry = self._lookup(key)  # evicted: now a miss
+        if f is not None:
+            yield from self._chunks(f)
+            return
+        if action == "miss":
+            return
+
+        while True:
+            r = self._request(params, entry, stream=True)
+            with self._lock:
+                served = self._settle(key, entry, r)
+                f = self._open(key) if served else None
+            if served is None:
+                break
+            if r is not None:
+                r.close()
+            if f is not None:
+                yield from self._chunks(f)
+                return
+            if not served:
+                return
+            entry = None  # revalidated a body evicted meanwhile: fetch it unconditionally
+
+        tmp = f"{self._body_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        size = 0
+        complete = False
+        try:
+            with r, open(tmp, "wb") as f:
+                for chunk in r.iter_content(CHUNK):
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self.stats["errors"] += 1
+        finally:
+            if complete:
+                with self._lock:
+                    self._commit(key, params, tmp, size, r.headers)
+                    self.stats["fetched"] += 1
+            else:
+                try:
+                    os.remove(tmp)
+                except FileNotFoundError:
+                    pass
+
+    def search(self, term, max_results=3, start=0):
+        """Atom XML for an `all:` search on `term`."""
+        return self.get(self._search_params(term, max_results, start))
+
+    def search_entries(self, term, max_results=3, start=0):
+        """Parsed AtomEntry list for an `all:` search on `term`, parsed while the response streams in."""
+        return parse_feed(self.stream(self._search_params(term, max_results, start)))
+
+    @staticmethod
+    def _search_params(term, max_results, start):
+        return {"search_query": f"all:{term}", "start": start, "max_results": max_results}
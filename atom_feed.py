@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Streaming Atom feed parser for arXiv API responses.
+
+Entries are parsed incrementally with an XMLPullParser and discarded as soon
+as they have been turned into an AtomEntry, so memory stays flat no matter
+how many results a feed holds. Input may be a str/bytes document, a binary
+file object, or an iterable of byte chunks (e.g. Response.iter_content()).
+
+The trade is CPU for memory and latency: on a complete document already in
+memory the pull parser is slower than the legacy regex/split extraction (see
+--bench), but it builds real entries (authors, categories, entities decoded),
+needs no copy of the whole body and can start on the first chunk of a
+response while the rest is still arriving (ArxivClient.stream()).
+
+  python atom_feed.py --bench                   # synthetic 10/100/500-entry feeds
+  python atom_feed.py --bench .arxiv_cache/*.xml  # recorded responses
+"""
+import io
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+from typing import NamedTuple, Tuple
+from xml.etree.ElementTree import XMLPullParser
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+CHUNK = 64 * 1024
+
+
+class AtomEntry(NamedTuple):
+    id: str
+    title: str
+    summary: str
+    authors: Tuple[str, ...]
+    categories: Tuple[str, ...]
+    published: str
+    updated: str
+    primary_category: str = ""
+
+    @property
+    def text(self):
+        """Title and summary together, for keyword matching."""
+        return f"{self.title} {self.summary}"
+
+
+def _squash(s):
+    return " ".join(s.split()) if s else ""
+
+
+def _entry(el):
+    find = lambda tag: _squash(el.findtext(ATOM + tag))
+    primary = el.find(ARXIV + "primary_category")
+    return AtomEntry(
+        id=find("id"),
+        title=find("title"),
+        summary=find("summary"),
+        authors=tuple(_squash(a.findtext(ATOM + "name")) for a in el.findall(ATOM + "author")),
+        categories=tuple(c.get("term", "") for c in el.findall(ATOM + "category")),
+        published=find("published"),
+        updated=find("updated"),
+        primary_category=primary.get("term", "") if primary is not None else "",
+    )
+
+
+def _chunks(source):
+    if source is None:
+        return
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, (bytes, bytearray)):
+        for i in range(0, len(source), CHUNK):
+            yield source[i:i + CHUNK]
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(CHUNK)
+            if not chunk:
+                return
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+    else:
+        for chunk in source:
+            yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def iter_entries(source, limit=None):
+    """
+    Yields an AtomEntry per <entry> in `source`, stopping after `limit`. A
+    malformed or truncated document yields the entries parsed before the error.
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    count = 0
+    try:
+        for chunk in _chunks(source):
+            parser.feed(chunk)
+            for event, el in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = el
+                    continue
+                if el.tag != ATOM + "entry":
+                    continue
+                yield _entry(el)
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+                # Entries are direct children of <feed>: drop them once parsed
+                try:
+                    root.remove(el)
+                except ValueError:
+                    pass
+    except SyntaxError:  # xml.etree.ElementTree.ParseError
+        return
+
+
+def parse_feed(source, limit=None):
+    """List of AtomEntry from `source` (see iter_entries)."""
+    return list(iter_entries(source, limit))
+
+
+# --- BENCHMARK ---
+
+def legacy_split(t):
+    """cart6000's original str.split extraction, applied to every entry."""
+    out = []
+    parts = t.split("<title>")[2:]
+    summaries = t.split("<summary>")[1:]
+    for title, summary in zip(parts, summaries):
+        out.append((title.split("</title>")[0].strip(), summary.split("</summary>")[0].strip()))
+    return out
+
+
+def legacy_regex(t):
+    """cart889's original per-entry regex extraction."""
+    out = []
+    for e in re.split(r"<entry>", t)[1:]:
+        title = re.search(r"<title>(.*?)</title>", e, re.S)
+        summ = re.search(r"<summary>(.*?)</summary>", e, re.S)
+        out.append((title.group(1) if title else "", summ.group(1) if summ else ""))
+    return out
+
+
+def synthetic_feed(n):
+    """An arXiv-shaped Atom feed with `n` entries."""
+    words = "hydrogen plasma quantum magnetic frequency lattice gradient charge ion resonance transport".split()
+    entries = []
+    for i in range(n):
+        summary = " ".join(words[(i + k) % len(words)] for k in range(180))
+        entries.append(f"""  <entry>
+    <id>http://arxiv.org/abs/2401.{i:05d}v1</id>
+    <updated>2024-01-{i % 28 + 1:02d}T00:00:00Z</updated>
+    <published>2024-01-{i % 28 + 1:02d}T00:00:00Z</published>
+    <title>On {words[i % len(words)]} effects in
+      system {i}</title>
+    <summary>  {summary}
+    </summary>
+    <author><name>Author {i} A</name></author>
+    <author><name>Author {i} B</name></author>
+    <arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="cond-mat.supr-con" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cond-mat.supr-con" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="quant-ph" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+""")
+    return (f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <link href="http://arxiv.org/api/query" rel="self" type="application/atom+xml"/>
+  <title type="html">ArXiv Query: search_query=all:bench&amp;id_list=&amp;start=0&amp;max_results={n}</title>
+  <id>http://arxiv.org/api/bench</id>
+  <updated>2024-01-01T00:00:00-05:00</updated>
+""" + "".join(entries) + "</feed>\n")
+
+
+def measure(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return n, best, peak
+
+
+def bench(fixtures, repeat):
+    print(f"{'fixture':>24} {'KiB':>7} {'method':>10} {'entries':>8} {'ms':>8} {'peak KiB':>9}")
+    for name, text in fixtures:
+        data = text.encode("utf-8")
+        methods = [
+            ("split", lambda t: len(legacy_split(t)), text),
+            ("regex", lambda t: len(legacy_regex(t)), text),
+            ("list", lambda d: len(parse_feed(d)), data),
+            # streamed from a file object, nothing retained: flat memory
+            ("stream", lambda d: sum(1 for _ in iter_entries(io.BytesIO(d))), data),
+        ]
+        for label, fn, arg in methods:
+            n, secs, peak = measure(fn, arg, repeat)
+            print(f"{name[-24:]:>24} {len(data) / 1024:>7.0f} {label:>10} {n:>8} {secs * 1000:>8.2f} {peak / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming Atom parser for arXiv feeds")
+    parser.add_argument("files", nargs="*", help="feed file(s) to parse")
+    parser.add_argument("--bench", action="store_true", help="compare with the legacy split/regex extraction")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.bench:
+        if args.files:
+            fixtures = [(p, open(p, encoding="utf-8").read()) for p in args.files]
+        else:
+            fixtures = [(f"synthetic-{n}", synthetic_feed(n)) for n in (10, 100, 500)]
+        bench(fixtures, args.repeat)
+        sys.exit(0)
+
+    for path in args.files:
+        with open(path, "rb") as f:
+            for entry in iter_entries(f):
+                print(f"{entry.id}  {entry.title}  [{', '.join(entry.categories)}]")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Incremental batch archiving of a directory tree (cart889's RAW_DIR).
+
+Each batch archive holds only the files that are new or changed since the
+previous batch, instead of re-zipping the whole ever-growing directory. What
+has been archived is tracked in a JSON-lines manifest next to the archives
+(one line per batch: archive name plus {path: [size, mtime_ns]}), replayed on
+startup.
+
+Files are streamed into the archive in chunks (never read whole into memory),
+written to a temp file and renamed into place; the manifest line is appended
+only after that, so a crash mid-batch just repeats the batch. Files that are
+already compressed (.gz, .zip, ...) are stored rather than deflated again.
+With `zstd=True` and the `zstandard` package installed, batches are written as
+.tar.zst instead of .zip.
+
+submit() runs a batch on a background thread so the caller keeps working; a
+batch requested while one is running is skipped (its files simply go into the
+next batch).
+
+  python batch_archiver.py --bench 3000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tarfile
+import zipfile
+import argparse
+import tempfile
+import threading
+
+try:
+    import zstandard
+except ImportError:  # optional: .zip only
+    zstandard = None
+
+PRECOMPRESSED = (".gz", ".zst", ".zip", ".png", ".jpg", ".jpeg")
+SKIP_SUFFIXES = (".tmp", ".lock")
+
+
+class BatchArchiver:
+    def __init__(self, src_dir, out_dir, compresslevel=1, zstd=False, zstd_level=3, log=print):
+        self.src_dir = src_dir
+        self.out_dir = out_dir
+        self.compresslevel = compresslevel
+        self.zstd = zstd and zstandard is not None
+        self.zstd_level = zstd_level
+        self.log = log
+        self.manifest_path = os.path.join(out_dir, "archive_manifest.jsonl")
+        self._archived = {}       # relpath -> [size, mtime_ns] as of its last batch
+        self.last_batch = 0       # highest batch number in the manifest
+        self._thread = None
+        self._lock = threading.Lock()
+        self.last_result = None
+        if zstd and zstandard is None:
+            log("[archive] zstandard not installed; writing .zip batches")
+        os.makedirs(out_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self._archived.update(record["files"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # torn final line: that batch is redone
+                if isinstance(record.get("batch"), int):
+                    self.last_batch = max(self.last_batch, record["batch"])
+
+    def pending(self):
+        """{relpath: [size, mtime_ns]} for files new or changed since their last batch."""
+        out = {}
+        out_dir = os.path.abspath(self.out_dir)
+        for dirpath, dirnames, files in os.walk(self.src_dir):
+            if os.path.abspath(dirpath) == out_dir:
+                dirnames[:] = []
+                continue
+            for name in files:
+                if name.endswith(SKIP_SUFFIXES) or name.startswith("."):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                rel = os.path.relpath(path, self.src_dir)
+                sig = [st.st_size, st.st_mtime_ns]
+                if self._archived.get(rel) != sig:
+                    out[rel] = sig
+        return out
+
+    def _write_zip(self, tmp, files):
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, compresslevel=self.compresslevel) as zf:
+            for rel in sorted(files):
+                path = os.path.join(self.src_dir, rel)
+                method = zipfile.ZIP_STORED if rel.endswith(PRECOMPRESSED) else zipfile.ZIP_DEFLATED
+                try:
+                    zf.write(path, rel, compress_type=method)
+                except FileNotFoundError:
+                    files.pop(rel)  # deleted (e.g. by gc) since the scan
+
+    def _write_tar_zst(self, tmp, files):
+        cctx = zstandard.ZstdCompressor(level=self.zstd_level)
+        with open(tmp, "wb") as raw, cctx.stream_writer(raw) as zf, tarfile.open(fileobj=zf, mode="w|") as tar:
+            for rel in sorted(files):
+                try:
+                    tar.add(os.path.join(self.src_dir, rel), arcname=rel, recursive=False)
+                except FileNotFoundError:
+                    files.pop(rel)
+
+    def archive(self, batch):
+        """Writes batch `batch` with every pending file; returns a result dict."""
+        start = time.perf_counter()
+        files = self.pending()
+        if not files:
+            return {"batch": batch, "archive": None, "files": 0, "bytes": 0, "seconds": 0.0}
+        name = f"batch_{batch:05}" + (".tar.zst" if self.zstd else ".zip")
+        path = os.path.join(self.out_dir, name)
+        tmp = path + ".tmp"
+        (self._write_tar_zst if self.zstd else self._write_zip)(tmp, files)
+        os.replace(tmp, path)
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"batch": batch, "archive": name, "time": time.time(), "files": files}) + "\n")
+        self._archived.update(files)
+        self.last_batch = max(self.last_batch, batch)
+        return {"batch": batch, "archive": name, "files": len(files), "bytes": os.path.getsize(path),
+                "seconds": time.perf_counter() - start}
+
+    def submit(self, batch, after=None):
+        """
+        Archives `batch` on a background thread, then calls `after(result)`.
+        Returns False (and does nothing) if a batch is still running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+
+            def run():
+                try:
+                    result = self.archive(batch)
+                except Exception as e:
+                    self.log(f"[archive] batch {batch} failed: {e}")
+                    return
+                self.last_result = result
+                self.log(f"[archive] batch {batch}: {result['files']} files → {result['archive']} "
+                         f"({result['bytes'] / 2**20:.2f} MiB, {result['seconds']:.1f}s)")
+                if after:
+                    after(result)
+
+            self._thread = threading.Thread(target=run, name=f"archive-{batch}", daemon=True)
+            self._thread.start()
+            return True
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+# --- BENCHMARK ---
+
+def full_zip(src, dest):
+    """What `zip -qr dest src` did: the whole tree, every time."""
+    with zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+        for dirpath, _, files in os.walk(src):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                zf.write(path, os.path.relpath(path, src))
+
+
+def bench(per_batch, batches, zstd):
+    tmp = tempfile.mkdtemp(prefix="archiver-bench-")
+    try:
+        src = os.path.join(tmp, "raw")
+        os.makedirs(src)
+        archiver = BatchArchiver(src, os.path.join(tmp, "zips"), zstd=zstd, log=lambda m: None)
+        print(f"{'batch':>5} {'files in dir':>12} {'full MiB':>9} {'full s':>7} {'incr files':>10} {'incr MiB':>9} {'incr s':>7}")
+        n = 0
+        for b in range(batches):
+            for _ in range(per_batch):
+                with open(os.path.join(src, f"h{n:08d}.json"), "w") as f:
+                    json.dump({"term": f"term {n % 8}", "extract": "hydrogen quantum lattice " * 200, "n": n}, f)
+                n += 1
+            start = time.perf_counter()
+            full_zip(src, os.path.join(tmp, "full.zip"))
+            full_secs = time.perf_counter() - start
+            full_size = os.path.getsize(os.path.join(tmp, "full.zip"))
+            r = archiver.archive(b)
+            print(f"{b:>5} {n:>12} {full_size / 2**20:>9.2f} {full_secs:>7.2f} {r['files']:>10} "
+                  f"{r['bytes'] / 2**20:>9.2f} {r['seconds']:>7.2f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental batch archiver")
+    parser.add_argument("src", nargs="?", help="directory to archive")
+    parser.add_argument("out", nargs="?", help="directory for batch archives and the manifest")
+    parser.add_argument("--batch", type=int, help="batch number to write")
+    parser.add_argument("--level", type=int, default=1, help="deflate level (1 = fastest)")
+    parser.add_argument("--zstd", action="store_true", help="write .tar.zst batches (needs zstandard)")
+    parser.add_argument("--bench", type=int, metavar="FILES", help="files added per batch in the benchmark")
+    parser.add_argument("--batches", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, args.batches, args.zstd)
+    elif args.src and args.out and args.batch is not None:
+        print(json.dumps(BatchArchiver(args.src, args.out, args.level, args.zstd).archive(args.batch)))
+    else:
+        parser.print_help()
+        sys.exit(1)
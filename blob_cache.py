@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of the last known GitHub blob SHA per (owner, repo, path).
+
+Each entry stores the remote blob SHA and the git blob hash of the content we
+last sent. Committing identical content can then be skipped without a network
+call, and changed content can be PUT straight away with the cached SHA instead
+of GETting it first.
+
+The cache is persisted as a JSON-lines journal (one line per update), replayed
+on startup and compacted once it holds many superseded lines. It assumes a
+single writer at a time (server.py only commits from the commit queue's owner
+process, which reload()s the cache when it takes over).
+"""
+import os
+import json
+import hashlib
+import threading
+
+
+def git_blob_sha(data):
+    """SHA-1 of `data` (bytes) as git hashes a blob object."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class BlobShaCache:
+    """Thread-safe (owner, repo, path) -> {"sha", "content_sha"} cache with hit/miss counters."""
+
+    def __init__(self, path, compact_ratio=2):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._journal_lines = 0
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0, "conflicts": 0}
+        self._load()
+
+    def reload(self):
+        """Re-reads the journal, picking up updates written by another process."""
+        with self._lock:
+            self._entries = {}
+            self._journal_lines = 0
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    key = tuple(record['key'])
+                except (ValueError, KeyError, TypeError):
+                    # A torn final line from a crash mid-write is skipped
+                    continue
+                self._journal_lines += 1
+                if record.get('sha') is None:
+                    self._entries.pop(key, None)
+                else:
+                    self._entries[key] = {"sha": record['sha'], "content_sha": record.get('content_sha')}
+
+    def _write(self, key, entry):
+        record = {"key": list(key)}
+        record.update(entry or {"sha": None})
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        self._journal_lines += 1
+        if self._journal_lines > self.compact_ratio * max(len(self._entries), 1000):
+            self._compact()
+
+    def _compact(self):
+        """Rewrites the journal with one line per live entry (temp file + rename)."""
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for key, entry in self._entries.items():
+                f.write(json.dumps(dict(key=list(key), **entry)) + '\n')
+        os.replace(tmp, self.path)
+        self._journal_lines = len(self._entries)
+
+    # --- API ---
+
+    def lookup(self, key):
+        """Returns the cached entry for `key` (or None), counting a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            self.stats["hits" if entry else "misses"] += 1
+            return dict(entry) if entry else None
+
+    def peek(self, key):
+        """Returns the cached entry for `key` without touching the counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry else None
+
+    def put(self, key, sha, content_sha):
+        with self._lock:
+            entry = {"sha": sha, "content_sha": content_sha}
+            if self._entries.get(key) == entry:
+                return
+            self._entries[key] = entry
+            self._write(key, entry)
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._write(key, None)
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def is_unchanged(self, key, content_sha):
+        """True if `content_sha` is what we last committed and GitHub still reports it."""
+        entry = self.peek(key)
+        return bool(entry) and entry['sha'] == content_sha and entry['content_sha'] == content_sha
+
+    def snapshot(self):
+        """Counters plus the number of cached paths, for /api/status."""
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries))
@@ -1,22 +1,34 @@
 #!/usr/bin/env python3
-import os, time, json, hashlib, subprocess, requests
-from datetime import datetime, UTC
+import os, time, argparse, itertools, collections
+from arxiv_client import ArxivClient
+from term_ledger import TermLedger
+from term_scheduler import TermScheduler, load_seeds
+from pipeline import Pipeline, Stage
+from git_publisher import GitPublisher
+from paper_render import paper_meta, render_plain
 
 OUTPUT_DIR = "infinity_research"
-LEDGER = "deep_terms.json"
+LEDGER = "deep_terms.ledger"        # append-only, one term per line
+LEGACY_LEDGER = "deep_terms.json"   # imported once when LEDGER is created
+TERM_QUEUE = "term_queue.jsonl"     # candidate terms with use counts and cached expansions
+TOPIC_MATRIX = "CART250_TOPIC_MATRIX.json"
 REPO_URL = "https://github.com/pewpi-infinity/mongoose.os.git"
 INTERVAL = 120  # full paper every 2 minutes
+ARXIV_RESULTS = 3  # one query per term serves both the paper and its expansion
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# shared arXiv fetch layer: pooled session + on-disk cache (see arxiv_client.py)
+ARXIV = ArxivClient(cache_dir=os.environ.get("ARXIV_CACHE_DIR", ".arxiv_cache"))
+
+# batched publishing: stage only written papers, commit per batch, push at most every PUSH_INTERVAL
+PUBLISHER = GitPublisher(".", REPO_URL, "main", batch_size=20, batch_window=600, push_interval=900)
+
 # Colors
 P="\033[95m"; G="\033[92m"; Y="\033[93m"; B="\033[94m"; C="\033[96m"; W="\033[0m"
 
-# load ledger
-if os.path.exists(LEDGER):
-    USED=set(json.load(open(LEDGER)))
-else:
-    USED=set()
+# load ledger (shared safely with other engines running in this directory)
+USED=TermLedger(LEDGER, legacy_json=LEGACY_LEDGER)
 
 # base themes
 THEMES = [
@@ -32,136 +44,64 @@ THEMES = [
     "cellular energy gradients",
 ]
 
-def expand(term):
-    url=f"https://export.arxiv.org/api/query?search_query=all:{term}&max_results=3"
-    try:
-        r=requests.get(url,timeout=10)
-        if not r.ok: return []
-        t=r.text.lower()
-        out=[]
-        for w in ["hydrogen","plasma","quantum","magnetic","frequency","ion","charge","lattice","gradient"]:
-            if w in t: out.append(w)
-        return list(set(out))
-    except:
-        return []
-
-def fetch_arxiv(term):
-    """Pulls a real abstract & title."""
-    url=f"https://export.arxiv.org/api/query?search_query=all:{term}&max_results=1"
-    try:
-        r=requests.get(url,timeout=10)
-        if not r.ok: return None
-        t=r.text
-        title=t.split("<title>")[2].split("</title>")[0].strip()
-        summary=t.split("<summary>")[1].split("</summary>")[0].strip()
-        return title, summary
-    except:
-        return None
+# candidate queue: themes first, then the topic matrix; expansions join as they are found
+SCHEDULER=TermScheduler(TERM_QUEUE, seeds=THEMES+load_seeds(TOPIC_MATRIX, LEGACY_LEDGER))
 
-def sha(x): return hashlib.sha256(x.encode()).hexdigest()
+KEYWORDS = ["hydrogen","plasma","quantum","magnetic","frequency","ion","charge","lattice","gradient"]
+
+def arxiv_entries(term):
+    """Parsed entries of the feed for `term` ([] if unavailable), parsed as the response streams in."""
+    return ARXIV.search_entries(term, max_results=ARXIV_RESULTS)
+
+def keywords(entries):
+    """KEYWORDS mentioned in `entries` (the term's expansion)."""
+    t=" ".join(e.text for e in entries).lower()
+    return [w for w in KEYWORDS if w in t]
 
 def generate_full_paper(term, title, abstract):
-    """Creates a long-form research article."""
-    now=datetime.now(UTC).isoformat()
-    token_hash=sha(term+now)
-    value=2000 + (abs(hash(term)) % 3000)
-    color=["PURPLE","GREEN","YELLOW","RED"][value % 4]
-
-    # multi-page sections
-    background = f"""
-### Background
-The study of {term} intersects several high-priority scientific domains. 
-Contemporary research highlights multi-body interactions, nonlinear field 
-formation, and emergent behaviors found in high-energy or condensed-matter 
-environments. Recent work from arXiv and NASA ADS reveals structural patterns 
-relevant to Infinity OS modeling, particularly around resonance, field 
-coherence, and frequency-dependent behavior. 
-"""
-
-    methods = f"""
-### Methods & Data Sources
-This paper synthesizes:
-- arXiv datasets ({term})
-- NASA ADS catalog signals
-- Quantum field theoretical models
-- Gradient-based diffusion simulations
-- Infinity OS analytical transforms
-"""
-
-    analysis = f"""
-### Analysis
-A deeper investigation into {term} shows multi-layered interactions across 
-electromagnetic, quantum, and lattice domains. The Infinity OS interpretive 
-framework models these interactions as frequency tunnels, mapping energy 
-gradients across stability nodes. This produces predictive behavior useful for 
-material engineering, superconductive channeling, and quantum signal routing.
-"""
-
-    equations = f"""
-### Representative Equations
-1. **Energy Gradient Transport**
-    ∂E/∂t = ∇ · (D ∇E) + S(t)
-
-2. **Quantum Flux Density**
-    Φ = ∮ B · dA
-
-3. **Ion Mobility**
-    μ = v_d / E
-"""
-
-    applications = f"""
-### Applications
-- High-efficiency hydrogen conversion
-- Superconductive computing nodes
-- Infinity OS hydrogen portal modeling
-- Lattice-level frequency routing
-- Degenerate plasma field control
-"""
-
-    infinity_layer = f"""
-### Infinity OS Interpretation
-Infinity OS evaluates {term} as part of the hydrogen-frequency-portal chain.  
-This places the term within the “energy coherence” class. The Infinity Value 
-assigned reflects structural complexity, data-density potential, and 
-long-term research yield.
-"""
-
-    full = f"""
-{P}============================================================{W}
-{Y}∞ INFINITY RESEARCH TOKEN — FULL RESEARCH PAPER{W}
-HASH: {token_hash}
-VALUE: {value}
-COLOR STATE: {color}
-TIME: {now}
-TERM: {term}
-TITLE: {title}
-{P}============================================================{W}
-
-## Abstract
-{abstract}
-
-{background}
-{methods}
-{analysis}
-{equations}
-{applications}
-{infinity_layer}
-
-{G}============================================================{W}
-"""
-
-    return full
-
-def autopush():
-    try:
-        subprocess.run(["git","add","."],check=True)
-        subprocess.run(["git","commit","-m","Infinity Deep Research Update"],check=True)
-        subprocess.run(["git","push",REPO_URL,"main"],check=True)
-        print(f"{G}[∞] PUSHED ✓{W}")
-        return True
-    except Exception as e:
-        print(f"{Y}[∞] Push error: {e}{W}")
-        return False
+    """Creates a long-form research article (plain Markdown, no escape codes)."""
+    return render_plain(paper_meta(term, title, abstract))
+
+# terms this engine claimed whose paper failed; already in USED, so only this engine retries them
+RETRY=collections.deque()
+RETRY_LIMIT=3
+FAILURES=collections.Counter()
+
+def requeue(item, exc):
+    """Pipeline on_error: queues the item's term for the next cycle, up to RETRY_LIMIT failures."""
+    term=item if isinstance(item,str) else item[0]
+    FAILURES[term]+=1
+    if FAILURES[term]<RETRY_LIMIT:
+        RETRY.append(term)
+        print(f"{Y}[∞] {term!r} failed ({exc}); retrying next cycle{W}")
+    else:
+        del FAILURES[term]
+        print(f"{Y}[∞] {term!r} failed {RETRY_LIMIT} times; giving up{W}")
+
+def select_terms(limit=1):
+    """Up to `limit` terms: failed ones to retry first, then never-used ones claimed from the queue (no network)."""
+    retry=[RETRY.popleft() for _ in range(min(limit,len(RETRY)))]
+    yield from retry
+    for _ in range(limit-len(retry)):
+        u=SCHEDULER.next(claim=USED.add, fresh_only=True)
+        if u is None: return
+        yield u
+
+def research(term):
+    """(term, title, abstract) with real arXiv data where available; queues the term's expansions."""
+    entries = arxiv_entries(term)
+    if not entries:
+        return term, "No Title Found", "No Abstract Found"
+    if not SCHEDULER.expanded(term):
+        SCHEDULER.record_expansion(term, keywords(entries))
+    return term, entries[0].title, entries[0].summary
+
+def write_paper(idx, term, article):
+    fname=f"{OUTPUT_DIR}/deep_{idx:06d}_{term.replace(' ','_')}.txt"
+    with open(fname,"w") as f: f.write(article)
+    print(f"{G}[∞] Wrote deep research → {fname}{W}")
+    PUBLISHER.add(fname)
+    return fname
 
 def main():
     idx=len(USED)+1
@@ -169,41 +109,70 @@ def main():
 
     while True:
         # select fresh term
-        found=None
-        for t in THEMES:
-            candidates = expand(t) + [t]
-            for u in candidates:
-                if u not in USED:
-                    found=u
-                    USED.add(u)
-                    json.dump(list(USED),open(LEDGER,"w"))
-                    break
-            if found: break
-
+        found=next(select_terms(1),None)
         if not found:
             time.sleep(INTERVAL)
             continue
 
-        # get real data
-        research = fetch_arxiv(found)
-        if research:
-            title, abstract = research
-        else:
-            title, abstract = "No Title Found", "No Abstract Found"
-
-        # generate full paper
-        article = generate_full_paper(found, title, abstract)
+        # get real data, generate full paper, write file
+        term, title, abstract = research(found)
+        article = generate_full_paper(term, title, abstract)
+        write_paper(idx, term, article)
 
-        # write file
-        fname=f"{OUTPUT_DIR}/deep_{idx:06d}_{found.replace(' ','_')}.txt"
-        with open(fname,"w") as f: f.write(article)
-        print(f"{G}[∞] Wrote deep research → {fname}{W}")
-
-        # push
-        autopush()
+        # commit/push when a batch or the push interval is due
+        PUBLISHER.tick()
 
         idx+=1
         time.sleep(INTERVAL)
 
+def main_pipelined(per_cycle, fetch_workers=4):
+    """
+    Produces up to `per_cycle` papers per INTERVAL: select → fetch → generate →
+    write run as separate stages over bounded queues, with fetches in a thread
+    pool (rate-limited per host by ARXIV).
+    """
+    ids=itertools.count(len(USED)+1)
+    pipe=Pipeline("select",[
+        Stage("fetch",research,workers=fetch_workers,on_error=requeue),
+        Stage("generate",lambda r: (r[0],generate_full_paper(*r)),on_error=requeue),
+        Stage("write",lambda a: write_paper(next(ids),*a),on_error=requeue),
+    ])
+    print(f"{P}∞ CART 6000 — Infinity Deep Research Engine STARTED (pipeline ×{per_cycle}){W}")
+
+    while True:
+        start=time.time()
+        pipe.run(select_terms(per_cycle))
+        written=pipe.stages[-1].items_out
+        print(f"{C}[∞] cycle: {written} papers in {pipe.elapsed:.1f}s · arXiv {ARXIV.stats}{W}")
+        print(pipe.report())
+        PUBLISHER.tick()
+        time.sleep(max(0,INTERVAL-(time.time()-start)))
+
 if __name__=="__main__":
-    main()
+    ap=argparse.ArgumentParser(description="CART 6000 Infinity Deep Research Engine")
+    ap.add_argument("--replay",action="store_true",help="serve arXiv only from the local cache (offline)")
+    ap.add_argument("--cache-dir",default=ARXIV.cache_dir)
+    ap.add_argument("--cache-ttl",type=float,default=ARXIV.ttl,help="seconds before a cached response is revalidated")
+    ap.add_argument("--cache-mb",type=float,default=ARXIV.max_bytes/2**20,help="cache size limit (LRU eviction)")
+    ap.add_argument("--pipeline",type=int,default=0,metavar="N",help="produce up to N papers per interval in a staged pipeline")
+    ap.add_argument("--fetch-workers",type=int,default=4)
+    ap.add_argument("--arxiv-interval",type=float,default=ARXIV.limiter.min_interval,help="minimum seconds between arXiv requests")
+    ap.add_argument("--interval",type=float,default=INTERVAL,help="seconds per cycle")
+    ap.add_argument("--batch-size",type=int,default=PUBLISHER.batch_size,help="commit after this many new papers")
+    ap.add_argument("--batch-window",type=float,default=PUBLISHER.batch_window,help="...or once the oldest unpublished paper is this old (s)")
+    ap.add_argument("--push-interval",type=float,default=PUBLISHER.push_interval,help="minimum seconds between pushes")
+    ap.add_argument("--push-url",default=REPO_URL,help="push target (e.g. a local bare repo for testing)")
+    ap.add_argument("--dry-run",action="store_true",help="print git commands instead of running them")
+    a=ap.parse_args()
+    ARXIV=ArxivClient(cache_dir=a.cache_dir,ttl=a.cache_ttl,max_bytes=int(a.cache_mb*2**20),replay=a.replay,
+                      min_interval=a.arxiv_interval)
+    INTERVAL=a.interval
+    PUBLISHER=GitPublisher(".",a.push_url,"main",batch_size=a.batch_size,batch_window=a.batch_window,
+                           push_interval=a.push_interval,dry_run=a.dry_run)
+    PUBLISHER.recover(OUTPUT_DIR)
+    try:
+        if a.pipeline>0: main_pipelined(a.pipeline,a.fetch_workers)
+        else: main()
+    except KeyboardInterrupt:
+        print(f"{Y}[∞] stopping — publishing pending papers{W}")
+        PUBLISHER.flush()
@@ -1,38 +1,39 @@
 #!/usr/bin/env python3
-import os, json, time, random, datetime, hashlib, subprocess, re
+import os, json, time, random, datetime, hashlib, subprocess, re, threading
+from concurrent.futures import ThreadPoolExecutor, wait
 import requests
+from atom_feed import iter_entries
+from resilient_http import ResilientClient
+from raw_store import RawStore
+from batch_archiver import BatchArchiver
+from token_counter import TokenCounter
+from term_scheduler import TermScheduler, load_seeds
 
 # ==================================================
 # ONLY /v FROM NOW ON — NO Z ANYWHERE EVER AGAIN
 # ==================================================
-REPO_DIR = "/data/data/com.termux/files/home/v"   # ← locked to v forever
+REPO_DIR = os.environ.get("INFINITY_REPO_DIR", "/data/data/com.termux/files/home/v")   # ← locked to v forever (env override for tests/benchmarks only)
 TOKENS_DIR = os.path.join(REPO_DIR, "infinity_tokens")
 RAW_DIR    = os.path.join(REPO_DIR, "raw_research")
 ZIPS_DIR   = os.path.join(REPO_DIR, "zipcoins")
 COUNTER    = os.path.join(REPO_DIR, "infinity_token_counter.json")
+TERM_QUEUE = os.path.join(REPO_DIR, "term_queue.jsonl")
+HERE       = os.path.dirname(os.path.abspath(__file__))
 
 os.makedirs(TOKENS_DIR, exist_ok=True)
 os.makedirs(RAW_DIR, exist_ok=True)
 os.makedirs(ZIPS_DIR, exist_ok=True)
 
+# raw payloads: stored once per distinct content (gzip), one manifest line per harvest
+RAW = RawStore(RAW_DIR)
+
+# batch zips hold only what RAW_DIR gained since the previous batch; built in the background
+ARCHIVER = BatchArchiver(RAW_DIR, ZIPS_DIR, compresslevel=1, log=lambda m: print(color(m,"90")))
+
 # ------------------------------------------------------
-# COUNTER INIT (will create fresh in /v if missing)
+# COUNTER (numbers reserved 1000 at a time; safe across processes and crashes)
 # ------------------------------------------------------
-if not os.path.exists(COUNTER):
-    with open(COUNTER, "w") as f:
-        json.dump({"count": 0}, f)
-
-try:
-    with open(COUNTER) as f:
-        counter = json.load(f)
-    if not isinstance(counter, dict) or "count" not in counter:
-        counter = {"count": 0}
-except:
-    counter = {"count": 0}
-
-def save_counter():
-    with open(COUNTER, "w") as f:
-        json.dump(counter, f)
+TOKENS = TokenCounter(COUNTER, block=1000)
 
 def utc():
     return datetime.datetime.now(datetime.timezone.utc).isoformat()
@@ -48,36 +49,122 @@ def color(t,c): return f"\033[{c}m{t}\033[0m"
 SESSION = requests.Session()
 SESSION.headers.update({"User-Agent": "InfinityResearchBot/2.0"})
 TIMEOUT = 20
-BACKOFF = [1,2,4,8]
-
-def fetch_json(url, params=None):
-    for d in BACKOFF:
-        try:
-            r = SESSION.get(url, params=params, timeout=TIMEOUT)
-            if r.status_code == 200:
-                return r.json()
-        except:
-            time.sleep(d)
-    return None
-
-def fetch_text(url, params=None):
-    for d in BACKOFF:
-        try:
-            r = SESSION.get(url, params=params, timeout=TIMEOUT)
-            if r.status_code == 200:
-                return r.text
-        except:
-            time.sleep(d)
-    return None
+BACKOFF = [1,2,4,8]   # attempts; jittered exponential delay between 1 s and 8 s
+
+# per-source token buckets: (requests/second, burst)
+RATE_LIMITS = {
+    "wiki":     (50.0, 10),
+    "wikidata": (10.0, 5),
+    "arxiv":    (1/3, 1),    # arXiv asks for at most one request every 3 s
+    "openalex": (10.0, 10),
+    "crossref": (10.0, 5),
+}
+
+HARVEST_DEADLINE = float(os.environ.get("INFINITY_HARVEST_DEADLINE", 30))
+# how long a call may queue for its token; arXiv's 3 s spacing would skip most calls at 1 s,
+# so it waits for as long as the harvest does
+MAX_WAITS = {"arxiv": HARVEST_DEADLINE}
+
+def breaker_changed(source, state, info):
+    print(color(f"[breaker] {source} → {state.upper()}" + (f" for {info['retry_in']:.0f}s" if info["retry_in"] else ""),"91"))
+
+SKIPS = threading.local()   # why this thread's last source call was skipped, if it was
+
+def call_skipped(source, reason):
+    SKIPS.reason = reason
+    if reason == "rate":
+        print(color(f"[rate] {source} skipped: no token within {HTTP.max_waits.get(source, HTTP.max_wait):.0f}s","93"))
+
+# Retry-After, jittered backoff on 429/5xx, token buckets, and a circuit breaker
+# per source (skipped for 5 min after 3 failed calls in a row)
+HTTP = ResilientClient(SESSION, timeout=TIMEOUT, max_attempts=len(BACKOFF), base_delay=BACKOFF[0],
+                       max_delay=BACKOFF[-1], rates=RATE_LIMITS, max_wait=1.0, max_waits=MAX_WAITS,
+                       failure_threshold=3, cooldown=300, on_breaker_change=breaker_changed, on_skip=call_skipped)
+
+def fetch_json(url, params=None, source=None):
+    r = HTTP.get(url, params=params, key=source)
+    if r is None or r.status_code != 200:
+        return None
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+def fetch_text(url, params=None, source=None):
+    r = HTTP.get(url, params=params, key=source)
+    if r is None or r.status_code != 200:
+        return None
+    return r.text
 
 # ------------------------------------------------------
 # SOURCES (unchanged)
 # ------------------------------------------------------
-def wiki(t):      return fetch_json("https://en.wikipedia.org/api/rest_v1/page/summary/" + requests.utils.quote(t))
-def wikidata(t):  return fetch_json("https://www.wikidata.org/w/api.php", {"action":"wbsearchentities","search":t,"language":"en","format":"json","limit":5})
-def arxiv(t):     return fetch_text("http://export.arxiv.org/api/query", {"search_query":f"all:{t}","start":0,"max_results":10})
-def openalex(t):  return fetch_json("https://api.openalex.org/works", {"search":t,"per_page":10})
-def crossref(t):  return fetch_json("https://api.crossref.org/works", {"query":t,"rows":10})
+API_BASE = os.environ.get("INFINITY_API_BASE")   # e.g. research_stub.py; None = the real APIs
+
+def api(url):
+    """`url`, or its stub equivalent (API_BASE/host/path) when API_BASE is set."""
+    return API_BASE.rstrip("/") + "/" + url.split("://",1)[1] if API_BASE else url
+
+def wiki(t):      return fetch_json(api("https://en.wikipedia.org/api/rest_v1/page/summary/") + requests.utils.quote(t), source="wiki")
+def wikidata(t):  return fetch_json(api("https://www.wikidata.org/w/api.php"), {"action":"wbsearchentities","search":t,"language":"en","format":"json","limit":5}, source="wikidata")
+def arxiv(t):     return fetch_text(api("http://export.arxiv.org/api/query"), {"search_query":f"all:{t}","start":0,"max_results":10}, source="arxiv")
+def openalex(t):  return fetch_json(api("https://api.openalex.org/works"), {"search":t,"per_page":10}, source="openalex")
+def crossref(t):  return fetch_json(api("https://api.crossref.org/works"), {"query":t,"rows":10}, source="crossref")
+
+# ------------------------------------------------------
+# CONCURRENT FAN-OUT (all sources at once, per-harvest deadline)
+# ------------------------------------------------------
+SOURCES = {"wiki": wiki, "wikidata": wikidata, "arxiv": arxiv, "openalex": openalex, "crossref": crossref}
+# 2x sources so fetches abandoned at a deadline don't starve the next harvest
+POOL = ThreadPoolExecutor(max_workers=2*len(SOURCES), thread_name_prefix="source")
+SOURCE_STATS = {s: {"calls":0,"ok":0,"empty":0,"rate_skips":0,"open_skips":0,"errors":0,"timeouts":0,
+                     "total_s":0.0,"max_s":0.0} for s in SOURCES}
+STATS_LOCK = threading.Lock()
+
+def timed_source(name, term):
+    start = time.perf_counter()
+    result, outcome = None, "errors"
+    SKIPS.reason = None
+    try:
+        result = SOURCES[name](term)
+        if result is not None:
+            outcome = "ok"
+        else:
+            outcome = f"{SKIPS.reason}_skips" if SKIPS.reason else "empty"
+    finally:
+        secs = time.perf_counter() - start
+        with STATS_LOCK:
+            s = SOURCE_STATS[name]
+            s["calls"] += 1
+            s[outcome] += 1
+            s["total_s"] += secs
+            s["max_s"] = max(s["max_s"], secs)
+    return result
+
+def fetch_sources(term, deadline=None):
+    """Fetches every source concurrently; a source that misses the deadline is None (partial result)."""
+    futures = {name: POOL.submit(timed_source, name, term) for name in SOURCES}
+    done, _ = wait(futures.values(), timeout=HARVEST_DEADLINE if deadline is None else deadline)
+    raw = {}
+    for name, f in futures.items():
+        if f in done and f.exception() is None:
+            raw[name] = f.result()
+        else:
+            raw[name] = None
+            if f not in done:
+                with STATS_LOCK: SOURCE_STATS[name]["timeouts"] += 1
+    return raw
+
+def source_report():
+    with STATS_LOCK:
+        breakers = HTTP.breaker_states()
+        lines = [f"{'source':>9} {'calls':>6} {'ok':>5} {'empty':>6} {'rate skip':>10} {'open skip':>10} {'errors':>7} {'timeouts':>9} {'avg ms':>8} {'max ms':>8} {'breaker':>10}"]
+        for name, s in SOURCE_STATS.items():
+            avg = s["total_s"] / s["calls"] * 1000 if s["calls"] else 0.0
+            state = breakers.get(name, {}).get("state", "closed")
+            lines.append(f"{name:>9} {s['calls']:>6} {s['ok']:>5} {s['empty']:>6} {s['rate_skips']:>10} {s['open_skips']:>10} {s['errors']:>7} {s['timeouts']:>9} {avg:>8.1f} {s['max_s']*1000:>8.1f} {state:>10}")
+        lines.append("http: " + ", ".join(f"{k}={v}" for k, v in HTTP.stats.items()))
+    return "\n".join(lines)
 
 def clean(txt):
     if not txt: return ""
@@ -105,11 +192,9 @@ def build_research_article(term, raw, token_number, token_value, color_state):
     # arXiv
     if raw.get("arxiv"):
         out.append("### arXiv Papers")
-        for e in re.split(r"<entry>", raw["arxiv"])[1:][:3]:
-            title = re.search(r"<title>(.*?)</title>", e, re.S)
-            summ  = re.search(r"<summary>(.*?)</summary>", e, re.S)
-            if title: out.append(f"**{clean(title.group(1))}**")
-            if summ:  out.append(clean(summ.group(1)))
+        for e in iter_entries(raw["arxiv"], limit=3):
+            if e.title:   out.append(f"**{clean(e.title)}**")
+            if e.summary: out.append(clean(e.summary))
             out.append("")
     # Crossref + OpenAlex sections unchanged (shortened here for brevity but identical to your original)
     # … (same as your original script – I kept everything functional)
@@ -122,12 +207,14 @@ def build_research_article(term, raw, token_number, token_value, color_state):
 # ------------------------------------------------------
 # HARVEST + ZIP/PUSH (now 100% /v)
 # ------------------------------------------------------
-def harvest(term):
-    raw = {"wiki": wiki(term),"wikidata": wikidata(term),"arxiv": arxiv(term),"openalex": openalex(term),"crossref": crossref(term)}
-    raw_file = os.path.join(RAW_DIR, f"{term.replace(' ','_')}_{utc()}.json")
-    with open(raw_file,"w") as f: json.dump(raw,f,indent=2)
+def harvest(term, concurrent=True, deadline=None):
+    if concurrent:
+        raw = fetch_sources(term, deadline)
+    else:
+        raw = {name: timed_source(name, term) for name in SOURCES}
+    RAW.put_harvest(term, raw, utc())
 
-    token_number = counter["count"]
+    token_number = TOKENS.next()   # reserved before anything is written with it
     token_value  = random.randint(1500,3500)
     color_state  = random.choice(["BLUE","GREEN","YELLOW","PURPLE","RED"])
     article = build_research_article(term, raw, token_number, token_value, color_state)
@@ -136,34 +223,49 @@ def harvest(term):
     token_path = os.path.join(TOKENS_DIR, f"{h}.txt")
     with open(token_path,"w") as f: f.write(article)
 
-    counter["count"] += 1
-    save_counter()
-
     print(color("\n∞ NEW INFINITY RESEARCH TOKEN","96"))
     print(color(f"HASH: {h}","92"))
     print(color(f"VALUE: {token_value}","93"))
     print(color(f"COLOR: {color_state}","95"))
     print(color(article[:500]+"\n...","97"))
+    return token_number
 
-def zip_and_push():
-    batch = counter["count"]//1000
-    zpath = os.path.join(ZIPS_DIR, f"batch_{batch:05}.zip")
-    subprocess.run(["zip","-qr",zpath,RAW_DIR], check=False)
+def push_batch(batch):
     subprocess.run(["git","-C",REPO_DIR,"add","."], check=False)
     subprocess.run(["git","-C",REPO_DIR,"commit","-m",f"∞ Batch {batch}"], check=False)
     subprocess.run(["git","-C",REPO_DIR,"push","origin","main"], check=False)
 
+def zip_and_push(batch):
+    """Archives the new raw files and pushes on a background thread; harvesting carries on. False if not started."""
+    if not ARCHIVER.submit(batch, after=lambda result: push_batch(batch)):
+        print(color("[archive] previous batch still running; retrying on the next token","93"))
+        return False
+    return True
+
+BATCH_TOKENS = 1000   # one archive + push per this many tokens
+
+STATS_EVERY = 100   # print per-source stats every N tokens
+
 TERMS = ["hydrogen","quantum computing","oxide materials","electron structure","fusion","nanotechnology","materials science","signal processing"]
 
+# ------------------------------------------------------
+# TERM SCHEDULE (never-harvested terms first, then the stalest; shared by concurrent engines)
+# ------------------------------------------------------
+SCHEDULER = TermScheduler(TERM_QUEUE, seeds=TERMS + load_seeds(os.path.join(HERE, "CART250_TOPIC_MATRIX.json"),
+                                                             os.path.join(HERE, "deep_terms.json")))
+
 def main():
     print(color("\n∞ Infinity Research Engine — LOCKED TO /v — Online ∞\n","94"))
-    i = 0
+    # Fire on crossing into a new batch, not on an exact multiple: a restart
+    # discards the rest of TOKENS' reserved block, which may hold that number
+    last_batch = ARCHIVER.last_batch
     while True:
-        term = TERMS[i % len(TERMS)]
-        harvest(term)
-        if counter["count"] % 1000 == 0:
-            zip_and_push()
-        i += 1
+        term = SCHEDULER.next()
+        issued = harvest(term) + 1
+        if issued // BATCH_TOKENS > last_batch and zip_and_push(issued // BATCH_TOKENS):
+            last_batch = issued // BATCH_TOKENS
+        if issued % STATS_EVERY == 0:
+            print(color(source_report(),"90"))
         time.sleep(1)
 
 if __name__ == "__main__":
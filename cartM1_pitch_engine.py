@@ -3,20 +3,41 @@
 # Infinity OS — Advanced Grok/Gemini Hybrid Pitch Engine
 # Cart M1 — Pure Intelligence Layer 1
 
+import os
+import time
 import numpy as np
-import sounddevice as sd
 import argparse
 from scipy.io import wavfile
 from scipy.signal import find_peaks
-import matplotlib.pyplot as plt
 import sys
 
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # optional: no microphone, WAV input only
+    sd = None
+
+try:
+    import matplotlib.pyplot as plt
+except ImportError:  # optional: --plot only
+    plt = None
+
 # -----------------------------------
 # Utility: Next power of 2 for FFT pad
 # -----------------------------------
 def next_power_of_2(n):
     return 1 << (int(np.log2(n - 1)) + 1) if n > 1 else 1
 
+# -----------------------------------
+# Utility: Peak bin with log-parabolic interpolation
+# -----------------------------------
+def log_parabolic_peak(y):
+    """Fractional index of the maximum of `y`, refined on the log magnitude."""
+    peak = int(np.argmax(y))
+    if 0 < peak < len(y) - 1:
+        y0, y1, y2 = np.log(y[peak - 1:peak + 2] + 1e-10)
+        return peak + 0.5 * (y0 - y2) / (y0 - 2 * y1 + y2)
+    return float(peak)
+
 # -----------------------------------
 # FFT Pitch Detection
 # -----------------------------------
@@ -31,26 +52,26 @@ def get_freq_fft(data, sr):
     pad = next_power_of_2(N * 4)
     fft = np.fft.rfft(data, n=pad)
     mag = np.abs(fft)
-    freqs = np.fft.rfftfreq(pad, 1 / sr)
-
-    peak = np.argmax(mag)
-    if 0 < peak < len(mag) - 1:
-        y0, y1, y2 = np.log(mag[peak - 1:peak + 2] + 1e-10)
-        offset = 0.5 * (y0 - y2) / (y0 - 2 * y1 + y2)
-        freq = freqs[peak] + offset * (freqs[1] - freqs[0])
-    else:
-        freq = freqs[peak]
-    return freq
+    return log_parabolic_peak(mag) * sr / pad
 
 # -----------------------------------
 # Autocorrelation Detection
 # -----------------------------------
-def get_freq_autocorr(data, sr):
+def autocorrelation(data, pad=None):
+    """
+    Normalised autocorrelation of the Hann-windowed, mean-removed signal,
+    computed from the power spectrum (Wiener-Khinchin): O(N log N) instead
+    of np.correlate's O(N^2). `pad` >= 2 * len(data) avoids circular wrap.
+    """
     data = data * np.hanning(len(data))
     data -= np.mean(data)
-    corr = np.correlate(data, data, mode='full')[len(data) - 1:]
-    corr = corr / (np.max(corr) + 1e-10)
+    N = len(data)
+    spec = np.fft.rfft(data, n=pad or next_power_of_2(2 * N))
+    corr = np.fft.irfft(spec.real ** 2 + spec.imag ** 2)[:N]
+    return corr / (np.max(corr) + 1e-10)
 
+def freq_from_autocorr(corr, sr):
+    """Highest autocorrelation peak after the first valley, parabolically refined."""
     valleys, _ = find_peaks(-corr)
     start = valleys[0] if len(valleys) > 0 else 5
 
@@ -65,6 +86,59 @@ def get_freq_autocorr(data, sr):
 
     return sr / peak_idx
 
+def get_freq_autocorr(data, sr):
+    return freq_from_autocorr(autocorrelation(data), sr)
+
+# -----------------------------------
+# YIN Detection
+# -----------------------------------
+def yin_difference(x, max_lag, pad=None):
+    """
+    YIN difference d(tau) = sum_{j<W} (x[j] - x[j+tau])^2 for tau < max_lag,
+    W = len(x) - max_lag: energies from a cumulative sum, the cross term
+    from one FFT correlation.
+    """
+    W = len(x) - max_lag
+    pad = pad or next_power_of_2(len(x) + W)
+    cross = np.fft.irfft(np.conj(np.fft.rfft(x[:W], pad)) * np.fft.rfft(x, pad), pad)[:max_lag]
+    sq = np.concatenate(([0.0], np.cumsum(x * x)))
+    return sq[W] + (sq[W:W + max_lag] - sq[:max_lag]) - 2 * cross
+
+def freq_from_yin(diff, sr, min_lag, threshold=0.1):
+    """
+    (Hz, confidence) from a YIN difference function: cumulative mean
+    normalisation, first dip under `threshold` (else the deepest dip, as
+    pYIN falls back to), parabolic refinement. Confidence is 1 - CMNDF there.
+    """
+    cmndf = np.ones(len(diff))
+    cum = np.cumsum(diff[1:])
+    cmndf[1:] = diff[1:] * np.arange(1, len(diff)) / np.maximum(cum, 1e-12)
+    if min_lag >= len(cmndf) - 1:
+        return 0.0, 0.0
+
+    below = np.flatnonzero(cmndf[min_lag:] < threshold)
+    if len(below) > 0:
+        tau = below[0] + min_lag
+        while tau + 1 < len(cmndf) and cmndf[tau + 1] < cmndf[tau]:
+            tau += 1
+    else:
+        tau = int(np.argmin(cmndf[min_lag:])) + min_lag
+    confidence = float(np.clip(1 - cmndf[tau], 0, 1))
+
+    lag = float(tau)
+    if 0 < tau < len(cmndf) - 1:
+        y0, y1, y2 = cmndf[tau - 1:tau + 2]
+        denom = y0 - 2 * y1 + y2
+        if denom:
+            lag += 0.5 * (y0 - y2) / denom
+    return sr / lag, confidence
+
+def get_freq_yin(data, sr, threshold=0.1, fmin=40.0, fmax=2000.0):
+    x = data - np.mean(data)
+    max_lag = min(len(x) // 2, int(sr / fmin) + 2)
+    freq, _ = freq_from_yin(yin_difference(x, max_lag), sr, max(2, int(sr / fmax)), threshold)
+    return freq
+
 # -----------------------------------
 # HPS (Harmonic Product Spectrum)
 # -----------------------------------
@@ -79,16 +153,77 @@ def get_freq_hps(data, sr, harmonics=5):
         decimated = spec[::h]
         hps[:len(decimated)] *= decimated
 
-    peak = np.argmax(hps)
-    bin_size = sr / pad
+    return log_parabolic_peak(hps) * sr / pad
 
-    if 0 < peak < len(hps) - 1:
-        y0, y1, y2 = np.log(hps[peak - 1:peak + 2] + 1e-10)
-        offset = 0.5 * (y0 - y2) / (y0 - 2 * y1 + y2)
-        freq = (peak + offset) * bin_size
-    else:
-        freq = peak * bin_size
-    return freq
+# -----------------------------------
+# Ensemble (FFT peak + HPS + autocorrelation from one spectrum)
+# -----------------------------------
+ENSEMBLE_WEIGHTS = {'fft': 1.0, 'hps': 1.0, 'autocorr': 1.0}
+ENSEMBLE_TOLERANCE = 50        # cents for two estimates to agree
+ENSEMBLE_RELATED = 0.4         # vote share for an estimate at 2-4x or 1/2-1/4 of a candidate
+
+def shared_spectrum(data, pad=None):
+    """rfft of the Hann-windowed, mean-removed signal, zero-padded to >= 4N."""
+    data = data * np.hanning(len(data))
+    data -= np.mean(data)
+    return np.fft.rfft(data, n=pad or next_power_of_2(len(data) * 4))
+
+def ensemble_vote(estimates, corr, sr):
+    """
+    (Hz, confidence, estimates). A candidate gets full weight from agreeing
+    estimates and ENSEMBLE_RELATED weight from ones an octave or harmonic
+    away, so one method's octave error is outvoted; ties go to the stronger
+    autocorrelation. Confidence = vote share x autocorrelation at the lag.
+    """
+    valid = {m: f for m, f in estimates.items() if f > 20}
+    if not valid:
+        return 0.0, 0.0, estimates
+    total = sum(ENSEMBLE_WEIGHTS[m] for m in estimates)
+    cents = lambda a, b: abs(1200 * np.log2(a / b))
+
+    def periodicity(freq):
+        lag = sr / freq
+        return float(np.interp(lag, np.arange(len(corr)), corr)) if lag < len(corr) - 1 else 0.0
+
+    best = None
+    for cand in valid.values():
+        score = 0.0
+        for m, f in valid.items():
+            if cents(f, cand) <= ENSEMBLE_TOLERANCE:
+                score += ENSEMBLE_WEIGHTS[m]
+            elif any(cents(f, cand * k) <= ENSEMBLE_TOLERANCE or cents(f, cand / k) <= ENSEMBLE_TOLERANCE
+                     for k in (2, 3, 4)):
+                score += ENSEMBLE_RELATED * ENSEMBLE_WEIGHTS[m]
+        key = (round(score, 6), periodicity(cand), cand)
+        if best is None or key > best[0]:
+            best = (key, cand)
+    (score, strength, _), cand = best
+    agreeing = [f for f in valid.values() if cents(f, cand) <= ENSEMBLE_TOLERANCE]
+    freq = float(np.exp(np.mean(np.log(agreeing))))
+    confidence = float(np.clip(score / total * max(strength, 0.0), 0.0, 1.0))
+    return freq, confidence, estimates
+
+def ensemble_from_spectrum(spec, n, sr, harmonics=5):
+    """FFT-peak, HPS and autocorrelation (inverse FFT of the power spectrum) estimates from one spectrum, voted."""
+    pad = 2 * (len(spec) - 1)
+    power = spec.real ** 2 + spec.imag ** 2
+    mag = np.sqrt(power)
+    hps = mag.copy()
+    for h in range(2, harmonics + 1):
+        decimated = mag[::h]
+        hps[:len(decimated)] *= decimated
+    # every other bin of the >= 4N-padded spectrum is the 2N-padded one: enough for a wrap-free autocorrelation
+    corr = np.fft.irfft(power[::2], n=pad // 2)[:n]
+    corr = corr / (corr[0] + 1e-10)
+    estimates = {
+        'fft': log_parabolic_peak(mag) * sr / pad,
+        'hps': log_parabolic_peak(hps) * sr / pad,
+        'autocorr': freq_from_autocorr(corr, sr),
+    }
+    return ensemble_vote(estimates, corr, sr)
+
+def get_freq_ensemble(data, sr, harmonics=5):
+    return ensemble_from_spectrum(shared_spectrum(data), len(data), sr, harmonics)[0]
 
 # -----------------------------------
 # Frequency → Note
@@ -117,6 +252,8 @@ def freq_to_note(freq):
 # Main Analyzer
 # -----------------------------------
 def detect_pitch(args):
+    if sd is None:
+        return "sounddevice is not installed; use --wav FILE"
     try:
         print("Listening...")
         audio = sd.rec(
@@ -136,18 +273,26 @@ def detect_pitch(args):
             wavfile.write(args.save_audio, args.samplerate, audio)
             print(f"Audio saved to {args.save_audio}")
 
+        corr = None
         if args.method == 'fft':
             freq = get_freq_fft(data, args.samplerate)
         elif args.method == 'autocorr':
-            freq = get_freq_autocorr(data, args.samplerate)
+            corr = autocorrelation(data)
+            freq = freq_from_autocorr(corr, args.samplerate)
+        elif args.method == 'yin':
+            freq = get_freq_yin(data, args.samplerate)
+        elif args.method == 'ensemble':
+            freq, confidence, estimates = ensemble_from_spectrum(shared_spectrum(data), len(data),
+                                                                 args.samplerate, args.harmonics)
+            print("Estimates: " + ", ".join(f"{m} {f:.2f} Hz" for m, f in estimates.items())
+                  + f" — confidence {confidence:.2f}")
         else:
-            freq = get_freq_hps(data, args.samplerate)
+            freq = get_freq_hps(data, args.samplerate, args.harmonics)
 
         note = freq_to_note(freq)
 
-        if args.plot:
-            if args.method == 'autocorr':
-                corr = np.correlate(data, data, mode='full')[len(data) - 1:]
+        if args.plot and plt is not None:
+            if corr is not None:
                 plt.plot(corr)
                 plt.title("Autocorrelation")
                 plt.xlabel("Lag")
@@ -169,6 +314,135 @@ def detect_pitch(args):
     except Exception as e:
         return f"Error during detection: {str(e)}"
 
+# -----------------------------------
+# Streaming (live input or WAV file)
+# -----------------------------------
+def stream_pitch(args):
+    """Overlapping frames every --hop seconds from a ring buffer; prints a latency report at the end."""
+    from pitch_stream import StreamingPitchEngine, read_wav, run_wav, run_input, format_frame
+
+    if args.wav:
+        sr, samples = read_wav(args.wav)
+    else:
+        sr = args.samplerate
+    engine = StreamingPitchEngine(sr, int(args.duration * sr), int(args.hop * sr), args.method,
+                                  args.harmonics, args.threshold)
+    source = run_wav(engine, samples) if args.wav else run_input(engine, device=args.device)
+    print("Streaming. Ctrl+C to stop." if not args.wav else f"Tracking {args.wav}")
+    try:
+        for frame in source:
+            print(format_frame(frame))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    print(engine.report())
+
+# -----------------------------------
+# Batch (WAV file or directory → pitch track)
+# -----------------------------------
+def batch_pitch(args):
+    """Vectorised FFT/HPS over every --duration frame (every --hop seconds); writes CSV or NPY."""
+    from pitch_batch import track_files, write_track, wav_paths
+
+    method = 'fft' if args.method == 'fft' else 'hps'
+    if method != args.method:
+        print(f"Batch mode supports fft and hps; using {method}")
+    track = track_files(wav_paths(args.batch), args.duration, args.hop, method, args.harmonics, args.threshold)
+    write_track(track, args.out)
+    print(f"{len(track)} frames → {args.out}")
+
+# -----------------------------------
+# Benchmark (synthetic tones + recorded fixtures)
+# -----------------------------------
+def legacy_autocorr(data, sr):
+    """The previous O(N^2) np.correlate path, kept for comparison."""
+    data = data * np.hanning(len(data))
+    data -= np.mean(data)
+    corr = np.correlate(data, data, mode='full')[len(data) - 1:]
+    return freq_from_autocorr(corr / (np.max(corr) + 1e-10), sr)
+
+BENCH_METHODS = {
+    'fft': get_freq_fft,
+    'hps': get_freq_hps,
+    'autocorr (np.correlate)': legacy_autocorr,
+    'autocorr (FFT)': get_freq_autocorr,
+    'yin': get_freq_yin,
+    'ensemble': get_freq_ensemble,
+}
+
+def synth(kind, freq, sr, n, rng):
+    t = np.arange(n) / sr
+    if kind == 'vibrato':
+        phase = 2 * np.pi * np.cumsum(freq * (1 + 0.01 * np.sin(2 * np.pi * 5 * t))) / sr
+    else:
+        phase = 2 * np.pi * freq * t
+    if kind == 'sine':
+        x = np.sin(phase)
+    elif kind == 'missing fundamental':
+        x = sum(np.sin(h * phase) / h for h in range(2, 6))
+    else:
+        x = sum(np.sin(h * phase) / h for h in range(1, 6))
+    x = 0.5 * x / np.max(np.abs(x))
+    if kind == 'noisy (10 dB)':
+        x = x + rng.standard_normal(n) * np.sqrt(np.mean(x ** 2) / 10)
+    return x
+
+def fixture_cases(directory, duration):
+    """(name, samples, sr, expected Hz) for WAVs named like `<label>_<hz>.wav` (e.g. cello_A2_110.wav)."""
+    from pitch_stream import read_wav
+    cases = []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        try:
+            expected = float(stem.rsplit('_', 1)[-1])
+        except ValueError:
+            continue
+        if ext.lower() != '.wav':
+            continue
+        sr, samples = read_wav(os.path.join(directory, name))
+        n = int(duration * sr)
+        mid = max(0, (len(samples) - n) // 2)
+        cases.append((name, np.asarray(samples[mid:mid + n], dtype=np.float64), sr, expected))
+    return cases
+
+def bench(duration=0.5, sr=44100, fixtures=None, repeat=3):
+    rng = np.random.default_rng(0)
+    freqs = [82.41, 110.0, 146.83, 196.0, 261.63, 329.63, 440.0, 587.33, 783.99, 1046.5]
+    kinds = ['sine', 'harmonic', 'missing fundamental', 'noisy (10 dB)', 'vibrato']
+    n = int(duration * sr)
+    groups = {k: [(f"{k} {f}", synth(k, f, sr, n, rng), sr, f) for f in freqs] for k in kinds}
+    if fixtures:
+        groups['recorded fixtures'] = fixture_cases(fixtures, duration)
+    print(f"{n} samples per call ({duration}s @ {sr} Hz); accuracy = share within 50 cents, median |error|")
+    header = f"{'method':>24} {'ms/call':>8}" + "".join(f" {k[:19]:>19}" for k in groups)
+    print(header)
+    for label, fn in BENCH_METHODS.items():
+        row = []
+        for cases in groups.values():
+            errs = []
+            for _, x, rate, expected in cases:
+                f = fn(x.copy(), rate)
+                errs.append(abs(1200 * np.log2(f / expected)) if f > 0 else 1200.0)
+            errs = np.array(errs) if errs else np.array([np.nan])
+            row.append(f"{np.mean(errs <= 50):>9.0%} {np.median(errs):>6.1f}ct")
+        x = groups['harmonic'][4][1]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(x.copy(), sr)
+        ms = (time.perf_counter() - start) * 1000 / repeat
+        print(f"{label:>24} {ms:>8.2f}" + "".join(f" {r:>19}" for r in row))
+    x = groups['harmonic'][4][1]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        get_freq_fft(x.copy(), sr), get_freq_hps(x.copy(), sr), get_freq_autocorr(x.copy(), sr)
+    separate = (time.perf_counter() - start) * 1000 / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        get_freq_ensemble(x.copy(), sr)
+    shared = (time.perf_counter() - start) * 1000 / repeat
+    print(f"fft + hps + autocorr run separately: {separate:.2f} ms · ensemble (one spectrum): {shared:.2f} ms")
+    if not fixtures:
+        print("(no recorded fixtures: pass --bench DIR with WAVs named <label>_<hz>.wav)")
+
 # -----------------------------------
 # CLI
 # -----------------------------------
@@ -179,7 +453,7 @@ if __name__ == "__main__":
 
     parser.add_argument('--duration', type=float, default=0.5)
     parser.add_argument('--samplerate', type=int, default=44100)
-    parser.add.add_argument('--method', choices=['fft','autocorr','hps'], default='hps')
+    parser.add_argument('--method', choices=['fft','autocorr','hps','yin','ensemble'], default='hps')
     parser.add_argument('--harmonics', type=int, default=5)
     parser.add_argument('--continuous', action='store_true')
     parser.add_argument('--device', type=int, default=None)
@@ -187,9 +461,31 @@ if __name__ == "__main__":
     parser.add_argument('--threshold', type=float, default=0.01)
     parser.add_argument('--plot', action='store_true')
     parser.add_argument('--save-audio', type=str, default=None)
+    parser.add_argument('--wav', type=str, default=None, help='track a WAV file instead of the microphone')
+    parser.add_argument('--hop', type=float, default=0.1, help='seconds between frames when streaming')
+    parser.add_argument('--batch', type=str, default=None, help='WAV file or directory to track in one pass')
+    parser.add_argument('--out', type=str, default='pitch_track.csv', help='batch output (.csv or .npy)')
+    parser.add_argument('--bench', nargs='?', const='', default=None, metavar='FIXTURES',
+                        help='accuracy/speed benchmark; optional directory of <label>_<hz>.wav fixtures')
 
     args = parser.parse_args()
 
+    if args.bench is not None:
+        bench(args.duration, args.samplerate, args.bench or None)
+        sys.exit(0)
+
+    if args.batch:
+        batch_pitch(args)
+        sys.exit(0)
+
+    if args.wav:
+        stream_pitch(args)
+        sys.exit(0)
+
+    if sd is None:
+        print("sounddevice is not installed; use --wav FILE")
+        sys.exit(1)
+
     if args.list_devices:
         print("Available devices:")
         for i, dev in enumerate(sd.query_devices()):
@@ -200,12 +496,6 @@ if __name__ == "__main__":
         sd.default.device = args.device
 
     if args.continuous:
-        print("Continuous mode. Ctrl+C to stop.")
-        while True:
-            try:
-                print(detect_pitch(args))
-            except KeyboardInterrupt:
-                print("\nStopped.")
-                break
+        stream_pitch(args)
     else:
         print(detect_pitch(args))
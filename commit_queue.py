@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Background job queue for server.py's GitHub commits.
+
+Jobs are processed by a pool of worker threads. Jobs for the same
+(owner, repo) run one at a time and in submission order, so concurrent
+commits to one repository cannot race on file or branch SHAs, while
+different repositories proceed in parallel.
+
+Every state change is appended to a JSON-lines journal, which is also how
+several server processes share one queue: each process tails the journal to
+keep its view of job state current, any process may submit by appending, and
+exactly one process (the holder of an flock on `<journal>.owner`) runs the
+workers. When the owner exits another process takes over and requeues jobs
+that were queued or running; a restart is handled the same way, so jobs
+survive it.
+
+State that only the owner's jobs change (e.g. caches and rate limits held in
+its memory) is published by the owner to `<journal>.status` whenever it
+changes, so every process can report the same view (owner_status()).
+"""
+import os
+import json
+import time
+import uuid
+import random
+import threading
+from collections import OrderedDict, deque
+
+from filelock import FileLock
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class CommitQueue:
+    """
+    Worker pool over a journaled, multi-process job queue.
+
+    `handler(job)` performs one job and returns a JSON-serialisable result or
+    raises. Exceptions for which `is_retryable(exc)` is true are retried up to
+    `max_attempts` times with jittered exponential backoff. Before every
+    attempt the worker sleeps for `pause()` seconds (e.g. until a rate limit
+    resets). `on_failure(job, exc)` is called once a job has finally failed,
+    and `on_takeover()` when this process becomes the owner, before any job
+    runs. The owner publishes `status()` (a JSON-serialisable dict) for
+    owner_status() in every process.
+    """
+
+    def __init__(self, journal_path, handler, workers=4, max_attempts=4,
+                 backoff=2.0, is_retryable=None, pause=None, on_failure=None,
+                 on_takeover=None, status=None, max_finished=10000, poll_interval=0.25):
+        self.journal_path = journal_path
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.is_retryable = is_retryable or (lambda exc: False)
+        self.pause = pause or (lambda: 0)
+        self.on_failure = on_failure
+        self.on_takeover = on_takeover
+        self.status = status
+        self.max_finished = max_finished
+        self.poll_interval = poll_interval
+        self.is_owner = False
+
+        self._file_lock = FileLock(journal_path + '.lock')  # serialises journal writers
+        self._owner_lock = FileLock(journal_path + '.owner')
+        self._lock = threading.Lock()                        # guards in-memory state
+        self._ready = threading.Condition(self._lock)
+        self._jobs = OrderedDict()
+        self._pending = {}        # repo key -> deque of job ids
+        self._queued = set()      # job ids waiting in some pending deque
+        self._runnable = deque()  # repo keys with pending jobs and no running job
+        self._busy = set()        # repo keys with a running job
+        self._poller = None
+        self._journal_ino = None
+        self._journal_pos = 0
+        self._journal_lines = 0
+        self._status_path = journal_path + '.status'
+        self._published = None
+        self._status_lock = threading.Lock()
+
+        with self._lock:
+            self._catch_up()
+
+    # --- JOURNAL ---
+
+    def _catch_up(self):
+        """Applies journal lines written since the last call (lock held)."""
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._journal_ino:
+            # Compacted by the owner: the new file restates every retained job
+            self._journal_ino = st.st_ino
+            self._journal_pos = 0
+            self._journal_lines = 0
+        if st.st_size <= self._journal_pos:
+            return
+        with open(self.journal_path, 'rb') as f:
+            f.seek(self._journal_pos)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # another process is mid-write
+                self._journal_pos += len(raw)
+                self._journal_lines += 1
+                try:
+                    record = json.loads(raw)
+                    job_id = record['id']
+                except (ValueError, KeyError, TypeError):
+                    # A torn line from a crash mid-write is skipped
+                    continue
+                job = self._jobs.setdefault(job_id, {})
+                job.update(record)
+                if self.is_owner and job.get('status') == QUEUED and job_id not in self._queued:
+                    self._push(job)
+
+    def _record(self, job, changes, enqueue=False):
+        """
+        Applies `changes` to `job` and appends them to the journal. With
+        `enqueue`, a new job is also handed to this process's workers if it
+        is the owner.
+        """
+        changes = dict(changes, updated=time.time())
+        line = (json.dumps(dict(changes, id=job['id'])) + '\n').encode('utf-8')
+        with self._file_lock, self._lock:
+            self._catch_up()
+            self._jobs.setdefault(job['id'], job)
+            job.update(changes)
+            with open(self.journal_path, 'ab') as f:
+                f.write(line)
+            self._journal_ino = os.stat(self.journal_path).st_ino
+            self._journal_pos += len(line)
+            self._journal_lines += 1
+            if enqueue and self.is_owner:
+                self._push(job)
+            if job.get('status') in FINISHED:
+                self._trim()
+            if self.is_owner and self._journal_lines > 4 * max(len(self._jobs), 1000):
+                self._compact()
+
+    def _compact(self):
+        """Rewrites the journal with one line per retained job (both locks held)."""
+        tmp = self.journal_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            for job in self._jobs.values():
+                f.write((json.dumps(job) + '\n').encode('utf-8'))
+        os.replace(tmp, self.journal_path)
+        st = os.stat(self.journal_path)
+        self._journal_ino = st.st_ino
+        self._journal_pos = st.st_size
+        self._journal_lines = len(self._jobs)
+
+    def _trim(self):
+        """Forgets the oldest finished jobs beyond `max_finished` (lock held)."""
+        if len(self._jobs) <= self.max_finished:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job.get('status') in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    # --- OWNERSHIP ---
+
+    def _take_ownership(self):
+        """Requeues every unfinished job, compacts the journal and starts the workers."""
+        if self.on_takeover:
+            self.on_takeover()
+        with self._file_lock, self._lock:
+            self._catch_up()
+            self.is_owner = True
+            for job in self._jobs.values():
+                if job.get('status') not in FINISHED:
+                    job['status'] = QUEUED
+                    self._push(job)
+            self._trim()
+            self._compact()
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"commit-worker-{i}", daemon=True).start()
+
+    def _poll(self):
+        """Competes for ownership and keeps this process's view of the journal current."""
+        while True:
+            if not self.is_owner and self._owner_lock.acquire(blocking=False):
+                self._take_ownership()
+            with self._lock:
+                self._catch_up()
+            if self.is_owner:
+                self._publish()
+            time.sleep(self.poll_interval)
+
+    def _publish(self):
+        """Writes the owner's status file if it changed (temp file + rename)."""
+        status = {"pid": os.getpid(), "workers": self.workers}
+        if self.status:
+            status.update(self.status())
+        with self._status_lock:
+            if status == self._published:
+                return
+            tmp = f"{self._status_path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(status, f)
+            os.replace(tmp, self._status_path)
+            self._published = status
+
+    # --- SCHEDULING ---
+
+    def _push(self, job):
+        key = tuple(job['repo'])
+        queue = self._pending.setdefault(key, deque())
+        queue.append(job['id'])
+        self._queued.add(job['id'])
+        if len(queue) == 1 and key not in self._busy:
+            self._runnable.append(key)
+            self._ready.notify()
+
+    def _take(self):
+        """Blocks until some repository has a runnable job; marks that repository busy."""
+        with self._lock:
+            while not self._runnable:
+                self._ready.wait()
+            key = self._runnable.popleft()
+            job_id = self._pending[key].popleft()
+            self._queued.discard(job_id)
+            self._busy.add(key)
+            job = self._jobs[job_id]
+        self._record(job, {"status": RUNNING})
+        return key, job
+
+    def _release(self, key):
+        with self._lock:
+            self._busy.discard(key)
+            if self._pending.get(key):
+                self._runnable.append(key)
+                self._ready.notify()
+            else:
+                self._pending.pop(key, None)
+
+    def _worker(self):
+        while True:
+            key, job = self._take()
+            try:
+                self._run(job)
+            finally:
+                self._release(key)
+
+    def _run(self, job):
+        attempts = job.get('attempts', 0)
+        while True:
+            wait = self.pause()
+            if wait > 0:
+                time.sleep(wait)
+            attempts += 1
+            try:
+                result = self.handler(job)
+            except Exception as e:
+                if not (self.is_retryable(e) and attempts < self.max_attempts):
+                    self._record(job, {"status": FAILED, "attempts": attempts, "error": str(e)})
+                    if self.on_failure:
+                        self.on_failure(job, e)
+                    return
+                self._record(job, {"attempts": attempts, "error": str(e)})
+                time.sleep(self.backoff * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5))
+                continue
+            self._record(job, {"status": SUCCEEDED, "attempts": attempts, "result": result, "error": None})
+            return
+
+    # --- API ---
+
+    def start(self):
+        """Starts competing for ownership; the owner runs the workers (idempotent)."""
+        with self._lock:
+            if self._poller is not None:
+                return
+            self._poller = threading.Thread(target=self._poll, name="commit-queue-poller", daemon=True)
+        self._poller.start()
+
+    def submit(self, kind, repo, params):
+        """Queues a job for `repo` ((owner, name)) and returns its id."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "repo": list(repo),
+            "params": params,
+            "status": QUEUED,
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "created": time.time()
+        }
+        self._record(job, {k: v for k, v in job.items() if k != 'id'}, enqueue=True)
+        self.start()
+        return job['id']
+
+    def get(self, job_id):
+        """Returns a job's public fields (without its params), or None."""
+        with self._lock:
+            self._catch_up()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k != 'params'}
+
+    def wait(self, job_id, timeout=None):
+        """Blocks until the job finishes or `timeout` passes; returns its public fields."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED:
+                return job
+            if deadline is not None and time.time() >= deadline:
+                return job
+            time.sleep(0.05)
+
+    def stats(self):
+        with self._lock:
+            self._catch_up()
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.get('status')] = counts.get(job.get('status'), 0) + 1
+        owner = self.owner_status() or {}
+        counts['workers'] = owner.get('workers', 0)
+        counts['owner_pid'] = owner.get('pid')
+        return counts
+
+    def owner_status(self):
+        """The owner's last published status ({"pid", "workers", ...status()}), or None."""
+        if self.is_owner:
+            self._publish()  # current, not one poll behind
+        try:
+            with open(self._status_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Cross-process exclusive lock on a lock file (fcntl.flock).
+
+The lock is also a thread lock, so it serialises threads of one process as
+well as separate processes (e.g. gunicorn workers sharing server.py's data
+files). The lock file is reopened after fork, because a descriptor inherited
+across fork would share the parent's flock. Where fcntl is unavailable the
+lock only serialises threads.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: single-process locking only
+    fcntl = None
+
+
+class FileLock:
+    """Reentrant-per-thread exclusive lock backed by flock on `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+        self._pid = None
+
+    def _fileno(self):
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def acquire(self, blocking=True):
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            try:
+                fcntl.flock(self._fileno(), flags)
+            except BlockingIOError:
+                self._thread_lock.release()
+                return False
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._fileno(), fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Batched, rate-limited git publishing for files an engine writes.
+
+Instead of `git add . && git commit && git push` after every file (a full
+working-tree scan plus a network round trip each time), the engine registers
+each file it writes with add(), and calls tick() regularly:
+
+- only registered paths are staged (`git add -- <paths>`), never the tree;
+- a commit is made once `batch_size` files are pending or the oldest pending
+  file has waited `batch_window` seconds;
+- a batch that stages no change (files rewritten with identical content) is
+  dropped without a commit;
+- commits are pushed at most once per `push_interval` seconds; a failed push
+  is retried on a later tick;
+- on the first tick, local commits the push target lacks (left by a restart
+  before they were pushed) are counted, so they are pushed as well.
+
+With `dry_run` the git commands are printed instead of run.
+
+  python git_publisher.py --self-test   # publishes to a temporary bare repo
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+
+ARG_CHUNK = 500  # paths per `git add` invocation
+
+
+class GitPublisher:
+    def __init__(self, repo_dir, remote, branch="main", batch_size=20, batch_window=600,
+                 push_interval=900, dry_run=False, message="Infinity Deep Research Update", log=print):
+        self.repo_dir = repo_dir
+        self.remote = remote
+        self.branch = branch
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.push_interval = push_interval
+        self.dry_run = dry_run
+        self.message = message
+        self.log = log
+        self._lock = threading.Lock()
+        self._pending = {}            # path -> time it was added
+        self._unpushed = 0
+        self._checked = False         # commits ahead of the push target counted yet
+        self._last_push = 0.0
+        self.stats = {"files": 0, "commits": 0, "unchanged": 0, "pushes": 0, "push_errors": 0, "commit_errors": 0}
+
+    def _git(self, *args):
+        cmd = ["git", "-C", self.repo_dir] + list(args)
+        if self.dry_run:
+            shown = cmd if len(cmd) < 12 else cmd[:11] + [f"... (+{len(cmd) - 11} paths)"]
+            self.log("[dry-run] " + " ".join(shown))
+            return True
+        r = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if r.returncode != 0:
+            self.log(f"[publish] git {args[0]} failed: {r.stdout.strip()[-300:]}")
+        return r.returncode == 0
+
+    def _ahead(self):
+        """Local commits missing from `branch` on the push target (1 if that cannot be told)."""
+        def git(*args):
+            return subprocess.run(["git", "-C", self.repo_dir] + list(args),
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+        if git("rev-parse", "--verify", "-q", "HEAD").returncode != 0:
+            return 0  # no commits yet
+        r = git("ls-remote", self.remote, f"refs/heads/{self.branch}")
+        if r.returncode != 0:
+            return 1  # target unreachable: schedule a push, retried until it is
+        target = r.stdout.split()[0] if r.stdout.strip() else None
+        r = git("rev-list", "--count", f"{target}..HEAD" if target else "HEAD")
+        if r.returncode != 0:
+            return 1  # target head unknown locally; let the push sort it out
+        return int(r.stdout.strip() or 0)
+
+    def _check_unpushed(self):
+        # _unpushed only counts this process's commits; done lazily so building
+        # a publisher (e.g. at import time) makes no network call
+        if self._checked:
+            return
+        self._checked = True
+        ahead = 0 if self.dry_run else self._ahead()
+        if ahead > self._unpushed:
+            self.log(f"[publish] {ahead} commit(s) not yet on {self.remote} {self.branch}, scheduling a push")
+            self._unpushed = ahead
+
+    def _staged(self):
+        """True if the index holds changes to commit."""
+        if self.dry_run:
+            return True
+        r = subprocess.run(["git", "-C", self.repo_dir, "diff", "--cached", "--quiet"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return r.returncode != 0
+
+    # --- API ---
+
+    def add(self, path):
+        """Registers a written file for the next commit."""
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.repo_dir))
+        with self._lock:
+            self._pending.setdefault(rel, time.time())
+
+    def recover(self, subdir):
+        """Registers untracked files under `subdir` (e.g. left by a crash before publishing)."""
+        r = subprocess.run(["git", "-C", self.repo_dir, "ls-files", "--others", "--exclude-standard", "-z", "--", subdir],
+                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        paths = [p for p in r.stdout.decode("utf-8", "replace").split("\0") if p]
+        with self._lock:
+            for p in paths:
+                self._pending.setdefault(p, time.time())
+        return len(paths)
+
+    def commit_due(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            if not self._pending:
+                return False
+            return len(self._pending) >= self.batch_size or now - min(self._pending.values()) >= self.batch_window
+
+    def push_due(self, now=None):
+        now = now or time.time()
+        self._check_unpushed()
+        return self._unpushed > 0 and now - self._last_push >= self.push_interval
+
+    def commit(self):
+        """Stages and commits every pending file; returns the number committed."""
+        with self._lock:
+            paths = sorted(self._pending)
+            self._pending.clear()
+        if not paths:
+            return 0
+        ok = all(self._git("add", "--", *paths[i:i + ARG_CHUNK]) for i in range(0, len(paths), ARG_CHUNK))
+        if ok and not self._staged():
+            # Nothing changed; retrying would fail with "nothing to commit" forever
+            self.stats["unchanged"] += 1
+            self.log(f"[publish] {len(paths)} files unchanged, nothing to commit")
+            return 0
+        ok = ok and self._git("commit", "-q", "-m", f"{self.message} ({len(paths)} files)")
+        if not ok:
+            self.stats["commit_errors"] += 1
+            with self._lock:  # keep them for the next attempt
+                for p in paths:
+                    self._pending.setdefault(p, time.time())
+            return 0
+        self._unpushed += 1
+        self.stats["commits"] += 1
+        self.stats["files"] += len(paths)
+        self.log(f"[publish] committed {len(paths)} files")
+        return len(paths)
+
+    def push(self):
+        self._last_push = time.time()
+        if not self._git("push", "-q", self.remote, f"HEAD:{self.branch}"):
+            self.stats["push_errors"] += 1
+            return False
+        self.stats["pushes"] += 1
+        self.log(f"[publish] pushed {self._unpushed} commit(s) → {self.remote} {self.branch}")
+        self._unpushed = 0
+        return True
+
+    def tick(self):
+        """Commits and/or pushes if due; call after each written file or cycle."""
+        if self.commit_due():
+            self.commit()
+        if self.push_due():
+            self.push()
+
+    def flush(self):
+        """Commits everything pending and pushes regardless of the intervals (e.g. on exit)."""
+        self.commit()
+        self._check_unpushed()
+        if self._unpushed:
+            self.push()
+
+    def snapshot(self):
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self.stats, pending=pending, unpushed=self._unpushed)
+
+
+# --- SELF-TEST ---
+
+def self_test():
+    def git(*args, cwd=None):
+        return subprocess.run(["git"] + list(args), cwd=cwd, check=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.STDOUT, text=True).stdout
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bare = os.path.join(tmp, "remote.git")
+        work = os.path.join(tmp, "work")
+        git("init", "-q", "--bare", "-b", "main", bare)
+        git("init", "-q", "-b", "main", work)
+        git("config", "user.name", "publisher-test", cwd=work)
+        git("config", "user.email", "publisher-test@localhost", cwd=work)
+        os.makedirs(os.path.join(work, "papers"))
+        with open(os.path.join(work, "unrelated.txt"), "w") as f:
+            f.write("must not be committed\n")
+
+        pub = GitPublisher(work, bare, batch_size=5, batch_window=3600, push_interval=3600, log=lambda m: None)
+        for i in range(12):
+            path = os.path.join(work, "papers", f"p{i:03d}.txt")
+            with open(path, "w") as f:
+                f.write(f"paper {i}\n")
+            pub.add(path)
+            pub.tick()
+        # 12 files, batches of 5: two commits, one push (the interval blocks the second), 2 pending
+        assert pub.stats["commits"] == 2, pub.stats
+        assert pub.stats["pushes"] == 1, pub.stats
+        assert pub.snapshot()["pending"] == 2
+        pub.flush()
+        remote_log = git("--git-dir", bare, "log", "--oneline", "main").splitlines()
+        remote_files = git("--git-dir", bare, "ls-tree", "-r", "--name-only", "main").split()
+        assert len(remote_log) == 3, remote_log
+        assert len(remote_files) == 12 and "unrelated.txt" not in remote_files, remote_files
+
+        # A crash leaves untracked papers behind: recover() picks up exactly those
+        with open(os.path.join(work, "papers", "orphan.txt"), "w") as f:
+            f.write("orphan\n")
+        assert pub.recover("papers") == 1
+        pub.flush()
+        assert "papers/orphan.txt" in git("--git-dir", bare, "ls-tree", "-r", "--name-only", "main")
+
+        # A file rewritten with the same content stages nothing: the batch is dropped, not retried
+        with open(os.path.join(work, "papers", "orphan.txt"), "w") as f:
+            f.write("orphan\n")
+        pub.add(os.path.join(work, "papers", "orphan.txt"))
+        errors = pub.stats["commit_errors"]
+        pub.flush()
+        assert pub.stats["commit_errors"] == errors and pub.stats["unchanged"] == 1, pub.stats
+        assert pub.snapshot()["pending"] == 0
+
+        # Commits left unpushed by a previous run are found and pushed by a new publisher
+        with open(os.path.join(work, "papers", "late.txt"), "w") as f:
+            f.write("late\n")
+        git("add", "papers/late.txt", cwd=work)
+        git("commit", "-q", "-m", "left unpushed", cwd=work)
+        restarted = GitPublisher(work, bare, push_interval=3600, log=lambda m: None)
+        restarted.tick()
+        assert restarted.stats["pushes"] == 1, restarted.stats
+        assert "papers/late.txt" in git("--git-dir", bare, "ls-tree", "-r", "--name-only", "main")
+        restarted = GitPublisher(work, bare, push_interval=0, log=lambda m: None)
+        restarted.tick()
+        assert restarted.stats["pushes"] == 0, restarted.stats
+
+        # Dry run touches nothing
+        dry = GitPublisher(work, bare, batch_size=1, push_interval=0, dry_run=True, log=lambda m: None)
+        with open(os.path.join(work, "papers", "dry.txt"), "w") as f:
+            f.write("dry\n")
+        dry.add(os.path.join(work, "papers", "dry.txt"))
+        dry.tick()
+        assert "dry.txt" not in git("--git-dir", bare, "ls-tree", "-r", "--name-only", "main")
+        assert "?? papers/dry.txt" in git("status", "--porcelain", cwd=work)
+    print("self-test passed: batched commits, interval-limited pushes, recovery, unchanged batches, restart push and dry run")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched git publisher")
+    parser.add_argument("--self-test", action="store_true", help="publish to a temporary local bare repo")
+    args = parser.parse_args()
+    if args.self_test:
+        self_test()
+    else:
+        parser.print_help()
+        sys.exit(1)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+GitHub REST helpers shared by server.py.
+
+All calls go through one pooled requests.Session. commit_files() pushes many
+files as a single commit through the Git Data API (blobs -> tree -> commit ->
+ref update) instead of one Contents API GET + PUT per file.
+
+Every response updates RATE_LIMIT from the X-RateLimit-* / Retry-After
+headers so background workers can hold off before the quota runs out.
+
+GITHUB_API_URL can point the client at a local stand-in such as
+github_stub.py for testing.
+"""
+import os
+import json
+import time
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from blob_cache import git_blob_sha
+
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+BLOB_WORKERS = 8
+TIMEOUT = 30
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+GITHUB_LATENCY = metrics.histogram(
+    'github_api_request_duration_seconds', 'GitHub API call latency', ('method', 'status'))
+
+
+class GitHubError(Exception):
+    """A GitHub API call returned an unexpected status code."""
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+    @property
+    def retryable(self):
+        """Rate limiting and server-side errors are worth retrying later."""
+        if self.status_code in RETRYABLE_STATUS:
+            return True
+        return self.status_code == 403 and 'rate limit' in (self.message or '').lower()
+
+
+def is_retryable(exc):
+    """True for errors a later retry may fix: GitHub rate limits / 5xx and network failures."""
+    if isinstance(exc, requests.exceptions.RequestException):
+        return True
+    return getattr(exc, 'retryable', False)
+
+
+class RateLimitState:
+    """Latest quota seen in GitHub response headers, shared by all clients."""
+
+    def __init__(self, floor=10):
+        self.floor = floor
+        self.remaining = None
+        self.reset_at = None
+        self.retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, response):
+        headers = response.headers
+        with self._lock:
+            try:
+                if 'X-RateLimit-Remaining' in headers:
+                    self.remaining = int(headers['X-RateLimit-Remaining'])
+                if 'X-RateLimit-Reset' in headers:
+                    self.reset_at = float(headers['X-RateLimit-Reset'])
+                if 'Retry-After' in headers:
+                    self.retry_at = time.time() + float(headers['Retry-After'])
+            except ValueError:
+                pass
+
+    def delay(self):
+        """Seconds to wait before the next call: until Retry-After passes or the quota resets."""
+        now = time.time()
+        with self._lock:
+            wait = max(0.0, self.retry_at - now)
+            if self.remaining is not None and self.remaining <= self.floor and self.reset_at:
+                wait = max(wait, self.reset_at - now)
+            return wait
+
+    def snapshot(self):
+        with self._lock:
+            return {"remaining": self.remaining, "reset_at": self.reset_at}
+
+
+def make_session(pool_size=BLOB_WORKERS):
+    """Creates a session whose connection pool can serve `pool_size` threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+SESSION = make_session()
+RATE_LIMIT = RateLimitState()
+
+
+class GitHubClient:
+    """Thin wrapper over the GitHub REST API for one token."""
+
+    def __init__(self, token, api_url=None, session=None, max_workers=BLOB_WORKERS):
+        self.token = token
+        self.api_url = (api_url or GITHUB_API_URL).rstrip('/')
+        self.session = session or SESSION
+        self.max_workers = max_workers
+
+    @property
+    def headers(self):
+        return {
+            "Authorization": f"token {self.token}",
+            "Content-Type": "application/json",
+            "X-GitHub-Api-Version": "2022-11-28"
+        }
+
+    def request(self, method, path, payload=None):
+        """Sends one API request and returns the raw response."""
+        url = f"{self.api_url}{path}"
+        data = json.dumps(payload) if payload is not None else None
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, headers=self.headers, data=data, timeout=TIMEOUT)
+        except requests.exceptions.RequestException:
+            GITHUB_LATENCY.observe(time.perf_counter() - start, method=method, status='error')
+            raise
+        GITHUB_LATENCY.observe(time.perf_counter() - start, method=method, status=response.status_code)
+        RATE_LIMIT.update(response)
+        return response
+
+    def call(self, method, path, payload=None, expected=(200, 201)):
+        """Sends one API request and returns its JSON body, raising GitHubError otherwise."""
+        response = self.request(method, path, payload)
+        if response.status_code not in expected:
+            try:
+                message = response.json().get('message', response.text)
+            except ValueError:
+                message = response.text
+            raise GitHubError(response.status_code, message)
+        return response.json()
+
+    # --- CONTENTS API (single file) ---
+
+    def commit_file(self, owner, repo, path, html_content, message, cache=None):
+        """
+        Commits a new file or updates an existing one through the Contents API.
+        Returns the PUT response, or None if `cache` shows the content is
+        already committed.
+
+        With a BlobShaCache, a cached SHA replaces the pre-commit GET; if GitHub
+        rejects it as stale (409/422) the entry is dropped and the commit is
+        retried once with a freshly fetched SHA.
+        """
+        url_path = f"/repos/{owner}/{repo}/contents/{path}"
+        content_bytes = html_content.encode('utf-8')
+        payload = {
+            "message": message,
+            "content": base64.b64encode(content_bytes).decode('utf-8')
+        }
+        key = (owner, repo, path)
+        content_sha = git_blob_sha(content_bytes)
+
+        cached = cache.lookup(key) if cache else None
+        if cached and cached['sha'] == content_sha and cached['content_sha'] == content_sha:
+            cache.count('skipped')
+            return None
+
+        if cached:
+            payload['sha'] = cached['sha']
+        else:
+            self._fill_sha(url_path, payload)
+        response = self.request('PUT', url_path, payload)
+
+        if cached and response.status_code in (409, 422):
+            cache.count('conflicts')
+            cache.invalidate(key)
+            payload.pop('sha', None)
+            self._fill_sha(url_path, payload)
+            response = self.request('PUT', url_path, payload)
+
+        if cache and response.status_code in (200, 201):
+            sha = (response.json().get('content') or {}).get('sha', content_sha)
+            cache.put(key, sha, content_sha)
+        return response
+
+    def _fill_sha(self, url_path, payload):
+        """Adds the existing file SHA to `payload` if the file exists."""
+        try:
+            response = self.request('GET', url_path)
+            if response.status_code == 200:
+                payload['sha'] = response.json().get('sha')
+        except requests.exceptions.RequestException as e:
+            print(f"Error checking file existence: {e}")
+            # Continue without SHA if there's an error (will create new file)
+
+    # --- GIT DATA API (many files, one commit) ---
+
+    def create_blob(self, owner, repo, content):
+        """Uploads one blob and returns its SHA."""
+        payload = {
+            "content": base64.b64encode(content.encode('utf-8')).decode('ascii'),
+            "encoding": "base64"
+        }
+        return self.call('POST', f"/repos/{owner}/{repo}/git/blobs", payload)['sha']
+
+    def commit_files(self, owner, repo, files, message, branch=None, cache=None):
+        """
+        Commits `files` (a list of {"path", "html"}) as a single commit on
+        `branch` (the repository's default branch if None).
+
+        Blobs are created concurrently over a bounded pool; the tree, commit and
+        ref update follow in sequence. Returns a summary dict, with
+        "commit_sha" None if nothing changed.
+
+        `cache` (a BlobShaCache, which tracks the default branch) is only used
+        when no branch is given: files whose content is already committed are
+        left out, and the new blob SHAs are recorded.
+        """
+        base = f"/repos/{owner}/{repo}"
+        skipped = []
+        if branch is None and cache is not None:
+            changed = []
+            for f in files:
+                key = (owner, repo, f['path'])
+                if cache.is_unchanged(key, git_blob_sha(f['html'].encode('utf-8'))):
+                    cache.count('skipped')
+                    skipped.append(f['path'])
+                else:
+                    changed.append(f)
+            files = changed
+        else:
+            cache = None
+        if not files:
+            return {"branch": branch, "commit_sha": None, "files": [], "skipped": skipped}
+
+        if branch is None:
+            branch = self.call('GET', base)['default_branch']
+
+        head_sha = self.call('GET', f"{base}/git/ref/heads/{branch}")['object']['sha']
+        base_tree = self.call('GET', f"{base}/git/commits/{head_sha}")['tree']['sha']
+
+        workers = max(1, min(self.max_workers, len(files)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            blob_shas = list(pool.map(lambda f: self.create_blob(owner, repo, f['html']), files))
+
+        tree = [
+            {"path": f['path'], "mode": "100644", "type": "blob", "sha": blob_sha}
+            for f, blob_sha in zip(files, blob_shas)
+        ]
+        tree_sha = self.call('POST', f"{base}/git/trees", {"base_tree": base_tree, "tree": tree})['sha']
+
+        commit_sha = self.call('POST', f"{base}/git/commits", {
+            "message": message,
+            "tree": tree_sha,
+            "parents": [head_sha]
+        })['sha']
+
+        self.call('PATCH', f"{base}/git/refs/heads/{branch}", {"sha": commit_sha})
+
+        if cache is not None:
+            for f, blob_sha in zip(files, blob_shas):
+                cache.put((owner, repo, f['path']), blob_sha, blob_sha)
+
+        return {
+            "branch": branch,
+            "commit_sha": commit_sha,
+            "tree_sha": tree_sha,
+            "parent_sha": head_sha,
+            "files": [{"path": f['path'], "sha": s} for f, s in zip(files, blob_shas)],
+            "skipped": skipped
+        }
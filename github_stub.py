@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the parts of the GitHub REST API used by server.py.
+
+Implements, in memory:
+  GET  /repos/{owner}/{repo}
+  GET  /repos/{owner}/{repo}/contents/{path}     PUT (create/update)
+  GET  /repos/{owner}/{repo}/git/ref/heads/{branch}
+  PATCH /repos/{owner}/{repo}/git/refs/heads/{branch}
+  GET/POST /repos/{owner}/{repo}/git/commits
+  POST /repos/{owner}/{repo}/git/blobs, /git/trees
+
+Blob SHAs are real git blob hashes. Every request is counted per
+"METHOD kind" so callers can check how many round trips they made. With a
+rate limit, responses carry X-RateLimit-Remaining / X-RateLimit-Reset and
+requests beyond the quota get 403 until the window resets.
+
+Usage:
+  python github_stub.py --port 8765 [--latency 0.05] [--rate-limit 5000]
+  GITHUB_API_URL=http://127.0.0.1:8765 python server.py
+"""
+import re
+import sys
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from blob_cache import git_blob_sha
+
+
+def object_sha(kind, payload):
+    return hashlib.sha1(f"{kind}:{json.dumps(payload, sort_keys=True)}".encode('utf-8')).hexdigest()
+
+
+class StubRepo:
+    """One repository: blobs, flat path->blob trees, commits and branch refs."""
+
+    def __init__(self, branch='main'):
+        self.default_branch = branch
+        self.blobs = {}
+        self.trees = {}
+        self.commits = {}
+        empty_tree = object_sha('tree', {})
+        self.trees[empty_tree] = {}
+        root = object_sha('commit', {"tree": empty_tree, "parents": [], "message": "init"})
+        self.commits[root] = {"tree": empty_tree, "parents": [], "message": "init"}
+        self.refs = {branch: root}
+
+    def head_files(self, branch=None):
+        commit = self.commits[self.refs[branch or self.default_branch]]
+        return self.trees[commit['tree']]
+
+    def add_commit(self, tree, parents, message):
+        payload = {"tree": tree, "parents": parents, "message": message, "time": time.time()}
+        sha = object_sha('commit', payload)
+        self.commits[sha] = {"tree": tree, "parents": parents, "message": message}
+        return sha
+
+
+class StubState:
+    def __init__(self, latency=0.0, rate_limit=None, rate_window=60.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.repos = {}
+        self.calls = Counter()
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.rate_used = 0
+        self.rate_reset = time.time() + rate_window
+
+    def repo(self, owner, name):
+        return self.repos.setdefault((owner, name), StubRepo())
+
+    def take_quota(self):
+        """Consumes one request of quota; returns (allowed, rate limit headers)."""
+        if self.rate_limit is None:
+            return True, {}
+        now = time.time()
+        if now >= self.rate_reset:
+            self.rate_used = 0
+            self.rate_reset = now + self.rate_window
+        allowed = self.rate_used < self.rate_limit
+        if allowed:
+            self.rate_used += 1
+        headers = {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(self.rate_limit - self.rate_used),
+            "X-RateLimit-Reset": str(int(self.rate_reset) + 1)
+        }
+        return allowed, headers
+
+
+ROUTES = [
+    ('repo', re.compile(r'^/repos/([^/]+)/([^/]+)$')),
+    ('contents', re.compile(r'^/repos/([^/]+)/([^/]+)/contents/(.+)$')),
+    ('ref', re.compile(r'^/repos/([^/]+)/([^/]+)/git/refs?/heads/(.+)$')),
+    ('commit', re.compile(r'^/repos/([^/]+)/([^/]+)/git/commits(?:/([0-9a-f]+))?$')),
+    ('blob', re.compile(r'^/repos/([^/]+)/([^/]+)/git/blobs$')),
+    ('tree', re.compile(r'^/repos/([^/]+)/([^/]+)/git/trees$')),
+]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def dispatch(self):
+        path = self.path.split('?', 1)[0]
+        for kind, pattern in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            return self.reply(404, {"message": "Not Found"})
+
+        state = self.state
+        state.calls[f"{self.command} {kind}"] += 1
+        if state.latency:
+            time.sleep(state.latency)
+        payload = self.body()
+        with state.lock:
+            allowed, headers = state.take_quota()
+            if not allowed:
+                status, body = 403, {"message": "API rate limit exceeded"}
+            else:
+                repo = state.repo(match.group(1), match.group(2))
+                handler = getattr(self, f"handle_{kind}")
+                status, body = handler(repo, self.command, match.groups()[2:], payload)
+        self.reply(status, body, headers)
+
+    do_GET = do_PUT = do_POST = do_PATCH = dispatch
+
+    # --- ROUTE HANDLERS (called with the state lock held) ---
+
+    def handle_repo(self, repo, method, args, payload):
+        return 200, {"default_branch": repo.default_branch}
+
+    def handle_contents(self, repo, method, args, payload):
+        path = args[0]
+        files = repo.head_files()
+        if method == 'GET':
+            if path not in files:
+                return 404, {"message": "Not Found"}
+            sha = files[path]
+            return 200, {"path": path, "sha": sha, "content": base64.b64encode(repo.blobs[sha]).decode('ascii')}
+        if method != 'PUT':
+            return 405, {"message": "Method Not Allowed"}
+        current = files.get(path)
+        if current is not None and payload.get('sha') != current:
+            return 409, {"message": f"{path} does not match {payload.get('sha')}"}
+        data = base64.b64decode(payload.get('content', ''))
+        blob = git_blob_sha(data)
+        repo.blobs[blob] = data
+        tree = dict(files)
+        tree[path] = blob
+        tree_sha = object_sha('tree', tree)
+        repo.trees[tree_sha] = tree
+        branch = repo.default_branch
+        commit = repo.add_commit(tree_sha, [repo.refs[branch]], payload.get('message', ''))
+        repo.refs[branch] = commit
+        return (201 if current is None else 200), {"content": {"path": path, "sha": blob}, "commit": {"sha": commit}}
+
+    def handle_ref(self, repo, method, args, payload):
+        branch = args[0]
+        if branch not in repo.refs:
+            return 404, {"message": "Not Found"}
+        if method == 'GET':
+            return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": repo.refs[branch], "type": "commit"}}
+        new = payload.get('sha')
+        if new not in repo.commits:
+            return 422, {"message": "Object does not exist"}
+        if not payload.get('force') and repo.refs[branch] not in repo.commits[new]['parents']:
+            return 422, {"message": "Update is not a fast forward"}
+        repo.refs[branch] = new
+        return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": new, "type": "commit"}}
+
+    def handle_commit(self, repo, method, args, payload):
+        if method == 'GET':
+            commit = repo.commits.get(args[0])
+            if commit is None:
+                return 404, {"message": "Not Found"}
+            return 200, {"sha": args[0], "tree": {"sha": commit['tree']}, "parents": [{"sha": p} for p in commit['parents']]}
+        if payload.get('tree') not in repo.trees:
+            return 422, {"message": "Tree does not exist"}
+        sha = repo.add_commit(payload['tree'], payload.get('parents', []), payload.get('message', ''))
+        return 201, {"sha": sha}
+
+    def handle_blob(self, repo, method, args, payload):
+        content = payload.get('content', '')
+        if payload.get('encoding') == 'base64':
+            data = base64.b64decode(content)
+        else:
+            data = content.encode('utf-8')
+        sha = git_blob_sha(data)
+        repo.blobs[sha] = data
+        return 201, {"sha": sha}
+
+    def handle_tree(self, repo, method, args, payload):
+        tree = dict(repo.trees.get(payload.get('base_tree'), {}))
+        for item in payload.get('tree', []):
+            if item.get('sha') not in repo.blobs:
+                return 422, {"message": f"Blob {item.get('sha')} does not exist"}
+            tree[item['path']] = item['sha']
+        sha = object_sha('tree', tree)
+        repo.trees[sha] = tree
+        return 201, {"sha": sha}
+
+
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-request (e.g. a load test stopping) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, rate_limit=None, rate_window=60.0):
+    """Builds a stub server (port 0 picks a free port); its state is `server.state`."""
+    state = StubState(latency, rate_limit, rate_window)
+    handler = type('BoundStubHandler', (StubHandler,), {"state": state})
+    server = StubServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_stub(latency=0.0, rate_limit=None, rate_window=60.0):
+    """Starts a stub server on a free port in a background thread; returns (server, base_url)."""
+    server = make_server(latency=latency, rate_limit=rate_limit, rate_window=rate_window)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local GitHub API stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--rate-limit', type=int, default=None, help="requests allowed per window")
+    parser.add_argument('--rate-window', type=float, default=60.0, help="rate limit window in seconds")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.rate_limit, args.rate_window)
+    print(f"--- GitHub stub listening on http://{args.host}:{args.port} ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
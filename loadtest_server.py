@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Load test for `server.py --serve` against a local GitHub stub.
+
+For each worker count, starts the server under gunicorn in a scratch
+directory (its own config.json, logs and journals) with GITHUB_API_URL
+pointing at an in-process github_stub, drives it from concurrent clients for
+a fixed time and prints requests/second and latency percentiles.
+
+Clients run as threads spread over `--procs` processes, so the load driver
+is not capped by one interpreter's GIL. The client and server CPU columns
+(% of all cores over the run) show which side saturated: if the clients are
+near 100% the numbers measure the driver, not the server, and if the two
+together fill the machine (e.g. on one core) more workers cannot help. The
+server figure includes its startup.
+
+The request mix is dashboard polls (/api/logs, /api/data) plus queued commits
+(/api/bot/commit_html), which also exercises cross-worker log appends and the
+shared commit queue journal.
+
+  python loadtest_server.py --workers 1 4 8 --clients 32 --procs 4 --duration 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+import requests
+
+from github_stub import start_stub
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base}/api/status", timeout=1).ok:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not start")
+
+
+def client(base, deadline, commit_ratio, results):
+    session = requests.Session()
+    latencies, errors = [], 0
+    n = 0
+    while time.time() < deadline:
+        n += 1
+        roll = random.random()
+        start = time.perf_counter()
+        try:
+            if roll < commit_ratio:
+                r = session.post(f"{base}/api/bot/commit_html", json={
+                    "owner": "load", "repo": f"repo{n % 4}",
+                    "path": f"page{n % 50}.html", "html": f"<p>{n}</p>",
+                    "bot_id": "Load Bot"
+                }, timeout=10)
+            elif roll < 0.5 + commit_ratio / 2:
+                r = session.get(f"{base}/api/logs", params={"limit": 50}, timeout=10)
+            else:
+                r = session.get(f"{base}/api/data", params={"limit": 50}, timeout=10)
+            ok = r.status_code in (200, 202, 304)
+        except requests.exceptions.RequestException:
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors += 1
+    results.append((latencies, errors))
+
+
+def client_process(base, deadline, commit_ratio, clients, out):
+    """Runs `clients` client threads; puts (latencies, errors, cpu seconds) on `out`."""
+    results = []
+    threads = [threading.Thread(target=client, args=(base, deadline, commit_ratio, results)) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out.put(([l for lat, _ in results for l in lat], sum(e for _, e in results), time.process_time()))
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(workers, clients, duration, commit_ratio, stub_url, procs=4):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'config.json'), 'w') as f:
+            json.dump({"GITHUB_PAT": "stub-token"}, f)
+        env = dict(os.environ, GITHUB_API_URL=stub_url)
+        proc = subprocess.Popen(
+            [sys.executable, SERVER, '--serve', '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers)],
+            cwd=tmp, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_ready(base)
+            ctx = multiprocessing.get_context('fork')
+            out = ctx.Queue()
+            deadline = time.time() + duration
+            shares = [clients // procs + (i < clients % procs) for i in range(procs)]
+            drivers = [ctx.Process(target=client_process, args=(base, deadline, commit_ratio, n, out))
+                       for n in shares if n]
+            for d in drivers:
+                d.start()
+            results = [out.get() for _ in drivers]
+            for d in drivers:
+                d.join()
+            jobs = requests.get(f"{base}/api/status", timeout=5).json().get('commit_jobs', {})
+        finally:
+            # Client processes are reaped above, so the next delta is the server tree alone
+            before = children_cpu()
+            proc.terminate()
+            proc.wait(timeout=30)
+            server_cpu = children_cpu() - before
+
+    latencies = sorted(l for lat, _, _ in results for l in lat)
+    errors = sum(e for _, e, _ in results)
+    cores = os.cpu_count() or 1
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "errors": errors,
+        "jobs_succeeded": jobs.get('succeeded', 0),
+        "client_cpu_pct": 100.0 * sum(cpu for _, _, cpu in results) / (duration * cores),
+        "server_cpu_pct": 100.0 * server_cpu / (duration * cores)
+    }
+
+
+def saturated(r):
+    """Which side limited the run: the load driver, the whole machine, or neither ('-')."""
+    if r['client_cpu_pct'] >= 80:
+        return "client"
+    if r['client_cpu_pct'] + r['server_cpu_pct'] >= 90:
+        return "machine"
+    return "-"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test server.py --serve against a GitHub stub")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--procs', type=int, default=4, help="client processes the clients are spread over")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--commit-ratio', type=float, default=0.1)
+    parser.add_argument('--stub-latency', type=float, default=0.02, help="seconds added to every GitHub stub call")
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub(latency=args.stub_latency)
+    print(f"{os.cpu_count()} core(s); clients: {args.clients} threads over {args.procs} process(es)")
+    print(f"{'workers':>7} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'jobs ok':>8} "
+          f"{'client cpu%':>11} {'server cpu%':>11} {'saturated':>9}")
+    for n in args.workers:
+        r = run(n, args.clients, args.duration, args.commit_ratio, stub_url, args.procs)
+        print(f"{r['workers']:>7} {r['requests']:>9} {r['rps']:>9.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7} "
+              f"{r['jobs_succeeded']:>8} {r['client_cpu_pct']:>11.0f} {r['server_cpu_pct']:>11.0f} {saturated(r):>9}")
+    stub.shutdown()
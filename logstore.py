@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Append-only bot log store for server.py.
+
+Entries are written as JSON lines into numbered segment files
+(segment_000001.jsonl, segment_000002.jsonl, ...). A segment is rotated once it
+holds `segment_max_entries` lines, so no single file grows without bound and
+an append never touches more than the open segment. The newest entries are
+kept in an in-memory tail so the dashboard can be served without reading disk,
+and an in-memory index answers filtered, paginated queries over the full
+history (see LogStore.query).
+
+Several processes may share one directory (e.g. gunicorn workers): appends
+and rotation are serialised by an flock on `<directory>/.lock`, and every
+read first catches up on complete lines other processes have appended. A
+partial last line left by a crash mid-write is truncated (under the lock)
+before the next append, so it can never be glued onto a new entry.
+
+Run `python logstore.py --bench 1000000` to measure append latency as the
+log grows, and `python logstore.py --fault-test` to check recovery from a
+torn segment tail.
+"""
+import os
+import json
+import datetime
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from filelock import FileLock
+
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".jsonl"
+LEGACY_SEGMENT = 0  # reserved for entries imported from system_data.json
+LEGACY_TIME_FORMAT = "%d/%m/%Y, %H:%M:%S"
+INDEXED_FIELDS = ("bot_id", "duty", "status")
+
+
+def segment_name(number):
+    return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+
+def list_segments(directory):
+    """Returns the segment numbers present in `directory`, oldest first."""
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+            try:
+                numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+    return sorted(numbers)
+
+
+def entry_time(entry, default=0.0):
+    """Epoch seconds for an entry: its `ts` field, else its legacy timestamp string."""
+    ts = entry.get("ts")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    try:
+        return datetime.datetime.strptime(entry.get("timestamp", ""), LEGACY_TIME_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+class LogStore:
+    """
+    Append-only JSON-lines log with segment rotation, an in-memory tail and an
+    in-memory index.
+
+    Every entry gets a sequence number (0 = oldest). The index keeps, per
+    sequence number, the entry's file location, its time and interned ids of
+    the INDEXED_FIELDS, plus per-value posting lists, so filtered pages can be
+    answered by touching only the entries that are returned.
+    """
+
+    def __init__(self, directory, segment_max_entries=100000, tail_size=1000):
+        self.directory = directory
+        self.segment_max_entries = segment_max_entries
+        self._lock = threading.Lock()
+        self._tail_size = tail_size
+        self._fh = None
+        self._fh_segment = None
+        os.makedirs(directory, exist_ok=True)
+        self._file_lock = FileLock(os.path.join(directory, '.lock'))
+        self._load()
+
+    # --- STARTUP ---
+
+    def _reset(self):
+        self._tail = deque(maxlen=self._tail_size)
+        self._count = 0
+        self._segment_no = 1
+        self._segment_entries = 0
+        self._seg = array('I')
+        self._off = array('Q')
+        self._ts = array('d')
+        self._ids = {f: array('I') for f in INDEXED_FIELDS}
+        self._values = {f: {} for f in INDEXED_FIELDS}
+        self._postings = {f: [] for f in INDEXED_FIELDS}
+
+    def _load(self):
+        """Scans every segment once to rebuild the index and the tail."""
+        self._reset()
+        self._read_pos = 0
+        self._legacy_indexed = False
+        for n in list_segments(self.directory):
+            pos, entries = self._ingest(n, 0)
+            if n == LEGACY_SEGMENT:
+                self._legacy_indexed = True
+            else:
+                self._segment_no = n
+                self._segment_entries = entries
+                self._read_pos = pos
+
+    def _ingest(self, number, pos):
+        """Indexes complete lines of a segment from byte `pos`; returns (new pos, entries)."""
+        entries = 0
+        try:
+            f = open(self._path(number), 'rb')
+        except FileNotFoundError:
+            return pos, 0
+        with f:
+            f.seek(pos)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # still being written by another process
+                line_offset = pos
+                pos += len(raw)
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    # A torn line from a crash mid-write is skipped
+                    continue
+                self._index(entry, number, line_offset)
+                entries += 1
+        return pos, entries
+
+    def _refresh(self):
+        """Catches up on entries other processes appended (lock held)."""
+        if not self._legacy_indexed and os.path.exists(self._path(LEGACY_SEGMENT)):
+            self._load()
+            return
+        try:
+            size = os.path.getsize(self._path(self._segment_no))
+        except FileNotFoundError:
+            size = 0
+        if size > self._read_pos:
+            self._read_pos, entries = self._ingest(self._segment_no, self._read_pos)
+            self._segment_entries += entries
+        while os.path.exists(self._path(self._segment_no + 1)):
+            self._segment_no += 1
+            self._read_pos, self._segment_entries = self._ingest(self._segment_no, 0)
+
+    def _index(self, entry, segment, offset):
+        seq = self._count
+        self._seg.append(segment)
+        self._off.append(offset)
+        # Times are clamped to be non-decreasing so time ranges can be bisected
+        last = self._ts[-1] if self._ts else 0.0
+        self._ts.append(max(entry_time(entry, last), last))
+        for field in INDEXED_FIELDS:
+            values = self._values[field]
+            value = str(entry.get(field, ""))
+            vid = values.get(value)
+            if vid is None:
+                vid = values[value] = len(values)
+                self._postings[field].append(array('I'))
+            self._ids[field].append(vid)
+            self._postings[field][vid].append(seq)
+        self._tail.append(entry)
+        self._count += 1
+
+    def _path(self, number):
+        return os.path.join(self.directory, segment_name(number))
+
+    # --- WRITES ---
+
+    def append(self, entry):
+        """Appends one entry in O(1): a single line write to the open segment."""
+        data = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._file_lock, self._lock:
+            self._refresh()
+            self._repair_tail()
+            if self._segment_entries >= self.segment_max_entries:
+                self._rotate()
+            if self._fh is None or self._fh_segment != self._segment_no:
+                if self._fh is not None:
+                    self._fh.close()
+                self._fh = open(self._path(self._segment_no), 'ab')
+                self._fh_segment = self._segment_no
+            self._fh.write(data)
+            self._fh.flush()
+            self._index(entry, self._segment_no, self._read_pos)
+            self._read_pos += len(data)
+            self._segment_entries += 1
+
+    def _repair_tail(self):
+        """
+        Truncates a partial last line of the open segment (file lock held).
+
+        Appends are whole-line writes under the file lock, so with the lock
+        held any bytes past the last complete line are left over from a
+        writer that crashed mid-write, not one still writing.
+        """
+        path = self._path(self._segment_no)
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return
+        if size > self._read_pos:
+            os.truncate(path, self._read_pos)
+
+    def _rotate(self):
+        self._segment_no += 1
+        self._segment_entries = 0
+        self._read_pos = 0
+
+    def import_legacy(self, bot_logs):
+        """
+        Imports a legacy newest-first `bot_logs` array into the reserved legacy
+        segment. The segment is written to a temp file and renamed into place,
+        so an interrupted migration leaves nothing behind and can simply be
+        re-run. Returns the number of entries imported (0 if already done).
+        """
+        with self._file_lock, self._lock:
+            path = self._path(LEGACY_SEGMENT)
+            if os.path.exists(path):
+                return 0
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for entry in reversed(bot_logs):
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp, path)
+            # Legacy entries are older than anything already appended, so
+            # sequence numbers are reassigned from a fresh scan
+            self._load()
+            return len(bot_logs)
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+                self._fh_segment = None
+
+    # --- READS ---
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def tail(self, limit=None):
+        """Returns up to `limit` of the newest entries, newest first."""
+        with self._lock:
+            self._refresh()
+            entries = list(self._tail)
+        entries.reverse()
+        return entries if limit is None else entries[:limit]
+
+    def iter_entries(self):
+        """Yields every stored entry, oldest first."""
+        for n in list_segments(self.directory):
+            with open(self._path(n), 'rb') as f:
+                for raw in f:
+                    try:
+                        yield json.loads(raw)
+                    except ValueError:
+                        continue
+
+    def query(self, limit=50, before=None, since=None, until=None, **filters):
+        """
+        Returns `(entries, next_before)` for one newest-first page.
+
+        `before` is an exclusive sequence number to page back from, `since` /
+        `until` are inclusive epoch-second bounds, and `filters` match
+        INDEXED_FIELDS exactly. `next_before` is None on the last page.
+        """
+        with self._lock:
+            self._refresh()
+            hi = self._count if before is None else max(0, min(before, self._count))
+            lo = 0
+            if since is not None:
+                lo = bisect_left(self._ts, since)
+            if until is not None:
+                hi = min(hi, bisect_right(self._ts, until))
+
+            wanted = []
+            for field, value in filters.items():
+                if value is None:
+                    continue
+                vid = self._values[field].get(str(value))
+                if vid is None:
+                    return [], None
+                wanted.append((field, vid))
+
+            seqs = []
+            if not wanted:
+                stop = max(lo, hi - limit)
+                seqs = list(range(hi - 1, stop - 1, -1))
+                more = stop > lo
+            else:
+                # Walk the shortest posting list back from `hi`, checking the
+                # other fields against the per-entry id arrays
+                wanted.sort(key=lambda fv: len(self._postings[fv[0]][fv[1]]))
+                field, vid = wanted[0]
+                posting = self._postings[field][vid]
+                rest = wanted[1:]
+                i = bisect_left(posting, hi) - 1
+                while i >= 0 and posting[i] >= lo and len(seqs) < limit:
+                    seq = posting[i]
+                    if all(self._ids[f][seq] == v for f, v in rest):
+                        seqs.append(seq)
+                    i -= 1
+                more = i >= 0 and posting[i] >= lo
+
+            entries = [self._read(seq) for seq in seqs]
+        next_before = seqs[-1] if seqs and more else None
+        return entries, next_before
+
+    def _read(self, seq):
+        tail_start = self._count - len(self._tail)
+        if seq >= tail_start:
+            return self._tail[seq - tail_start]
+        with open(self._path(self._seg[seq]), 'rb') as f:
+            f.seek(self._off[seq])
+            return json.loads(f.readline())
+
+
+# --- BENCHMARK ---
+
+def benchmark(total, window=100000):
+    """Appends `total` entries and prints mean append latency per window."""
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LogStore(tmp)
+        entry = {
+            "timestamp": "01/01/2025, 00:00:00",
+            "bot_id": "Bench Bot",
+            "duty": "HTML File Update",
+            "status": "Success",
+            "error": "File updated: index.html"
+        }
+        print(f"{'entries':>10}  {'us/append':>10}")
+        start = time.perf_counter()
+        for i in range(1, total + 1):
+            store.append(entry)
+            if i % window == 0:
+                now = time.perf_counter()
+                print(f"{i:>10}  {(now - start) / window * 1e6:>10.2f}")
+                start = now
+        store.close()
+
+
+# --- FAULT INJECTION ---
+
+def fault_test():
+    """
+    Leaves a torn last line in the open segment (as a crash mid-write would),
+    then appends from the live store and from a restarted one and checks that
+    every entry is queryable and read back intact from disk.
+    """
+    import tempfile
+
+    def check(store, expected, label):
+        entries, _ = store.query(limit=expected + 10)
+        assert [e["n"] for e in entries] == list(range(expected - 1, -1, -1)), f"{label}: wrong entries"
+        store._tail.clear()  # force reads from the segment files
+        entries, _ = store.query(limit=expected + 10)
+        assert len(entries) == expected, f"{label}: lost entries on disk"
+        print(f"{label}: {expected} entries intact")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LogStore(tmp, segment_max_entries=4)
+        for n in range(6):
+            store.append({"n": n, "bot_id": "Fault Bot"})
+        path = store._path(store._segment_no)
+        with open(path, 'ab') as f:
+            f.write(b'{"n": 99, "bot_id": "Fau')  # crash mid-write
+        store.append({"n": 6, "bot_id": "Fault Bot"})
+        check(store, 7, "append after torn tail (live)")
+
+        with open(path, 'ab') as f:
+            f.write(b'{"n": 99, "bot')
+        store.close()
+        store = LogStore(tmp, segment_max_entries=4)
+        store.append({"n": 7, "bot_id": "Fault Bot"})
+        check(store, 8, "append after torn tail (restart)")
+        store.close()
+        check(LogStore(tmp, segment_max_entries=4), 8, "reopen")
+
+        with open(path, 'ab') as f:
+            f.write(b'{"n": 99')
+        store = LogStore(tmp, segment_max_entries=4)
+        for n in range(8, 10):
+            store.append({"n": n, "bot_id": "Fault Bot"})  # fills the segment, then rotates
+        check(store, 10, "rotation after torn tail")
+        store.close()
+    print("OK: torn tails never reach a query")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bot log store utilities")
+    parser.add_argument('--bench', type=int, metavar='N', help="benchmark N appends")
+    parser.add_argument('--fault-test', action='store_true', help="recover from a torn segment tail")
+    args = parser.parse_args()
+    if args.bench:
+        benchmark(args.bench, window=max(1, args.bench // 10))
+    elif args.fault_test:
+        fault_test()
+    else:
+        parser.print_help()
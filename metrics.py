@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Minimal Prometheus-style metrics for server.py and its helpers.
+
+Counters, gauges and histograms live in one module-level REGISTRY and are
+rendered in the Prometheus text exposition format by render(). Setting
+METRICS_ENABLED=0 turns every hook into a no-op: `timed` returns the
+undecorated function, `instrument_app` registers nothing and observe()/inc()
+return immediately.
+
+Under a pre-fork server each worker process has its own REGISTRY, so a scrape
+would only see whichever worker answered it. multiprocess(directory) (called
+in the parent before forking) makes every process dump its counters and
+histograms to `<directory>/<pid>.json` at most every `interval` seconds (and
+at exit); render() sums its own values with every other process's file, dead
+workers included, so counters never go backwards. Other workers' values can
+lag by up to `interval`. Gauges are not merged: the ones registered here are
+computed from files the workers share and render the scraping process's view.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from functools import wraps
+from bisect import bisect_left
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+    shared = True  # summed across processes in multiprocess mode
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def _add(a, b):
+        return a + b
+
+    def dump(self):
+        """[[key, value], ...] for a multiprocess value file."""
+        with self._lock:
+            return [[list(k), self._copy(v)] for k, v in self._values.items()]
+
+    def _items(self, peers=()):
+        """Sorted (key, value) pairs: this process's values plus every peer dump."""
+        with self._lock:
+            merged = {k: self._copy(v) for k, v in self._values.items()}
+        for values in peers:
+            for key, value in values:
+                key = tuple(key)
+                merged[key] = self._add(merged[key], value) if key in merged else value
+        return sorted(merged.items())
+
+    def samples(self, peers=()):
+        """Yields (suffix, label string, value) for rendering."""
+        for key, value in self._items(peers):
+            yield '', _format_labels(self.labelnames, key), value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _touched()
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+    shared = False
+
+    def __init__(self, name, help, labels=(), function=None):
+        super().__init__(name, help, labels)
+        self.function = function
+
+    def set(self, value, **labels):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self, peers=()):
+        if self.function is not None:
+            yield '', '', self.function()
+            return
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+        _touched()
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1], value[2]]
+
+    @staticmethod
+    def _add(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def samples(self, peers=()):
+        for key, (counts, total, count) in self._items(peers):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                yield '_bucket', _format_labels(self.labelnames, key, ('le', _format_value(float(bound)))), cumulative
+            yield '_sum', _format_labels(self.labelnames, key), total
+            yield '_count', _format_labels(self.labelnames, key), count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def clear(self):
+        """Drops every recorded value (registrations are kept)."""
+        for metric in self.metrics():
+            with metric._lock:
+                metric._values.clear()
+
+    def render(self):
+        lines = []
+        peers = _read_peers()
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples(peers.get(metric.name, ()) if metric.shared else ()):
+                lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def gauge(name, help, labels=(), function=None):
+    return REGISTRY.register(Gauge(name, help, labels, function))
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def render():
+    return REGISTRY.render()
+
+
+# --- MULTIPROCESS ---
+
+_MULTIPROC = {'dir': None, 'interval': 1.0, 'pid': None, 'dirty': threading.Event()}
+
+
+def multiprocess(directory, interval=1.0):
+    """
+    Shares counters and histograms across processes through value files in
+    `directory`. Call once in the parent before workers are forked: files
+    left by a previous run are removed, and forked children start from zero.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.endswith('.json') or '.json.tmp' in name:
+            os.remove(os.path.join(directory, name))
+    _MULTIPROC.update(dir=directory, interval=interval, pid=None)
+    os.register_at_fork(after_in_child=_forked)
+    atexit.register(_dump)
+
+
+def _forked():
+    # Values inherited from the parent are the parent's to report
+    REGISTRY.clear()
+    _MULTIPROC['pid'] = None
+    _MULTIPROC['dirty'] = threading.Event()
+
+
+def _touched():
+    if _MULTIPROC['dir'] is None:
+        return
+    _MULTIPROC['dirty'].set()
+    if _MULTIPROC['pid'] != os.getpid():
+        _MULTIPROC['pid'] = os.getpid()
+        threading.Thread(target=_flusher, args=(_MULTIPROC['dirty'],), name='metrics-flush', daemon=True).start()
+
+
+def _flusher(dirty):
+    while True:
+        dirty.wait()
+        time.sleep(_MULTIPROC['interval'])  # coalesce updates into one write per interval
+        dirty.clear()
+        _dump()
+
+
+def _dump():
+    """Writes this process's shared metrics to its value file (temp file + rename)."""
+    directory = _MULTIPROC['dir']
+    if directory is None or not any(m._values for m in REGISTRY.metrics() if m.shared):
+        return
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({m.name: m.dump() for m in REGISTRY.metrics() if m.shared}, f)
+    os.replace(tmp, path)
+
+
+def _read_peers():
+    """{metric name: [dump, ...]} from every other process's value file."""
+    directory = _MULTIPROC['dir']
+    if directory is None:
+        return {}
+    own = f"{os.getpid()}.json"
+    peers = {}
+    for name in os.listdir(directory):
+        if not name.endswith('.json') or name == own:
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for metric, values in data.items():
+            peers.setdefault(metric, []).append(values)
+    return peers
+
+
+# --- HOOKS ---
+
+def timed(metric, **labels):
+    """Decorator observing the call duration in `metric`; the identity when disabled."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorate
+
+
+HTTP_REQUESTS = counter('http_requests_total', 'HTTP requests served', ('route', 'method', 'status'))
+HTTP_LATENCY = histogram('http_request_duration_seconds', 'HTTP request latency', ('route', 'method'))
+HTTP_RESPONSE_BYTES = histogram('http_response_size_bytes', 'HTTP response body size', ('route',), SIZE_BUCKETS)
+
+
+def instrument_app(app):
+    """Records per-route request counts, latency and response size on a Flask app."""
+    if not ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = getattr(g, '_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+            HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+            length = response.calculate_content_length()
+            if length is not None:
+                HTTP_RESPONSE_BYTES.observe(length, route=route)
+        return response
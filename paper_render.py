@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Paper rendering for cart6000.
+
+A paper is rendered from its metadata (term, title, abstract, time) through
+one template that is compiled once at import into literal/field pairs, so a
+render is a single join. Two renderers share the template:
+
+- render_plain(): the Markdown/plain text written to disk (no escape codes);
+- render_ansi(): the same layout with terminal colors.
+
+The Infinity value and color state are derived from a SHA-256 of the term, so
+they are the same in every process and every re-render (hash() is salted per
+process). rerender_dir() parses the metadata back out of stored papers,
+including older files with embedded ANSI codes, and rewrites any whose
+rendering differs.
+
+  python paper_render.py --rerender infinity_research
+  python paper_render.py --show infinity_research/deep_000001_hydrogen.txt
+"""
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+from string import Formatter
+from datetime import datetime, UTC
+
+COLORS = ["PURPLE", "GREEN", "YELLOW", "RED"]
+
+ANSI_STYLE = {"rule": "\033[95m", "heading": "\033[93m", "end_rule": "\033[92m", "reset": "\033[0m"}
+PLAIN_STYLE = {"rule": "", "heading": "", "end_rule": "", "reset": ""}
+
+
+class CompiledTemplate:
+    """str.format-style template parsed once into (literal, field) pairs."""
+
+    def __init__(self, text):
+        self.parts = [(literal, field) for literal, field, _, _ in Formatter().parse(text)]
+        self.fields = {field for _, field in self.parts if field}
+
+    def render(self, values):
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+        return "".join(out)
+
+
+PAPER = CompiledTemplate("""
+{rule}============================================================{reset}
+{heading}∞ INFINITY RESEARCH TOKEN — FULL RESEARCH PAPER{reset}
+HASH: {token_hash}
+VALUE: {value}
+COLOR STATE: {color}
+TIME: {now}
+TERM: {term}
+TITLE: {title}
+{rule}============================================================{reset}
+
+## Abstract
+{abstract}
+
+
+### Background
+The study of {term} intersects several high-priority scientific domains. 
+Contemporary research highlights multi-body interactions, nonlinear field 
+formation, and emergent behaviors found in high-energy or condensed-matter 
+environments. Recent work from arXiv and NASA ADS reveals structural patterns 
+relevant to Infinity OS modeling, particularly around resonance, field 
+coherence, and frequency-dependent behavior. 
+
+
+### Methods & Data Sources
+This paper synthesizes:
+- arXiv datasets ({term})
+- NASA ADS catalog signals
+- Quantum field theoretical models
+- Gradient-based diffusion simulations
+- Infinity OS analytical transforms
+
+
+### Analysis
+A deeper investigation into {term} shows multi-layered interactions across 
+electromagnetic, quantum, and lattice domains. The Infinity OS interpretive 
+framework models these interactions as frequency tunnels, mapping energy 
+gradients across stability nodes. This produces predictive behavior useful for 
+material engineering, superconductive channeling, and quantum signal routing.
+
+
+### Representative Equations
+1. **Energy Gradient Transport**
+    ∂E/∂t = ∇ · (D ∇E) + S(t)
+
+2. **Quantum Flux Density**
+    Φ = ∮ B · dA
+
+3. **Ion Mobility**
+    μ = v_d / E
+
+
+### Applications
+- High-efficiency hydrogen conversion
+- Superconductive computing nodes
+- Infinity OS hydrogen portal modeling
+- Lattice-level frequency routing
+- Degenerate plasma field control
+
+
+### Infinity OS Interpretation
+Infinity OS evaluates {term} as part of the hydrogen-frequency-portal chain.  
+This places the term within the “energy coherence” class. The Infinity Value 
+assigned reflects structural complexity, data-density potential, and 
+long-term research yield.
+
+
+{end_rule}============================================================{reset}
+""")
+
+
+def sha(x):
+    return hashlib.sha256(x.encode()).hexdigest()
+
+
+def infinity_value(term):
+    """Deterministic Infinity value (2000-4999) and color state for `term`."""
+    value = 2000 + int(sha(term)[:8], 16) % 3000
+    return value, COLORS[value % 4]
+
+
+def paper_meta(term, title, abstract, now=None):
+    """Metadata for a new paper; everything a renderer needs."""
+    now = now or datetime.now(UTC).isoformat()
+    return {"term": term, "title": title, "abstract": abstract, "now": now}
+
+
+def _values(meta, style):
+    value, color = infinity_value(meta["term"])
+    return dict(meta, token_hash=sha(meta["term"] + meta["now"]), value=value, color=color, **style)
+
+
+def render_plain(meta):
+    return PAPER.render(_values(meta, PLAIN_STYLE))
+
+
+def render_ansi(meta):
+    return PAPER.render(_values(meta, ANSI_STYLE))
+
+
+# --- STORED PAPERS ---
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+HEADER_RE = re.compile(r"^(TIME|TERM|TITLE): (.*)$", re.M)
+
+
+def parse_paper(text):
+    """Metadata from a rendered paper (plain or ANSI), or None if it isn't one."""
+    text = ANSI_RE.sub("", text)
+    fields = dict(HEADER_RE.findall(text))
+    start = text.find("## Abstract\n")
+    end = text.find("\n\n### Background")
+    if len(fields) < 3 or start < 0 or end < start:
+        return None
+    abstract = text[start + len("## Abstract\n"):end]
+    if abstract.endswith("\n"):
+        abstract = abstract[:-1]
+    return {"term": fields["TERM"], "title": fields["TITLE"], "abstract": abstract, "now": fields["TIME"]}
+
+
+def rerender_dir(directory, render=render_plain, suffix=".txt"):
+    """Re-renders every stored paper in `directory`; returns counts."""
+    stats = {"papers": 0, "rewritten": 0, "skipped": 0}
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not entry.name.endswith(suffix) or not entry.is_file():
+                continue
+            with open(entry.path, encoding="utf-8") as f:
+                old = f.read()
+            meta = parse_paper(old)
+            if meta is None:
+                stats["skipped"] += 1
+                continue
+            stats["papers"] += 1
+            new = render(meta)
+            if new != old:
+                tmp = entry.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(new)
+                os.replace(tmp, entry.path)
+                stats["rewritten"] += 1
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render cart6000 papers")
+    parser.add_argument("--rerender", metavar="DIR", help="re-render every stored paper in DIR as plain text")
+    parser.add_argument("--show", metavar="FILE", help="print a stored paper with terminal colors")
+    args = parser.parse_args()
+    if args.rerender:
+        start = time.perf_counter()
+        stats = rerender_dir(args.rerender)
+        secs = time.perf_counter() - start
+        print(f"{stats['papers']} papers ({stats['rewritten']} rewritten, {stats['skipped']} skipped) in {secs:.2f}s")
+    elif args.show:
+        with open(args.show, encoding="utf-8") as f:
+            meta = parse_paper(f.read())
+        if meta is None:
+            sys.exit(f"{args.show}: not a rendered paper")
+        print(render_ansi(meta))
+    else:
+        parser.print_help()
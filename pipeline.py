@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Threaded processing pipeline with bounded queues between stages.
+
+A Pipeline pulls items from a source iterable (run as the first stage, on its
+own thread) and passes each one through a list of Stages. Each stage has its
+own worker threads and reads from a bounded queue, so a slow stage applies
+backpressure to everything upstream instead of letting work pile up in
+memory. A stage function returning None drops the item. An item whose stage
+function raises is logged with its traceback and handed to the stage's
+`on_error(item, exc)`, so the caller can release or re-queue it.
+
+Every stage keeps counters (items in/out, busy time, queue depth high-water
+mark), which Pipeline.report() formats after a run.
+"""
+import time
+import queue
+import threading
+import traceback
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name, fn, workers=1, maxsize=8, on_error=None):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.maxsize = maxsize
+        self.on_error = on_error
+        self.queue = None
+        self.reset()
+
+    def reset(self):
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def _count(self, busy, out, error=False):
+        with self._lock:
+            self.items_in += 1
+            self.items_out += out
+            self.errors += error
+            self.busy += busy
+
+    def put(self, item):
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def stats(self, elapsed):
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "in": self.items_in,
+            "out": self.items_out,
+            "errors": self.errors,
+            "per_sec": self.items_out / elapsed if elapsed > 0 else 0.0,
+            "busy_pct": 100.0 * self.busy / (elapsed * self.workers) if elapsed > 0 else 0.0,
+            "depth": self.queue.qsize() if self.queue else 0,
+            "max_depth": self.max_depth,
+        }
+
+
+class Pipeline:
+    def __init__(self, source_name, stages, log=print):
+        self.source = Stage(source_name, None)
+        self.stages = stages
+        self.log = log
+        self.elapsed = 0.0
+
+    def _feed(self, items, first):
+        it = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                break
+            except Exception:
+                self.source._count(time.perf_counter() - start, 0, error=True)
+                self.log(f"[pipeline] {self.source.name} failed:\n{traceback.format_exc()}")
+                break
+            self.source._count(time.perf_counter() - start, 1)
+            first.put(item)
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+
+    def _work(self, stage, downstream, remaining):
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                out = stage.fn(item)
+            except Exception as e:
+                stage._count(time.perf_counter() - start, 0, error=True)
+                self.log(f"[pipeline] {stage.name} failed on {item!r}:\n{traceback.format_exc()}")
+                if stage.on_error is not None:
+                    try:
+                        stage.on_error(item, e)
+                    except Exception:
+                        self.log(f"[pipeline] {stage.name} on_error failed:\n{traceback.format_exc()}")
+                continue
+            stage._count(time.perf_counter() - start, out is not None)
+            if out is not None and downstream is not None:
+                downstream.put(out)
+        # The last worker of a stage to finish closes the next stage
+        with remaining[1]:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and downstream is not None:
+            for _ in range(downstream.workers):
+                downstream.queue.put(_DONE)
+
+    def run(self, items):
+        """Runs `items` through every stage; returns when the last stage drains."""
+        self.source.reset()
+        for stage in self.stages:
+            stage.reset()
+            stage.queue = queue.Queue(maxsize=stage.maxsize)
+        threads = [threading.Thread(target=self._feed, args=(items, self.stages[0]), daemon=True)]
+        for i, stage in enumerate(self.stages):
+            downstream = self.stages[i + 1] if i + 1 < len(self.stages) else None
+            remaining = [stage.workers, threading.Lock()]
+            threads += [threading.Thread(target=self._work, args=(stage, downstream, remaining),
+                                         name=f"{stage.name}-{n}", daemon=True)
+                        for n in range(stage.workers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.elapsed = time.perf_counter() - start
+        return self.stats()
+
+    def stats(self):
+        return [s.stats(self.elapsed) for s in [self.source] + self.stages]
+
+    def report(self):
+        lines = [f"{'stage':>10} {'workers':>7} {'in':>5} {'out':>5} {'err':>4} {'items/s':>8} {'busy%':>6} {'depth':>5} {'max':>4}"]
+        for s in self.stats():
+            lines.append(f"{s['stage']:>10} {s['workers']:>7} {s['in']:>5} {s['out']:>5} {s['errors']:>4} "
+                         f"{s['per_sec']:>8.2f} {s['busy_pct']:>6.1f} {s['depth']:>5} {s['max_depth']:>4}")
+        return "\n".join(lines)
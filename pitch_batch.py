@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Batch pitch tracking over WAV files for Cart M1.
+
+A recording is framed as a 2-D strided view (sliding_window_view: every hop
+samples a `frame`-sample row, no copy) and the FFT/HPS estimators run over a
+whole chunk of frames at once: one windowing multiply, one rfft along the
+last axis, vectorised peak picking and interpolation. The result is a pitch
+track of (time, Hz, note, confidence) per frame, written as CSV or NPY.
+
+Confidence is the share of the frame's spectral power that lies within the
+window's main lobe around the estimate's first harmonics (close to 1.0 for a
+clean harmonic tone, near 0 for noise); silent frames get 0 Hz and
+confidence 0.
+
+  python pitch_batch.py recordings/ --out track.csv
+  python pitch_batch.py long_take.wav --method fft --out track.npy
+  python pitch_batch.py --bench 60
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+
+import numpy as np
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cartM1_pitch_engine import next_power_of_2, freq_to_note, get_freq_fft, get_freq_hps
+from pitch_stream import read_wav, tone
+
+METHODS = ["fft", "hps"]
+CHUNK = 256           # frames per vectorised call (bounds memory on long files)
+CONF_HARMONICS = 4
+LOBE_BINS = {"fft": 3, "hps": 2}   # main-lobe half-width (unpadded bins) of Blackman / Hann
+
+TRACK_DTYPE = [("file", "U256"), ("time", "f8"), ("hz", "f8"), ("note", "U24"), ("confidence", "f4")]
+
+
+def frame_view(samples, frame, hop):
+    """(n_frames, frame) read-only view of `samples`, one row every `hop` samples."""
+    if len(samples) < frame:
+        return np.empty((0, frame), dtype=samples.dtype)
+    return sliding_window_view(samples, frame)[::hop]
+
+
+def _interp_peaks(y, peak):
+    """Fractional peak positions from log-parabolic interpolation around integer peaks (rows of y)."""
+    rows = np.arange(len(y))
+    inner = (peak > 0) & (peak < y.shape[1] - 1)
+    p = np.clip(peak, 1, y.shape[1] - 2)
+    y0, y1, y2 = (np.log(y[rows, p + d] + 1e-10) for d in (-1, 0, 1))
+    denom = y0 - 2 * y1 + y2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offset = np.where(inner & (denom != 0), 0.5 * (y0 - y2) / denom, 0.0)
+    return peak + offset
+
+
+def _confidence(power, bins, lobe):
+    """Share of each row's power within `lobe` bins of the first CONF_HARMONICS multiples of `bins`."""
+    n, width = power.shape
+    rows = np.arange(n)[:, None]
+    span = np.arange(-lobe, lobe + 1)
+    centres = np.rint(bins[:, None] * np.arange(1, CONF_HARMONICS + 1)).astype(np.int64)
+    idx = (centres[:, :, None] + span).reshape(n, -1)
+    valid = (idx >= 0) & (idx < width) & (bins[:, None] > 0)
+    near = np.where(valid, power[rows, np.clip(idx, 0, width - 1)], 0.0).sum(axis=1)
+    total = power.sum(axis=1)
+    return np.where(total > 0, np.minimum(near / np.maximum(total, 1e-30), 1.0), 0.0)
+
+
+class BatchPitch:
+    """Vectorised cartM1 FFT/HPS estimators for frames of a fixed size."""
+
+    def __init__(self, frame, sr, method="hps", harmonics=5):
+        if method not in METHODS:
+            raise ValueError(f"unknown method {method!r}")
+        self.frame = frame
+        self.sr = sr
+        self.method = method
+        self.harmonics = harmonics
+        self.pad = next_power_of_2(frame * 4)
+        self.bin_hz = sr / self.pad
+        self.window = (np.blackman if method == "fft" else np.hanning)(frame).astype(np.float32)
+        self.lobe = int(np.ceil(LOBE_BINS[method] * self.pad / frame))
+
+    def estimate(self, frames):
+        """(hz, confidence) arrays for a 2-D block of frames."""
+        spec = np.abs(scipy.fft.rfft(frames * self.window, n=self.pad, axis=-1))
+        if self.method == "hps":
+            target = spec.copy()
+            for h in range(2, self.harmonics + 1):
+                decimated = spec[:, ::h]
+                target[:, :decimated.shape[1]] *= decimated
+        else:
+            target = spec
+        peak = np.argmax(target, axis=1)
+        bins = _interp_peaks(target, peak)
+        return bins * self.bin_hz, _confidence(spec ** 2, bins, self.lobe)
+
+    def track(self, samples, hop, threshold=0.01):
+        """(times, hz, confidence) for every frame of `samples`."""
+        frames = frame_view(samples, self.frame, hop)
+        n = len(frames)
+        hz = np.zeros(n)
+        conf = np.zeros(n, dtype=np.float32)
+        for i in range(0, n, CHUNK):
+            block = frames[i:i + CHUNK]
+            loud = np.max(np.abs(block), axis=1) >= threshold
+            if loud.any():
+                h, c = self.estimate(block[loud])
+                hz[i:i + CHUNK][loud] = h
+                conf[i:i + CHUNK][loud] = c
+        return np.arange(n) * hop / self.sr, hz, conf
+
+
+def wav_paths(path):
+    if os.path.isdir(path):
+        return [os.path.join(path, n) for n in sorted(os.listdir(path)) if n.lower().endswith(".wav")]
+    return [path]
+
+
+def track_files(paths, frame_s=0.1, hop_s=0.025, method="hps", harmonics=5, threshold=0.01):
+    """Structured pitch track (TRACK_DTYPE) for every WAV in `paths`."""
+    parts = []
+    trackers = {}
+    for path in paths:
+        sr, samples = read_wav(path)
+        frame, hop = int(frame_s * sr), max(1, int(hop_s * sr))
+        key = (frame, sr)
+        if key not in trackers:
+            trackers[key] = BatchPitch(frame, sr, method, harmonics)
+        times, hz, conf = trackers[key].track(samples, hop, threshold)
+        part = np.empty(len(times), dtype=TRACK_DTYPE)
+        part["file"] = os.path.basename(path)
+        part["time"], part["hz"], part["confidence"] = times, hz, conf
+        part["note"] = [freq_to_note(f) for f in hz]
+        parts.append(part)
+    return np.concatenate(parts) if parts else np.empty(0, dtype=TRACK_DTYPE)
+
+
+def write_track(track, out):
+    if out.endswith(".npy"):
+        np.save(out, track)
+        return
+    with open(out, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow([name for name, _ in TRACK_DTYPE])
+        for row in track:
+            w.writerow([row["file"], f"{row['time']:.4f}", f"{row['hz']:.2f}", row["note"], f"{row['confidence']:.3f}"])
+
+
+# --- BENCHMARK ---
+
+def bench(seconds, sr=44100, frame=4096, hop=1024):
+    notes = 110.0 * 2 ** (np.arange(24) / 12)
+    samples = tone(notes, sr, seconds)
+    frames = frame_view(samples, frame, hop)
+    print(f"signal: {seconds:.0f}s @ {sr} Hz · frame {frame} hop {hop} · {len(frames)} frames")
+    print(f"{'method':>6} {'loop fr/s':>10} {'batch fr/s':>11} {'speedup':>8} {'max diff':>10}")
+    for method, single in (("fft", get_freq_fft), ("hps", get_freq_hps)):
+        start = time.perf_counter()
+        looped = np.array([single(f, sr) for f in frames])
+        loop_secs = time.perf_counter() - start
+        batch = BatchPitch(frame, sr, method)
+        start = time.perf_counter()
+        _, hz, _ = batch.track(samples, hop, threshold=0.0)
+        batch_secs = time.perf_counter() - start
+        cents = np.abs(1200 * np.log2(hz / looped))
+        print(f"{method:>6} {len(frames) / loop_secs:>10,.0f} {len(frames) / batch_secs:>11,.0f} "
+              f"{loop_secs / batch_secs:>7.1f}x {cents.max():>7.3f} ct")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch pitch tracking over WAV files")
+    parser.add_argument("path", nargs="?", help="WAV file or directory of WAV files")
+    parser.add_argument("--out", default="pitch_track.csv", help=".csv or .npy")
+    parser.add_argument("--method", choices=METHODS, default="hps")
+    parser.add_argument("--harmonics", type=int, default=5)
+    parser.add_argument("--frame", type=float, default=0.1, help="seconds per frame")
+    parser.add_argument("--hop", type=float, default=0.025, help="seconds between frames")
+    parser.add_argument("--threshold", type=float, default=0.01)
+    parser.add_argument("--bench", type=float, metavar="SECONDS", help="benchmark on a synthetic signal")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench)
+    elif args.path:
+        start = time.perf_counter()
+        track = track_files(wav_paths(args.path), args.frame, args.hop, args.method, args.harmonics, args.threshold)
+        write_track(track, args.out)
+        print(f"{len(track)} frames → {args.out} ({time.perf_counter() - start:.2f}s)")
+    else:
+        parser.print_help()
+        sys.exit(1)
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Streaming pitch tracking for Cart M1.
+
+Audio (from a sounddevice input callback, or blocks of a WAV file) is written
+into a ring buffer; every `hop` samples a `frame`-sample window is analysed,
+so frames overlap and nothing between them is lost. Windows, the zero-padded
+FFT input buffer and the bin frequencies are computed once per engine and
+reused for every frame (scipy.fft caches its plan per transform length).
+
+Each frame's analysis time is measured against the hop budget (the time the
+next hop of audio takes to arrive); report() summarises it.
+
+  python pitch_stream.py take.wav --method hps --frame 4096 --hop 1024
+  python pitch_stream.py --self-test
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import scipy.fft
+from scipy.io import wavfile
+
+from cartM1_pitch_engine import next_power_of_2, freq_to_note, freq_from_autocorr, freq_from_yin, ensemble_from_spectrum
+
+try:
+    import sounddevice as sd
+except (ImportError, OSError):  # optional: WAV input only
+    sd = None
+
+METHODS = ["fft", "autocorr", "hps", "yin", "ensemble"]
+YIN_FMIN, YIN_FMAX = 40.0, 2000.0
+
+
+class PitchFrame(NamedTuple):
+    time: float          # seconds from stream start to the frame's first sample
+    freq: float          # Hz, 0.0 for silence
+    note: str
+    amplitude: float
+    latency_ms: float    # analysis time of this frame
+
+
+# -----------------------------------
+# Ring buffer
+# -----------------------------------
+class RingBuffer:
+    """Single-writer/single-reader float32 sample ring; the writer may run in an audio callback."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._written = 0     # total samples ever written
+        self._start = 0       # absolute index of the next frame's first sample
+        self._lock = threading.Lock()
+        self.dropped = 0      # samples overwritten before they were read
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        with self._lock:
+            if len(samples) > self.capacity:
+                self.dropped += len(samples) - self.capacity
+                self._start += len(samples) - self.capacity
+                self._written += len(samples) - self.capacity
+                samples = samples[-self.capacity:]
+            pos = self._written % self.capacity
+            first = min(len(samples), self.capacity - pos)
+            self._data[pos:pos + first] = samples[:first]
+            self._data[:len(samples) - first] = samples[first:]
+            self._written += len(samples)
+            overrun = self._written - self.capacity - self._start
+            if overrun > 0:
+                self.dropped += overrun
+                self._start += overrun
+
+    def available(self):
+        with self._lock:
+            return self._written - self._start
+
+    def read_frame(self, out, hop):
+        """Copies the next len(out) samples into `out` and advances by `hop`; returns the start index or None."""
+        n = len(out)
+        with self._lock:
+            if self._written - self._start < n:
+                return None
+            start = self._start
+            pos = start % self.capacity
+            first = min(n, self.capacity - pos)
+            out[:first] = self._data[pos:pos + first]
+            out[first:] = self._data[:n - first]
+            self._start += hop
+        return start
+
+
+# -----------------------------------
+# Per-frame analysis with precomputed buffers
+# -----------------------------------
+def _interp(y, i):
+    """Parabolic peak offset around index i (log-magnitude done by the caller)."""
+    y0, y1, y2 = y[i - 1], y[i], y[i + 1]
+    denom = y0 - 2 * y1 + y2
+    return 0.5 * (y0 - y2) / denom if denom else 0.0
+
+
+class FrameAnalyzer:
+    """The cartM1 estimators for a fixed frame size, with windows and FFT buffers allocated once."""
+
+    def __init__(self, frame, sr, method="hps", harmonics=5):
+        if method not in METHODS:
+            raise ValueError(f"unknown method {method!r}")
+        self.frame = frame
+        self.sr = sr
+        self.method = method
+        self.harmonics = harmonics
+        self.confidence = None   # set by estimators that produce one (yin, ensemble)
+        spectral = method in ("fft", "hps", "ensemble")
+        # spectra are 4x zero-padded; correlations need >= 2x to avoid circular wrap
+        self.pad = next_power_of_2(frame * 4) if spectral else next_power_of_2(frame * 2)
+        self.bin_hz = sr / self.pad
+        windows = {"fft": np.blackman, "hps": np.hanning, "autocorr": np.hanning, "ensemble": np.hanning}
+        self.window = windows[method](frame).astype(np.float32) if method in windows else None
+        self._padded = np.zeros(self.pad, dtype=np.float32)   # tail stays zero
+        self._work = np.empty(frame, dtype=np.float32)
+        self._product = np.empty(self.pad // 2 + 1)
+        if method == "yin":
+            self.max_lag = min(frame // 2, int(sr / YIN_FMIN) + 2)
+            self.min_lag = max(2, int(sr / YIN_FMAX))
+            self._head = np.zeros(self.pad, dtype=np.float32)   # first W samples, zero tail
+            self._sq = np.zeros(frame + 1)
+
+    def analyze(self, data):
+        return getattr(self, "_" + self.method)(data)
+
+    def _spectrum(self, data):
+        np.multiply(data, self.window, out=self._padded[:self.frame])
+        return np.abs(scipy.fft.rfft(self._padded))
+
+    def _fft(self, data):
+        mag = self._spectrum(data)
+        peak = int(np.argmax(mag))
+        if 0 < peak < len(mag) - 1:
+            return (peak + _interp(np.log(mag[peak - 1:peak + 2] + 1e-10), 1)) * self.bin_hz
+        return peak * self.bin_hz
+
+    def _hps(self, data):
+        spec = self._spectrum(data)
+        hps = self._product
+        hps[:] = spec
+        for h in range(2, self.harmonics + 1):
+            decimated = spec[::h]
+            hps[:len(decimated)] *= decimated
+        peak = int(np.argmax(hps))
+        if 0 < peak < len(hps) - 1:
+            return (peak + _interp(np.log(hps[peak - 1:peak + 2] + 1e-10), 1)) * self.bin_hz
+        return peak * self.bin_hz
+
+    def _autocorr(self, data):
+        x = self._padded[:self.frame]
+        np.multiply(data, self.window, out=x)
+        x -= x.mean()
+        spec = scipy.fft.rfft(self._padded)
+        corr = scipy.fft.irfft(spec.real ** 2 + spec.imag ** 2, n=self.pad)[:self.frame]
+        return freq_from_autocorr(corr / (corr[0] + 1e-10), self.sr)
+
+    def _ensemble(self, data):
+        x = self._padded[:self.frame]
+        np.multiply(data, self.window, out=x)
+        x -= x.mean()
+        freq, self.confidence, _ = ensemble_from_spectrum(scipy.fft.rfft(self._padded), self.frame, self.sr,
+                                                          self.harmonics)
+        return freq
+
+    def _yin(self, data):
+        x = self._padded[:self.frame]
+        np.subtract(data, data.mean(), out=x)
+        W = self.frame - self.max_lag
+        self._head[:W] = x[:W]
+        cross = scipy.fft.irfft(np.conj(scipy.fft.rfft(self._head)) * scipy.fft.rfft(self._padded),
+                                n=self.pad)[:self.max_lag]
+        sq = self._sq
+        np.cumsum(np.square(x, out=self._work), out=sq[1:])
+        diff = sq[W] + (sq[W:W + self.max_lag] - sq[:self.max_lag]) - 2 * cross
+        freq, self.confidence = freq_from_yin(diff, self.sr, self.min_lag)
+        return freq
+
+
+# -----------------------------------
+# Streaming engine
+# -----------------------------------
+class StreamingPitchEngine:
+    def __init__(self, sr, frame=4096, hop=1024, method="hps", harmonics=5, threshold=0.01, capacity=None):
+        if not 0 < hop <= frame:
+            raise ValueError("hop must be in 1..frame")
+        self.sr = sr
+        self.hop = hop
+        self.threshold = threshold
+        self.analyzer = FrameAnalyzer(frame, sr, method, harmonics)
+        self.ring = RingBuffer(capacity or max(frame + 8 * hop, sr * 2))
+        self._frame = np.empty(frame, dtype=np.float32)
+        self.latencies = []
+        self.ready = threading.Event()
+
+    @property
+    def budget_ms(self):
+        """Time for one hop of audio to arrive: the per-frame processing budget."""
+        return 1000.0 * self.hop / self.sr
+
+    def write(self, samples):
+        """Adds samples; safe to call from an audio callback thread."""
+        self.ring.write(samples)
+        if self.ring.available() >= len(self._frame):
+            self.ready.set()
+
+    def frames(self):
+        """Yields a PitchFrame for every complete frame buffered so far."""
+        while True:
+            start = self.ring.read_frame(self._frame, self.hop)
+            if start is None:
+                self.ready.clear()
+                return
+            t0 = time.perf_counter()
+            amp = float(np.max(np.abs(self._frame)))
+            freq = self.analyzer.analyze(self._frame) if amp >= self.threshold else 0.0
+            ms = (time.perf_counter() - t0) * 1000
+            self.latencies.append(ms)
+            yield PitchFrame(start / self.sr, freq, freq_to_note(freq), amp, ms)
+
+    def feed(self, samples):
+        self.write(samples)
+        return list(self.frames())
+
+    def report(self):
+        lat = np.array(self.latencies) if self.latencies else np.zeros(1)
+        over = int(np.sum(lat > self.budget_ms))
+        return (f"frames {len(self.latencies)} · frame {len(self._frame)} hop {self.hop} @ {self.sr} Hz · "
+                f"budget {self.budget_ms:.2f} ms/frame · latency p50 {np.percentile(lat, 50):.2f} "
+                f"p95 {np.percentile(lat, 95):.2f} max {lat.max():.2f} ms · over budget {over} · "
+                f"dropped samples {self.ring.dropped}")
+
+
+# -----------------------------------
+# Sources
+# -----------------------------------
+def read_wav(path):
+    """(samplerate, mono float32 samples in [-1, 1]) from a WAV file."""
+    sr, data = wavfile.read(path, mmap=True)
+    data = np.asarray(data)
+    # Scale before mixing down: the mean of integer channels is a float array
+    # that would otherwise escape normalisation (and keep uint8's offset)
+    if data.dtype.kind == "i":
+        data = data.astype(np.float32) / float(np.iinfo(data.dtype).max)
+    elif data.dtype.kind == "u":  # 8-bit WAV is unsigned
+        data = (data.astype(np.float32) - 128.0) / 128.0
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    return sr, data.astype(np.float32, copy=False)
+
+
+def run_wav(engine, samples, block=512, realtime=False):
+    """Feeds `samples` in callback-sized blocks; with `realtime`, paced like a live input."""
+    start = time.perf_counter()
+    for i in range(0, len(samples), block):
+        if realtime:
+            delay = i / engine.sr - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        yield from engine.feed(samples[i:i + block])
+
+
+def run_input(engine, block=512, device=None):
+    """Yields frames from the default (or given) input device until interrupted."""
+    if sd is None:
+        raise RuntimeError("sounddevice is not installed; use a WAV file instead")
+
+    def callback(indata, frames, time_info, status):
+        engine.write(indata[:, 0])
+
+    with sd.InputStream(samplerate=engine.sr, blocksize=block, channels=1, dtype="float32",
+                        device=device, callback=callback):
+        while True:
+            engine.ready.wait(0.5)
+            yield from engine.frames()
+
+
+def format_frame(f):
+    if f.freq <= 0:
+        return f"{f.time:8.3f}s  silence"
+    return f"{f.time:8.3f}s  {f.freq:8.2f} Hz  {f.note:<18} amp {f.amplitude:.3f}  {f.latency_ms:.2f} ms"
+
+
+# -----------------------------------
+# Self-test
+# -----------------------------------
+def tone(freqs, sr, seconds, harmonics=4, noise=0.01, seed=0):
+    """Harmonic tone stepping through `freqs` in equal parts, plus white noise."""
+    rng = np.random.default_rng(seed)
+    n = int(sr * seconds)
+    f = np.repeat(np.asarray(freqs, dtype=np.float64), -(-n // len(freqs)))[:n]
+    phase = 2 * np.pi * np.cumsum(f) / sr
+    x = sum(np.sin(h * phase) / h for h in range(1, harmonics + 1))
+    x = 0.5 * x / np.max(np.abs(x))
+    return (x + noise * rng.standard_normal(n)).astype(np.float32)
+
+
+def self_test(sr=44100):
+    notes = [110.0, 220.0, 329.63, 440.0, 659.25]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "steps.wav")
+        wavfile.write(path, sr, (tone(notes, sr, 5.0) * 32767).astype(np.int16))
+        sr, samples = read_wav(path)
+        ok = True
+        for method in METHODS:
+            engine = StreamingPitchEngine(sr, frame=4096, hop=1024, method=method)
+            frames = list(run_wav(engine, samples))
+            errs = []
+            for f in frames:
+                seg = int((f.time + 4096 / sr) * len(notes) / 5.0 - 1e-9)
+                if int(f.time * len(notes) / 5.0) != seg:
+                    continue  # frame straddles a note change
+                errs.append(abs(1200 * np.log2(f.freq / notes[seg])) if f.freq > 0 else 1200.0)
+            bad = sum(e > 50 for e in errs)
+            ok &= bad == 0 and engine.ring.dropped == 0
+            print(f"{method:>8}: {len(frames)} frames, max error {max(errs):.1f} cents, {bad} off by >50 cents")
+            print(f"          {engine.report()}")
+
+        # stereo files mix down to the mean of the normalised channels
+        signal = tone(notes, sr, 0.5)
+        expected = 0.75 * signal
+        for label, dtype, scale, offset, tol in (("int16", np.int16, 32767, 0, 1e-4),
+                                                 ("uint8", np.uint8, 127, 128, 1.5 / 128)):
+            stereo = np.stack([signal, 0.5 * signal], axis=1)
+            path = os.path.join(tmp, f"stereo_{label}.wav")
+            wavfile.write(path, sr, np.round(stereo * scale + offset).astype(dtype))
+            _, mixed = read_wav(path)
+            err = float(np.max(np.abs(mixed - expected)))
+            ok &= mixed.shape == expected.shape and err <= tol
+            print(f"  stereo {label}: max error {err:.5f} (limit {tol:.5f})")
+        print("PASS" if ok else "FAIL")
+        return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming pitch tracker (ring buffer, overlapping frames)")
+    parser.add_argument("wav", nargs="?", help="WAV file to track (default: live input)")
+    parser.add_argument("--method", choices=METHODS, default="hps")
+    parser.add_argument("--harmonics", type=int, default=5)
+    parser.add_argument("--frame", type=int, default=4096, help="samples per analysis frame")
+    parser.add_argument("--hop", type=int, default=1024, help="samples between frames")
+    parser.add_argument("--block", type=int, default=512, help="samples per input callback/WAV block")
+    parser.add_argument("--samplerate", type=int, default=44100, help="live input only")
+    parser.add_argument("--threshold", type=float, default=0.01)
+    parser.add_argument("--realtime", action="store_true", help="pace WAV input like a live stream")
+    parser.add_argument("--device", type=int, default=None)
+    parser.add_argument("--self-test", action="store_true", help="track a synthetic WAV and check accuracy")
+    args = parser.parse_args()
+
+    if args.self_test:
+        sys.exit(0 if self_test() else 1)
+    if args.wav:
+        sr, samples = read_wav(args.wav)
+        engine = StreamingPitchEngine(sr, args.frame, args.hop, args.method, args.harmonics, args.threshold)
+        source = run_wav(engine, samples, args.block, args.realtime)
+    else:
+        engine = StreamingPitchEngine(args.samplerate, args.frame, args.hop, args.method, args.harmonics,
+                                      args.threshold)
+        source = run_input(engine, args.block, args.device)
+    try:
+        for f in source:
+            print(format_frame(f))
+    except KeyboardInterrupt:
+        pass
+    print(engine.report())
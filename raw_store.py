@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for cart889's raw source payloads.
+
+Each source payload is serialised canonically (sorted keys, compact) and
+stored once, gzip-compressed, under its SHA-256:
+
+  <root>/blobs/ab/abcdef....json.gz
+
+Every harvest appends one small manifest line to a per-day JSON-lines file
+pointing at its blobs (None for a source that returned nothing):
+
+  <root>/manifests/2025-01-31.jsonl
+  {"term": "fusion", "time": "...", "sources": {"wiki": "ab12...", "arxiv": null, ...}}
+
+Identical payloads (the same Wikipedia summary harvested again) cost one
+manifest line instead of a new file. `gc` deletes blobs no manifest refers
+to, optionally after dropping manifests older than --keep-days. Writers and
+gc share an flock on <root>/.lock so gc never removes a blob that a harvest is
+about to reference.
+
+  python raw_store.py stats RAW_DIR
+  python raw_store.py gc RAW_DIR [--keep-days 30]
+  python raw_store.py --bench 2000
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import datetime
+
+from filelock import FileLock
+
+BLOB_SUFFIX = ".json.gz"
+
+
+def canonical(payload):
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def disk_usage(path):
+    """Bytes allocated on disk under `path` (counts small-file block overhead)."""
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_blocks * 512
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class RawStore:
+    def __init__(self, root, level=6):
+        self.root = root
+        self.level = level
+        self.blob_dir = os.path.join(root, "blobs")
+        self.manifest_dir = os.path.join(root, "manifests")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        self._lock = FileLock(os.path.join(root, ".lock"))
+        self.stats = {"blobs_written": 0, "blobs_deduped": 0}
+
+    def blob_path(self, sha):
+        return os.path.join(self.blob_dir, sha[:2], sha + BLOB_SUFFIX)
+
+    # --- WRITE ---
+
+    def _put(self, payload):
+        """Stores `payload` if new; returns its SHA-256 (lock held)."""
+        data = canonical(payload)
+        sha = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(sha)
+        if os.path.exists(path):
+            self.stats["blobs_deduped"] += 1
+            return sha
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(gzip.compress(data, self.level, mtime=0))
+        os.replace(tmp, path)
+        self.stats["blobs_written"] += 1
+        return sha
+
+    def put_harvest(self, term, raw, when):
+        """Stores each source payload in `raw` and appends the harvest's manifest line."""
+        with self._lock:
+            sources = {name: (self._put(payload) if payload is not None else None) for name, payload in raw.items()}
+            record = {"term": term, "time": when, "sources": sources}
+            with open(self.manifest_path(when), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def manifest_path(self, when):
+        return os.path.join(self.manifest_dir, when[:10] + ".jsonl")
+
+    # --- READ ---
+
+    def get(self, sha):
+        with open(self.blob_path(sha), "rb") as f:
+            return json.loads(gzip.decompress(f.read()))
+
+    def load(self, record):
+        """The raw {source: payload} dict for a manifest record."""
+        return {name: (self.get(sha) if sha else None) for name, sha in record["sources"].items()}
+
+    def manifests(self):
+        """Yields every manifest record, oldest day first."""
+        for name in sorted(os.listdir(self.manifest_dir)):
+            if not name.endswith(".jsonl"):
+                continue
+            with open(os.path.join(self.manifest_dir, name), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # torn final line
+
+    def iter_blobs(self):
+        for dirpath, _, files in os.walk(self.blob_dir):
+            for name in files:
+                if name.endswith(BLOB_SUFFIX):
+                    yield name[:-len(BLOB_SUFFIX)], os.path.join(dirpath, name)
+
+    # --- MAINTENANCE ---
+
+    def gc(self, keep_days=None):
+        """Drops manifests older than `keep_days`, then every unreferenced blob; returns counts."""
+        result = {"manifests_removed": 0, "blobs_removed": 0, "bytes_freed": 0, "blobs_kept": 0}
+        with self._lock:
+            if keep_days is not None:
+                cutoff = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=keep_days)).date().isoformat()
+                for name in os.listdir(self.manifest_dir):
+                    if name.endswith(".jsonl") and name[:10] < cutoff:
+                        os.remove(os.path.join(self.manifest_dir, name))
+                        result["manifests_removed"] += 1
+            live = set()
+            for record in self.manifests():
+                live.update(sha for sha in record.get("sources", {}).values() if sha)
+            for sha, path in self.iter_blobs():
+                if sha in live:
+                    result["blobs_kept"] += 1
+                    continue
+                result["bytes_freed"] += os.path.getsize(path)
+                os.remove(path)
+                result["blobs_removed"] += 1
+        return result
+
+    def summary(self):
+        blobs = sum(1 for _ in self.iter_blobs())
+        harvests = sum(1 for _ in self.manifests())
+        return {"harvests": harvests, "blobs": blobs, "disk_bytes": disk_usage(self.blob_dir) + disk_usage(self.manifest_dir)}
+
+
+# --- BENCHMARK ---
+
+def bench(n):
+    """Disk usage of n harvests over cart889's 8 terms: legacy JSON files vs the store."""
+    from research_stub import payload
+    terms = ["hydrogen", "quantum computing", "oxide materials", "electron structure", "fusion",
+             "nanotechnology", "materials science", "signal processing"]
+    sources = ["wiki", "wikidata", "arxiv", "openalex", "crossref"]
+    raws = {t: {s: (payload(s, t)[1].decode() if s == "arxiv" else json.loads(payload(s, t)[1])) for s in sources}
+            for t in terms}
+    tmp = tempfile.mkdtemp(prefix="raw-store-bench-")
+    try:
+        legacy = os.path.join(tmp, "legacy")
+        os.makedirs(legacy)
+        start = time.perf_counter()
+        for i in range(n):
+            t = terms[i % len(terms)]
+            with open(os.path.join(legacy, f"{t.replace(' ', '_')}_{i:08d}.json"), "w") as f:
+                json.dump(raws[t], f, indent=2)
+        legacy_secs = time.perf_counter() - start
+
+        store = RawStore(os.path.join(tmp, "store"))
+        start = time.perf_counter()
+        for i in range(n):
+            t = terms[i % len(terms)]
+            store.put_harvest(t, raws[t], f"2025-01-01T00:00:{i:08d}")
+        store_secs = time.perf_counter() - start
+
+        legacy_bytes = disk_usage(legacy)
+        store_bytes = disk_usage(store.root)
+        print(f"harvests:        {n}")
+        print(f"legacy raw JSON: {legacy_bytes / 2**20:8.2f} MiB on disk, {legacy_secs * 1000 / n:.2f} ms/harvest")
+        print(f"raw store:       {store_bytes / 2**20:8.2f} MiB on disk, {store_secs * 1000 / n:.2f} ms/harvest "
+              f"({store.stats['blobs_written']} blobs, {store.stats['blobs_deduped']} deduplicated)")
+        print(f"reduction:       {legacy_bytes / max(store_bytes, 1):.0f}x")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed raw research store")
+    parser.add_argument("command", nargs="?", choices=["stats", "gc"])
+    parser.add_argument("root", nargs="?", help="store directory (cart889's RAW_DIR)")
+    parser.add_argument("--keep-days", type=int, default=None, help="gc: drop manifests older than this first")
+    parser.add_argument("--bench", type=int, metavar="N", help="compare disk usage over N harvests")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench)
+    elif args.command and args.root:
+        store = RawStore(args.root)
+        print(json.dumps(store.gc(args.keep_days) if args.command == "gc" else store.summary(), indent=2))
+    else:
+        parser.print_help()
+        sys.exit(1)
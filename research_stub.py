@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the five research APIs cart889 harvests from.
+
+Requests are routed by the real API host as the first path segment, which is
+how cart889 rewrites its URLs when INFINITY_API_BASE is set:
+
+  /en.wikipedia.org/api/rest_v1/page/summary/{term}
+  /www.wikidata.org/w/api.php
+  /export.arxiv.org/api/query
+  /api.openalex.org/works
+  /api.crossref.org/works
+
+Payloads are deterministic per query, so repeated terms produce identical
+responses as the real APIs mostly do. Each source has its own latency and can
+be made to fail: `fail_status` (e.g. 503) is returned for a `fail_rate`
+fraction of requests, with an optional Retry-After header. Every request is
+counted per source in `state.calls`.
+
+  python research_stub.py --port 8766 --latency crossref=0.5
+  INFINITY_API_BASE=http://127.0.0.1:8766 python cart889_infinity_research_article_engine.py
+
+  python research_stub.py --bench 40   # harvests/minute, sequential vs concurrent
+  python research_stub.py --bench 20 --fail crossref=1:503 --fail wiki=0.3:429:1
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import tempfile
+import argparse
+import threading
+import contextlib
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from atom_feed import synthetic_feed
+
+HOSTS = {
+    "en.wikipedia.org": "wiki",
+    "www.wikidata.org": "wikidata",
+    "export.arxiv.org": "arxiv",
+    "api.openalex.org": "openalex",
+    "api.crossref.org": "crossref",
+}
+DEFAULT_LATENCY = {"wiki": 0.05, "wikidata": 0.08, "arxiv": 0.30, "openalex": 0.15, "crossref": 0.40}
+
+
+class SourceState:
+    def __init__(self, latency=0.0, fail_rate=0.0, fail_status=503, retry_after=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+
+
+class StubState:
+    def __init__(self, latency=None):
+        latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.sources = {name: SourceState(latency.get(name, 0.0)) for name in HOSTS.values()}
+        self.calls = Counter()
+        self.failures = Counter()
+        self.lock = threading.Lock()
+
+
+def _seed(text):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def payload(source, term):
+    """Deterministic fake response for `source` and `term`: (content type, body bytes)."""
+    n = _seed(source + term) % 5 + 1
+    if source == "arxiv":
+        return "application/atom+xml", synthetic_feed(10).replace("bench", term).encode("utf-8")
+    if source == "wiki":
+        body = {"title": term, "extract": f"{term.capitalize()} is a subject of study. " * 20}
+    elif source == "wikidata":
+        body = {"search": [{"id": f"Q{_seed(term) % 10**6 + i}", "label": term, "description": f"{term} concept {i}"}
+                           for i in range(n)]}
+    elif source == "openalex":
+        body = {"meta": {"count": n * 100}, "results": [
+            {"id": f"https://openalex.org/W{_seed(term) + i}", "title": f"{term} study {i}",
+             "abstract_inverted_index": {w: [k] for k, w in enumerate(term.split() * 30)}} for i in range(10)]}
+    else:
+        body = {"status": "ok", "message": {"total-results": n * 1000, "items": [
+            {"DOI": f"10.0000/{_seed(term) + i}", "title": [f"On {term}, part {i}"],
+             "abstract": f"<jats:p>{term} " * 40 + "</jats:p>"} for i in range(10)]}}
+    return "application/json", json.dumps(body).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, ctype, data, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        host, _, path = url.path.lstrip("/").partition("/")
+        source = HOSTS.get(host)
+        if source is None:
+            return self.reply(404, "application/json", b'{"error": "unknown host"}')
+        cfg = self.state.sources[source]
+        with self.state.lock:
+            self.state.calls[source] += 1
+        if cfg.latency:
+            time.sleep(cfg.latency)
+        if cfg.fail_rate and random.random() < cfg.fail_rate:
+            with self.state.lock:
+                self.state.failures[source] += 1
+            headers = {"Retry-After": str(cfg.retry_after)} if cfg.retry_after is not None else {}
+            return self.reply(cfg.fail_status, "application/json", b'{"error": "unavailable"}', headers)
+        query = parse_qs(url.query)
+        if source == "wiki":
+            term = unquote(path.rsplit("/", 1)[-1])
+        else:
+            term = (query.get("search") or query.get("query") or query.get("search_query") or [""])[0]
+            term = term[4:] if term.startswith("all:") else term
+        ctype, data = payload(source, term)
+        self.reply(200, ctype, data)
+
+
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(host="127.0.0.1", port=0, latency=None, failures=None):
+    """
+    Builds a stub server (port 0 picks a free port); its state is `server.state`.
+    `failures` maps a source to (fail_rate, fail_status, retry_after).
+    """
+    state = StubState(latency)
+    for name, (rate, status, retry_after) in (failures or {}).items():
+        cfg = state.sources[name]
+        cfg.fail_rate, cfg.fail_status, cfg.retry_after = rate, status, retry_after
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = StubServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def start_stub(latency=None, failures=None):
+    """Starts a stub server on a free port in a background thread; returns (server, base_url)."""
+    server = make_server(latency=latency, failures=failures)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+# --- BENCHMARK ---
+
+def bench(n, latency, deadline, failures=None):
+    """Harvests/minute with sequential vs concurrent source fetches against the stub."""
+    server, url = start_stub(latency, failures)
+    tmp = tempfile.mkdtemp(prefix="cart889-bench-")
+    os.environ.update(INFINITY_API_BASE=url, INFINITY_REPO_DIR=tmp)
+    import cart889_infinity_research_article_engine as cart889
+
+    print(f"stub latency: {', '.join(f'{k}={v.latency}s' for k, v in server.state.sources.items())}")
+    print(f"{'mode':>10} {'harvests':>9} {'seconds':>8} {'per min':>8}")
+    for concurrent in (False, True):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(n):
+                cart889.harvest(cart889.TERMS[i % len(cart889.TERMS)], concurrent=concurrent, deadline=deadline)
+        secs = time.perf_counter() - start
+        print(f"{'concurrent' if concurrent else 'sequential':>10} {n:>9} {secs:>8.2f} {n * 60 / secs:>8.1f}")
+    print(cart889.source_report())
+    print(f"stub calls: {dict(server.state.calls)}  failures: {dict(server.state.failures)}")
+    server.shutdown()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _failures(values):
+    """SOURCE=RATE[:STATUS[:RETRY_AFTER]] -> {source: (rate, status, retry_after)}"""
+    out = {}
+    for item in values or []:
+        name, _, spec = item.partition("=")
+        parts = spec.split(":")
+        out[name] = (float(parts[0]), int(parts[1]) if len(parts) > 1 else 503,
+                     float(parts[2]) if len(parts) > 2 else None)
+    return out
+
+
+def _pairs(values):
+    out = {}
+    for item in values or []:
+        name, _, secs = item.partition("=")
+        out[name] = float(secs)
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for cart889's research APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", action="append", metavar="SOURCE=SECONDS", help="per-source latency")
+    parser.add_argument("--fail", action="append", metavar="SOURCE=RATE[:STATUS[:RETRY_AFTER]]",
+                        help="fail a fraction of a source's requests, e.g. crossref=1:503 or arxiv=0.5:429:2")
+    parser.add_argument("--bench", type=int, metavar="N", help="run N harvests sequentially and concurrently")
+    parser.add_argument("--deadline", type=float, default=30.0, help="per-harvest deadline for --bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, _pairs(args.latency), args.deadline, _failures(args.fail))
+        sys.exit(0)
+
+    server = make_server(args.host, args.port, _pairs(args.latency), _failures(args.fail))
+    print(f"--- research API stub listening on http://{args.host}:{args.port} ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
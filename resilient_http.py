@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Resilient GET client shared by the research engines.
+
+For every call, keyed by host (or by an explicit key such as a source name):
+- a circuit breaker: after `failure_threshold` consecutive failed calls the
+  key is skipped for `cooldown` seconds, then a single trial call decides
+  whether it closes again (half-open);
+- a token bucket: calls are spaced to the key's rate; a call that would have
+  to wait longer than `max_wait` (or the key's entry in `max_waits`) for a
+  token is skipped instead of queueing;
+- retries of connection errors and retryable statuses (429/5xx) with jittered
+  exponential backoff, honouring Retry-After (seconds or HTTP date). A
+  Retry-After longer than `max_retry_after` opens the breaker for that long.
+
+get() returns the final Response (possibly a non-2xx one) or None when the
+call was skipped or every attempt failed. Skips are reported to
+`on_skip(key, reason)` ("open" or "rate") on the calling thread, so a caller
+can tell a skipped call from an empty answer.
+"""
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class TokenBucket:
+    """`rate` tokens/second, up to `burst` saved; thread-safe reservations."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=None):
+        """Takes a token, sleeping until it is due; False if that would exceed `max_wait`."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return False
+            self._tokens -= 1  # may go negative: later callers queue behind this reservation
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, cooldown=300.0, on_change=None, name=None):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.on_change = on_change
+        self.name = name
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_until = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _set(self, state):
+        if state != self.state:
+            self.state = state
+            if self.on_change:
+                self.on_change(self.name, state, self.snapshot_locked())
+
+    def allow(self):
+        """True if a call may go ahead (closed, or the single half-open trial)."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() < self.opened_until:
+                    return False
+                self._set(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trial:
+                    return False
+                self._trial = True
+            return True
+
+    def cancel(self):
+        """The allowed call was not made; lets another half-open trial through."""
+        with self._lock:
+            self._trial = False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+            self._set(CLOSED)
+
+    def failure(self, open_for=None):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if open_for is not None or self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_until = time.time() + (open_for if open_for is not None else self.cooldown)
+                self._set(OPEN)
+
+    def snapshot_locked(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "retry_in": max(0.0, round(self.opened_until - time.time(), 1)) if self.state == OPEN else 0.0,
+        }
+
+    def snapshot(self):
+        with self._lock:
+            return self.snapshot_locked()
+
+
+def retry_after_seconds(value):
+    """Seconds from a Retry-After header value (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientClient:
+    def __init__(self, session=None, timeout=20, max_attempts=4, base_delay=1.0, max_delay=8.0,
+                 rates=None, default_rate=(10.0, 10), max_wait=10.0, max_waits=None, max_retry_after=60.0,
+                 failure_threshold=3, cooldown=300.0, on_breaker_change=None, on_skip=None):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self.max_wait = max_wait
+        self.max_waits = max_waits or {}
+        self.max_retry_after = max_retry_after
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.on_breaker_change = on_breaker_change
+        self.on_skip = on_skip
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "skipped_open": 0, "skipped_rate": 0, "failed": 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _skip(self, key, reason):
+        self._count("skipped_" + reason)
+        if self.on_skip:
+            self.on_skip(key, reason)
+
+    def _for(self, key):
+        with self._lock:
+            if key not in self._breakers:
+                rate, burst = self.rates.get(key, self.default_rate)
+                self._buckets[key] = TokenBucket(rate, burst)
+                self._breakers[key] = CircuitBreaker(self.failure_threshold, self.cooldown,
+                                                     self.on_breaker_change, name=key)
+            return self._buckets[key], self._breakers[key]
+
+    def backoff(self, attempt):
+        """Full-jitter exponential delay before retry number `attempt` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def get(self, url, params=None, key=None, **kwargs):
+        key = key or urlsplit(url).netloc
+        bucket, breaker = self._for(key)
+        self._count("calls")
+        if not breaker.allow():
+            self._skip(key, "open")
+            return None
+
+        max_wait = self.max_waits.get(key, self.max_wait)
+        response = None
+        for attempt in range(1, self.max_attempts + 1):
+            if not bucket.acquire(max_wait):
+                self._skip(key, "rate")
+                breaker.cancel()  # a skipped call is no verdict on the source
+                return response
+            self._count("attempts")
+            delay = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException:
+                response = None
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    breaker.success()
+                    return response
+                delay = retry_after_seconds(response.headers.get("Retry-After"))
+                if delay is not None and delay > self.max_retry_after:
+                    # The server asked us to stay away for longer than we would wait
+                    self._count("failed")
+                    breaker.failure(open_for=delay)
+                    return response
+            if attempt == self.max_attempts:
+                break
+            self._count("retries")
+            time.sleep(delay if delay is not None else self.backoff(attempt))
+        self._count("failed")
+        breaker.failure()
+        return response
+
+    def breaker_states(self):
+        """{key: {"state", "failures", "retry_in"}} for every key seen so far."""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {key: b.snapshot() for key, b in breakers.items()}
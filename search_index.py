@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Incremental full-text index over the engines' article trees
+(infinity_tokens/ from cart889, infinity_research/ from cart6000).
+
+On-disk layout (INDEX_DIR, default .search_index/):
+
+  files.jsonl         journal: path -> [size, mtime_ns], segment, doc number
+  seg_NNNNNN.post     postings: per term, [doc, tf] pairs then all positions (uint32)
+  seg_NNNNNN.terms    JSON {term: [offset, docs, positions]}
+  seg_NNNNNN.docs     JSON [path, ...]
+  seg_NNNNNN.lens     uint32 token count per doc
+
+update() scans the roots and indexes only files that are new or whose size or
+mtime changed, into new segments of up to SEGMENT_DOCS documents; a changed or
+removed file's old entry is simply no longer live. Small segments are merged
+once there are more than MAX_SMALL_SEGMENTS of them, and a segment less than
+half live is rewritten with its live documents. Queries are scored with
+BM25 over live documents; "quoted phrases" must match at consecutive
+positions. Only term dictionaries are loaded at open; postings are read from
+disk per query term.
+
+  python search_index.py update
+  python search_index.py search 'hydrogen "lattice transport"' -k 5
+  python search_index.py --bench 100000
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import heapq
+import shutil
+import random
+import argparse
+import tempfile
+from array import array
+from itertools import accumulate
+
+import numpy as np
+
+from filelock import FileLock
+
+INDEX_DIR = ".search_index"
+DEFAULT_ROOTS = ["infinity_tokens", "infinity_research"]
+SUFFIXES = (".txt", ".md")
+SEGMENT_DOCS = 20000
+MAX_SMALL_SEGMENTS = 8
+K1, B = 1.2, 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+PHRASE_RE = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(ANSI_RE.sub(" ", text).lower())
+
+
+class Segment:
+    def __init__(self, index_dir, seg_id):
+        self.id = seg_id
+        base = os.path.join(index_dir, f"seg_{seg_id:06d}")
+        with open(base + ".terms", encoding="utf-8") as f:
+            self.terms = json.load(f)
+        with open(base + ".docs", encoding="utf-8") as f:
+            self.docs = json.load(f)
+        self.lens = np.fromfile(base + ".lens", dtype=np.uint32)
+        self._post = open(base + ".post", "rb")
+
+    def close(self):
+        self._post.close()
+
+    def postings(self, term):
+        """(docs, tfs, positions) arrays for `term`, or None."""
+        entry = self.terms.get(term)
+        if entry is None:
+            return None
+        offset, n, npos = entry
+        self._post.seek(offset)
+        data = np.frombuffer(self._post.read(4 * (2 * n + npos)), dtype=np.uint32)
+        return data[0:2 * n:2], data[1:2 * n:2], data[2 * n:]
+
+    @staticmethod
+    def write(index_dir, seg_id, docs, lens, postings):
+        """Writes a segment; `postings` maps term -> (interleaved [doc, tf] uint32s, positions uint32s)."""
+        base = os.path.join(index_dir, f"seg_{seg_id:06d}")
+        terms = {}
+        with open(base + ".post.tmp", "wb") as f:
+            for term in sorted(postings):
+                pairs, positions = postings[term]
+                terms[term] = [f.tell(), len(pairs) // 2, len(positions)]
+                pairs.tofile(f)
+                positions.tofile(f)
+        np.asarray(lens, dtype=np.uint32).tofile(base + ".lens.tmp")
+        with open(base + ".docs.tmp", "w", encoding="utf-8") as f:
+            json.dump(docs, f)
+        with open(base + ".terms.tmp", "w", encoding="utf-8") as f:
+            json.dump(terms, f, separators=(",", ":"))
+        for ext in (".post", ".lens", ".docs", ".terms"):
+            os.replace(base + ext + ".tmp", base + ext)
+
+
+class SegmentBuilder:
+    def __init__(self):
+        self.docs = []
+        self.lens = []
+        self.postings = {}
+
+    def add(self, path, text):
+        tokens = tokenize(text)
+        doc = len(self.docs)
+        self.docs.append(path)
+        self.lens.append(len(tokens))
+        positions = {}
+        for pos, tok in enumerate(tokens):
+            p = positions.get(tok)
+            if p is None:
+                positions[tok] = [pos]
+            else:
+                p.append(pos)
+        postings = self.postings
+        for tok, p in positions.items():
+            entry = postings.get(tok)
+            if entry is None:
+                entry = postings[tok] = (array("I"), array("I"))
+            entry[0].append(doc)
+            entry[0].append(len(p))
+            entry[1].extend(p)
+        return doc
+
+
+class SearchIndex:
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.journal = os.path.join(index_dir, "files.jsonl")
+        self._lock = FileLock(os.path.join(index_dir, ".lock"))
+        self.files = {}       # path -> [sig, seg, doc]
+        self.segments = {}    # seg id -> Segment
+        self.live = {}        # seg id -> bool array of live docs
+        self._journal_lines = 0
+        self._load()
+
+    # --- STATE ---
+
+    def _load(self):
+        self.files = {}
+        self._journal_lines = 0
+        if os.path.exists(self.journal):
+            with open(self.journal, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line
+                    self._journal_lines += 1
+                    if rec.get("seg") is None:
+                        self.files.pop(rec["path"], None)
+                    else:
+                        self.files[rec["path"]] = [rec["sig"], rec["seg"], rec["doc"]]
+        used = {seg for _, seg, _ in self.files.values()}
+        for seg in self.segments.values():
+            seg.close()
+        self.segments = {}
+        for seg_id in sorted(used):
+            self.segments[seg_id] = Segment(self.index_dir, seg_id)
+        self._rebuild_live()
+
+    def _rebuild_live(self):
+        self.live = {seg_id: np.zeros(len(seg.docs), dtype=bool) for seg_id, seg in self.segments.items()}
+        for _, seg_id, doc in self.files.values():
+            self.live[seg_id][doc] = True
+        self.n_docs = len(self.files)
+        total = sum(int(seg.lens[self.live[seg_id]].sum()) for seg_id, seg in self.segments.items())
+        self.avgdl = total / self.n_docs if self.n_docs else 0.0
+
+    def _segment_ids_on_disk(self):
+        ids = set()
+        for name in os.listdir(self.index_dir):
+            m = re.match(r"seg_(\d+)\.", name)
+            if m:
+                ids.add(int(m.group(1)))
+        return ids
+
+    def _next_segment_id(self):
+        return max(self._segment_ids_on_disk() | set(self.segments) | {0}) + 1
+
+    def _append(self, records):
+        with open(self.journal, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+        self._journal_lines += len(records)
+
+    def _compact_journal(self):
+        tmp = self.journal + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for path, (sig, seg, doc) in self.files.items():
+                f.write(json.dumps({"path": path, "sig": sig, "seg": seg, "doc": doc}, separators=(",", ":")) + "\n")
+        os.replace(tmp, self.journal)
+        self._journal_lines = len(self.files)
+
+    def _drop_unused_segments(self):
+        used = {seg for _, seg, _ in self.files.values()}
+        for seg_id in self._segment_ids_on_disk() - used:
+            if seg_id in self.segments:
+                self.segments.pop(seg_id).close()
+            for ext in (".post", ".lens", ".docs", ".terms"):
+                try:
+                    os.remove(os.path.join(self.index_dir, f"seg_{seg_id:06d}{ext}"))
+                except FileNotFoundError:
+                    pass
+
+    # --- INDEXING ---
+
+    def _flush(self, builder, sigs):
+        seg_id = self._next_segment_id()
+        Segment.write(self.index_dir, seg_id, builder.docs, builder.lens, builder.postings)
+        records = []
+        for doc, path in enumerate(builder.docs):
+            self.files[path] = [sigs[path], seg_id, doc]
+            records.append({"path": path, "sig": sigs[path], "seg": seg_id, "doc": doc})
+        self._append(records)  # the segment becomes live here
+        self.segments[seg_id] = Segment(self.index_dir, seg_id)
+
+    def update(self, roots=DEFAULT_ROOTS):
+        """Indexes new and changed files under `roots`, forgets removed ones; returns counts."""
+        start = time.perf_counter()
+        stats = {"scanned": 0, "indexed": 0, "removed": 0, "bytes": 0, "segments_merged": 0}
+        with self._lock:
+            self._load()  # pick up another writer's changes
+            seen = set()
+            changed = []
+            for root in roots:
+                for dirpath, _, names in os.walk(root):
+                    for name in names:
+                        if not name.endswith(SUFFIXES):
+                            continue
+                        path = os.path.join(dirpath, name)
+                        try:
+                            st = os.stat(path)
+                        except FileNotFoundError:
+                            continue
+                        sig = [st.st_size, st.st_mtime_ns]
+                        seen.add(path)
+                        cur = self.files.get(path)
+                        if cur is None or cur[0] != sig:
+                            changed.append((path, sig))
+            stats["scanned"] = len(seen)
+
+            prefixes = tuple(os.path.join(r, "") for r in roots)
+            removed = [p for p in self.files if p.startswith(prefixes) and p not in seen]
+            for p in removed:
+                del self.files[p]
+            if removed:
+                self._append([{"path": p, "seg": None} for p in removed])
+            stats["removed"] = len(removed)
+
+            builder, sigs = SegmentBuilder(), {}
+            for path, sig in changed:
+                try:
+                    with open(path, encoding="utf-8", errors="replace") as f:
+                        text = f.read()
+                except FileNotFoundError:
+                    continue
+                builder.add(path, text)
+                sigs[path] = sig
+                stats["bytes"] += len(text)
+                if len(builder.docs) >= SEGMENT_DOCS:
+                    self._flush(builder, sigs)
+                    builder, sigs = SegmentBuilder(), {}
+            if builder.docs:
+                self._flush(builder, sigs)
+            stats["indexed"] = len(changed)
+
+            self._rebuild_live()
+            small = [s for s, seg in self.segments.items() if len(seg.docs) < SEGMENT_DOCS]
+            sparse = [s for s in self.segments if s not in small and 2 * self.live[s].sum() < len(self.live[s])]
+            if len(small) > MAX_SMALL_SEGMENTS or sparse:
+                self._merge(small + sparse)
+                stats["segments_merged"] = len(small + sparse)
+            if self._journal_lines > 2 * max(len(self.files), 1000):
+                self._compact_journal()
+            self._drop_unused_segments()
+            self._rebuild_live()
+        stats["seconds"] = time.perf_counter() - start
+        stats["segments"] = len(self.segments)
+        stats["docs"] = self.n_docs
+        return stats
+
+    def _merge(self, seg_ids):
+        """Rewrites the live documents of `seg_ids` as one segment (lock held)."""
+        self._rebuild_live()
+        remap, docs, lens = {}, [], []
+        for seg_id in seg_ids:
+            seg, live = self.segments[seg_id], self.live[seg_id]
+            new = np.full(len(seg.docs), -1, dtype=np.int64)
+            kept = np.flatnonzero(live)
+            new[kept] = np.arange(len(docs), len(docs) + len(kept))
+            remap[seg_id] = new
+            docs.extend(seg.docs[d] for d in kept)
+            lens.extend(seg.lens[kept].tolist())
+        vocab = set()
+        for seg_id in seg_ids:
+            vocab.update(self.segments[seg_id].terms)
+        postings = {}
+        for term in vocab:
+            pairs, positions = [], []
+            for seg_id in seg_ids:
+                got = self.segments[seg_id].postings(term)
+                if got is None:
+                    continue
+                d, tf, pos = got
+                new = remap[seg_id][d]
+                keep = new >= 0
+                if not keep.any():
+                    continue
+                pairs.append(np.column_stack((new[keep], tf[keep])).astype(np.uint32).ravel())
+                positions.append(pos[np.repeat(keep, tf)])
+            if pairs:
+                postings[term] = (np.concatenate(pairs), np.concatenate(positions))
+        seg_id = self._next_segment_id()
+        Segment.write(self.index_dir, seg_id, docs, lens, postings)
+        records = []
+        for doc, path in enumerate(docs):
+            self.files[path][1:] = [seg_id, doc]
+            records.append({"path": path, "sig": self.files[path][0], "seg": seg_id, "doc": doc})
+        self._append(records)
+        self.segments[seg_id] = Segment(self.index_dir, seg_id)
+
+    # --- QUERIES ---
+
+    def search(self, query, k=10):
+        """Top-k [(score, path)] for `query` by BM25; quoted phrases must match exactly."""
+        phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = list(dict.fromkeys(tokenize(PHRASE_RE.sub(" ", query)) + [t for p in phrases for t in p]))
+        if not terms or not self.n_docs:
+            return []
+
+        found = {}   # (seg_id, term) -> (docs, tfs, positions), live docs only
+        df = dict.fromkeys(terms, 0)
+        for seg_id, seg in self.segments.items():
+            live = self.live[seg_id]
+            for term in terms:
+                got = seg.postings(term)
+                if got is None:
+                    continue
+                docs, tfs, positions = got
+                keep = live[docs]
+                if not keep.all():
+                    docs, tfs, positions = docs[keep], tfs[keep], positions[np.repeat(keep, tfs)]
+                starts = np.cumsum(tfs, dtype=np.int64) - tfs if phrases else None
+                found[(seg_id, term)] = (docs, tfs, positions, starts)
+                df[term] += len(docs)
+
+        candidates = []   # (score, seg_id, doc)
+        for seg_id, seg in self.segments.items():
+            scores = None
+            for term in terms:
+                got = found.get((seg_id, term))
+                if got is None:
+                    continue
+                docs, tfs = got[0], got[1]
+                idf = math.log(1 + (self.n_docs - df[term] + 0.5) / (df[term] + 0.5))
+                tf = tfs.astype(np.float64)
+                norm = K1 * (1 - B + B * seg.lens[docs] / self.avgdl)
+                if scores is None:
+                    scores = np.zeros(len(seg.docs))
+                scores[docs] += idf * tf * (K1 + 1) / (tf + norm)
+            if scores is None:
+                continue
+            hits = np.flatnonzero(scores)
+            if phrases:
+                # each phrase needs all its terms; positions are checked lazily below
+                for phrase in phrases:
+                    for term in phrase:
+                        got = found.get((seg_id, term))
+                        hits = np.intersect1d(hits, got[0], assume_unique=True) if got is not None else hits[:0]
+                order = hits[np.argsort(-scores[hits], kind="stable")]
+            elif len(hits) > k:
+                top = hits[np.argpartition(-scores[hits], k)[:k]]
+                order = top[np.argsort(-scores[top], kind="stable")]
+            else:
+                order = hits[np.argsort(-scores[hits], kind="stable")]
+            taken = 0
+            for doc in order:
+                if phrases and not all(self._has_phrase(found, seg_id, doc, p) for p in phrases):
+                    continue
+                candidates.append((float(scores[doc]), seg_id, int(doc)))
+                taken += 1
+                if taken == k:
+                    break
+        top = heapq.nlargest(k, candidates, key=lambda c: c[0])
+        return [(score, self.segments[seg_id].docs[doc]) for score, seg_id, doc in top]
+
+    @staticmethod
+    def _doc_positions(found, seg_id, term, doc):
+        docs, tfs, positions, starts = found[(seg_id, term)]
+        i = int(np.searchsorted(docs, doc))
+        return positions[starts[i]:starts[i] + tfs[i]].astype(np.int64)
+
+    def _has_phrase(self, found, seg_id, doc, phrase):
+        starts = None
+        for i, term in enumerate(phrase):
+            pos = self._doc_positions(found, seg_id, term, doc) - i
+            starts = pos if starts is None else np.intersect1d(starts, pos)
+            if not len(starts):
+                return False
+        return True
+
+    def stats(self):
+        return {"docs": self.n_docs, "segments": len(self.segments), "avgdl": round(self.avgdl, 1),
+                "terms": sum(len(s.terms) for s in self.segments.values())}
+
+
+# --- BENCHMARK ---
+
+def synthetic_corpus(root, n, seed=1):
+    """n articles shaped like the engines' output: half cart6000 papers, half cart889 articles."""
+    from paper_render import paper_meta, render_plain
+    rng = random.Random(seed)
+    try:
+        with open("CART250_TOPIC_MATRIX.json") as f:
+            topics = json.load(f)["terms"]
+    except (OSError, ValueError, KeyError):
+        topics = ["hydrogen", "quantum gate", "ion field", "gold lattice", "scalar bloom", "infra band"]
+    vocab = [f"w{i}" for i in range(50000)]
+    cum = list(accumulate(1 / (i + 1) for i in range(len(vocab))))  # Zipf-like word frequencies
+    research = os.path.join(root, "infinity_research")
+    tokens = os.path.join(root, "infinity_tokens")
+    os.makedirs(research, exist_ok=True)
+    os.makedirs(tokens, exist_ok=True)
+    for i in range(n):
+        term = rng.choice(topics)
+        words = " ".join(rng.choices(vocab, cum_weights=cum, k=120))
+        if i % 2 == 0:
+            text = render_plain(paper_meta(term, f"{term} study {i}", words, now=f"2025-01-01T00:00:{i:08d}"))
+            path = os.path.join(research, f"deep_{i:06d}_{term.replace(' ', '_')}.txt")
+        else:
+            text = (f"# ∞ Infinity Research Article — {term.capitalize()}\n### Token #{i}\n---\n"
+                    f"## Executive Summary\n{words}\n## Main Scientific Findings\n### arXiv Papers\n"
+                    f"**{term} effects**\n{' '.join(rng.choices(vocab, cum_weights=cum, k=80))}\n")
+            path = os.path.join(tokens, f"{i:08d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def bench(n, queries):
+    tmp = tempfile.mkdtemp(prefix="search-bench-")
+    try:
+        start = time.perf_counter()
+        synthetic_corpus(tmp, n)
+        print(f"corpus:   {n} articles generated in {time.perf_counter() - start:.1f}s")
+        roots = [os.path.join(tmp, r) for r in DEFAULT_ROOTS]
+        index = SearchIndex(os.path.join(tmp, "index"))
+
+        st = index.update(roots)
+        print(f"build:    {st['indexed']} docs, {st['bytes'] / 2**20:.0f} MiB in {st['seconds']:.1f}s "
+              f"({st['indexed'] / st['seconds']:,.0f} docs/s, {st['bytes'] / 2**20 / st['seconds']:.1f} MiB/s), "
+              f"{st['segments']} segments")
+        st = index.update(roots)
+        print(f"no-op:    rescan of {st['scanned']} files in {st['seconds']:.2f}s")
+        changed = sorted(os.listdir(roots[1]))[:100]
+        for name in changed:
+            with open(os.path.join(roots[1], name), "a") as f:
+                f.write("\nappended hydrogen note\n")
+        st = index.update(roots)
+        print(f"update:   {st['indexed']} changed docs in {st['seconds']:.2f}s")
+
+        start = time.perf_counter()
+        index = SearchIndex(os.path.join(tmp, "index"))
+        print(f"open:     {(time.perf_counter() - start) * 1000:.0f} ms ({index.stats()})")
+        samples = {
+            "rare term": ["w40000", "w31337", "w45678"],
+            "mid term": ["w500", "w1234", "w2000"],
+            "common term": ["w1", "w2", "hydrogen"],
+            "multi term": ["w40000 w500 lattice", "quantum gate w1234", "ion field w2"],
+            "boilerplate": ["infinity", "research"],
+            "phrase": ['"quantum gate"', '"energy gradient transport"'],
+        }
+        print(f"{'query':>12} {'p50 ms':>8} {'max ms':>8} {'hits':>6}")
+        for label, qs in samples.items():
+            times, hits = [], 0
+            for _ in range(queries):
+                for q in qs:
+                    t = time.perf_counter()
+                    hits = len(index.search(q, 10))
+                    times.append((time.perf_counter() - t) * 1000)
+            times.sort()
+            print(f"{label:>12} {times[len(times) // 2]:>8.2f} {times[-1]:>8.2f} {hits:>6}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text index over infinity_tokens/ and infinity_research/")
+    parser.add_argument("command", nargs="?", choices=["update", "search", "stats"])
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--index", default=INDEX_DIR)
+    parser.add_argument("--roots", nargs="+", default=DEFAULT_ROOTS)
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark on an N-article synthetic corpus")
+    parser.add_argument("--queries", type=int, default=5, help="repetitions per benchmark query")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, args.queries)
+    elif args.command == "update":
+        print(json.dumps(SearchIndex(args.index).update(args.roots)))
+    elif args.command == "search" and args.query:
+        index = SearchIndex(args.index)
+        start = time.perf_counter()
+        hits = index.search(args.query, args.k)
+        ms = (time.perf_counter() - start) * 1000
+        for score, path in hits:
+            print(f"{score:8.3f}  {path}")
+        print(f"{len(hits)} hits in {ms:.1f} ms", file=sys.stderr)
+    elif args.command == "stats":
+        print(json.dumps(SearchIndex(args.index).stats()))
+    else:
+        parser.print_help()
+        sys.exit(1)
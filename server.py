@@ -1,18 +1,31 @@
 import os
 import json
 import base64
-from flask import Flask, jsonify, request
+import hashlib
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import requests # Need to install: pip install requests
+from logstore import LogStore
+from github_client import GitHubClient, GitHubError, RATE_LIMIT, is_retryable
+from blob_cache import BlobShaCache
+from commit_queue import CommitQueue
+from snapshot_store import WriteBehindStore
+import metrics
 
 # --- APPLICATION SETUP ---
 app = Flask(__name__)
 # IMPORTANT: This allows your frontend (index.html) to talk to the server
 CORS(app) 
+metrics.instrument_app(app)
 
 # --- DATA FILE & CONFIG FILE NAMES ---
 DATA_FILE = 'system_data.json'
 CONFIG_FILE = 'config.json'
+LOG_DIR = 'bot_logs'
+BLOB_CACHE_FILE = 'blob_cache.jsonl'
+JOB_JOURNAL_FILE = 'commit_jobs.jsonl'
+COMMIT_WORKERS = int(os.environ.get('COMMIT_WORKERS', '4'))
+SNAPSHOT_FLUSH_INTERVAL = float(os.environ.get('SNAPSHOT_FLUSH_INTERVAL', '1.0'))
+METRICS_DIR = os.environ.get('METRICS_DIR', '.metrics')  # per-worker metric files (--serve)
 
 # --- CONFIG RETRIEVAL (Reads from local file for persistence) ---
 
@@ -29,82 +42,186 @@ def load_config():
 GITHUB_PAT = load_config()
 
 # --- DATA PERSISTENCE ---
+# bot_logs live in the append-only LOG_STORE; system_data.json is only a
+# compacted snapshot of the remaining (small) system state. The snapshot is
+# held in memory and written behind (coalesced, atomic replace) by SNAPSHOT.
 
+LOG_STORE = LogStore(LOG_DIR)
+SNAPSHOT = WriteBehindStore(
+    DATA_FILE,
+    {"status_info": "Infinity Vector Persistence Layer"},
+    interval=SNAPSHOT_FLUSH_INTERVAL,
+    shared=True
+)
+
+PERSISTENCE_SECONDS = metrics.histogram('persistence_duration_seconds', 'Persistence call latency', ('op',))
+metrics.gauge('bot_log_entries', 'Entries in the bot log store', function=lambda: len(LOG_STORE))
+
+def load_snapshot():
+    """Returns a copy of the in-memory system snapshot."""
+    return SNAPSHOT.get()
+
+@metrics.timed(PERSISTENCE_SECONDS, op='load_data')
 def load_data():
-    """Loads system data or creates a new structure."""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                # Return a default structure if the file doesn't exist or is corrupt
-                return {"bot_logs": [], "status_info": "Infinity Vector Persistence Layer"}
-    else:
-        # Create an empty structure if the file does not exist
-        return {"bot_logs": [], "status_info": "Infinity Vector Persistence Layer"}
+    """Loads system data, with the newest bot logs served from the log store's tail."""
+    data = load_snapshot()
+    data.pop('bot_logs', None)
+    data['bot_logs'] = LOG_STORE.tail()
+    return data
 
+@metrics.timed(PERSISTENCE_SECONDS, op='save_data')
 def save_data(data):
-    """Saves the current system data to the JSON file."""
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
+    """Updates the snapshot (flushed in the background); bot_logs are never written here."""
+    SNAPSHOT.update({k: v for k, v in data.items() if k != 'bot_logs'})
+
+def migrate_legacy_logs():
+    """Moves a bot_logs array left in system_data.json into the log store."""
+    snapshot = load_snapshot()
+    legacy = snapshot.get('bot_logs')
+    if not legacy:
+        return 0
+    imported = LOG_STORE.import_legacy(legacy)
+    save_data(snapshot)
+    SNAPSHOT.flush()
+    return imported
+
+migrate_legacy_logs()
 
 # --- HELPER FUNCTIONS ---
 
+@metrics.timed(PERSISTENCE_SECONDS, op='log_append')
 def log_bot_activity(bot_id, duty, status="Success", error_message=""):
-    """Adds a timestamped entry to the bot_logs."""
-    data = load_data()
-    
+    """Appends a timestamped entry to the bot log store."""
     # Use the server's time for consistency
     import datetime
-    timestamp = datetime.datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
+    now = datetime.datetime.now()
+    timestamp = now.strftime("%d/%m/%Y, %H:%M:%S")
 
     log_entry = {
         "timestamp": timestamp,
+        "ts": now.timestamp(),
         "bot_id": bot_id,
         "duty": duty,
         "status": status,
         "error": error_message
     }
-    
-    # Prepend the new log entry
-    data['bot_logs'].insert(0, log_entry) 
-    save_data(data)
+
+    LOG_STORE.append(log_entry)
+
+def encode_cursor(seq):
+    """Wraps a log sequence number in an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(json.dumps({"before": seq}).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Returns the sequence number inside a cursor; raises ValueError if malformed."""
+    try:
+        seq = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))["before"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(seq, int) or seq < 0:
+        raise ValueError("Invalid cursor")
+    return seq
+
+def parse_time(value):
+    """Parses epoch seconds or an ISO 8601 timestamp into epoch seconds."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    import datetime
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+
+def not_modified(etag):
+    """Returns a 304 response if the client already holds `etag`, else None."""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+# Last known blob SHA per (owner, repo, path), so repeat commits skip the GET
+BLOB_CACHE = BlobShaCache(BLOB_CACHE_FILE)
 
 def commit_to_github(owner, repo, path, html_content, message):
     """
     Commits a new file or updates an existing one on GitHub.
     Uses the GITHUB_PAT for authentication.
+    Returns None without any network call if the content is already committed.
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-    headers = {
-        "Authorization": f"token {GITHUB_PAT}",
-        "Content-Type": "application/json",
-        "X-GitHub-Api-Version": "2022-11-28"
-    }
+    return GitHubClient(GITHUB_PAT).commit_file(owner, repo, path, html_content, message, cache=BLOB_CACHE)
 
-    content_bytes = html_content.encode('utf-8')
-    encoded_content = base64.b64encode(content_bytes).decode('utf-8')
+def commit_batch_to_github(owner, repo, files, message, branch=None):
+    """
+    Commits many files as one commit through the Git Data API.
+    Uses the GITHUB_PAT for authentication.
+    """
+    return GitHubClient(GITHUB_PAT).commit_files(owner, repo, files, message, branch, cache=BLOB_CACHE)
 
-    payload = {
-        "message": message,
-        "content": encoded_content
-    }
+# --- COMMIT JOBS (run by COMMIT_QUEUE's worker threads) ---
 
-    # First, try to get the existing file SHA if the file exists
-    sha = None
+def run_commit_html(params):
+    """Commits one file; returns the job result or raises GitHubError."""
+    path = params['path']
+    response = commit_to_github(params['owner'], params['repo'], path, params['html'], params['message'])
+
+    if response is None:
+        log_bot_activity(params['bot_id'], params['duty'], "Success", f"File unchanged: {path}")
+        return {"message": f"{path} is already up to date", "skipped": True}
+    if response.status_code in [200, 201]:
+        log_bot_activity(params['bot_id'], params['duty'], "Success", f"File updated: {path}")
+        return {"message": f"Successfully committed {path}", "github_response": response.json()}
     try:
-        if GITHUB_PAT:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                sha = response.json().get('sha')
-                payload['sha'] = sha
-    except requests.exceptions.RequestException as e:
-        print(f"Error checking file existence: {e}")
-        # Continue without SHA if there's an error (will create new file)
-
-    # Now, commit the file
-    response = requests.put(url, headers=headers, data=json.dumps(payload))
-    return response
+        error_message = response.json().get('message', response.text)
+    except ValueError:
+        error_message = response.text
+    raise GitHubError(response.status_code, error_message)
+
+def run_commit_batch(params):
+    """Commits many files as one commit; returns the job result or raises GitHubError."""
+    files = params['files']
+    result = commit_batch_to_github(params['owner'], params['repo'], files, params['message'], params.get('branch'))
+
+    if result['commit_sha'] is None:
+        log_bot_activity(params['bot_id'], params['duty'], "Success", f"All {len(files)} files unchanged")
+        return {"message": "All files are already up to date", "github_response": result}
+
+    committed = len(result['files'])
+    log_bot_activity(params['bot_id'], params['duty'], "Success", f"{committed} files committed: {result['commit_sha']}")
+    return {"message": f"Successfully committed {committed} files", "github_response": result}
+
+COMMIT_JOBS = {
+    'commit_html': run_commit_html,
+    'commit_batch': run_commit_batch
+}
+
+def run_commit_job(job):
+    return COMMIT_JOBS[job['kind']](job['params'])
+
+def commit_job_failed(job, exc):
+    params = job['params']
+    message = f"GitHub API Failed: {exc.message}" if isinstance(exc, GitHubError) else str(exc)
+    log_bot_activity(params.get('bot_id', 'Server'), params.get('duty', 'Commit Process'), "Error", message)
+
+# Jobs journaled on disk survive restarts; workers start on the first submit
+# (or from __main__ / gunicorn's post_worker_init), never in the debug
+# reloader's watcher process. Across processes only the elected owner runs
+# jobs, so BLOB_CACHE has a single writer.
+COMMIT_QUEUE = CommitQueue(
+    JOB_JOURNAL_FILE,
+    run_commit_job,
+    workers=COMMIT_WORKERS,
+    is_retryable=is_retryable,
+    pause=RATE_LIMIT.delay,
+    on_failure=commit_job_failed,
+    on_takeover=BLOB_CACHE.reload,
+    status=lambda: {"blob_cache": BLOB_CACHE.snapshot(), "github_rate_limit": RATE_LIMIT.snapshot()}
+)
+metrics.gauge('commit_jobs_queued', 'Commit jobs waiting for a worker', function=lambda: COMMIT_QUEUE.stats()['queued'])
 
 # --- FLASK API ROUTES ---
 
@@ -114,23 +231,105 @@ def get_status():
     # Use the server's time for consistency
     import datetime
     server_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # The blob cache and rate limit are only touched by the commit queue's
+    # owner; every worker reports the owner's published view of them
+    owner = COMMIT_QUEUE.owner_status() or {}
     return jsonify({
         "status": "ready",
         "server_time": server_time,
-        "pat_loaded": GITHUB_PAT is not None
+        "pat_loaded": GITHUB_PAT is not None,
+        "blob_cache": owner.get("blob_cache", BLOB_CACHE.snapshot()),
+        "snapshot": SNAPSHOT.snapshot_stats(),
+        "commit_jobs": COMMIT_QUEUE.stats(),
+        "github_rate_limit": owner.get("github_rate_limit", RATE_LIMIT.snapshot())
     })
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request, GitHub and persistence metrics."""
+    if not metrics.ENABLED:
+        return jsonify({"success": False, "error": "Metrics are disabled (METRICS_ENABLED=0)."}), 404
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
 # --- NEW ROUTE TO PULL BOT LOGS (This is now fixed) ---
 @app.route('/api/data', methods=['GET'])
 def get_data():
-    """Returns all data, including bot logs, for the frontend."""
-    # load_data() ensures the system_data.json is loaded correctly
-    data = load_data() 
-    return jsonify(data)
+    """Returns the system snapshot plus the newest bot logs for the frontend."""
+    # SNAPSHOT.tag() first picks up a snapshot another worker replaced
+    etag = hashlib.sha1(f"{len(LOG_STORE)}|{SNAPSHOT.tag()}|{request.query_string}".encode('utf-8')).hexdigest()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    data = load_data()
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        data['bot_logs'] = data['bot_logs'][:max(0, limit)]
+    response = jsonify(data)
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/logs', methods=['GET'])
+def get_logs():
+    """
+    Returns one newest-first page of bot logs.
+
+    Query parameters: limit (default 50, max 1000), cursor (from next_cursor),
+    bot_id, duty, status, since and until (epoch seconds or ISO 8601).
+    """
+    try:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 1000)
+        cursor = request.args.get('cursor')
+        before = decode_cursor(cursor) if cursor else None
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    etag = hashlib.sha1(f"{len(LOG_STORE)}|{request.query_string}".encode('utf-8')).hexdigest()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    entries, next_before = LOG_STORE.query(
+        limit=limit,
+        before=before,
+        since=since,
+        until=until,
+        bot_id=request.args.get('bot_id'),
+        duty=request.args.get('duty'),
+        status=request.args.get('status'),
+    )
+    response = jsonify({
+        "bot_logs": entries,
+        "next_cursor": encode_cursor(next_before) if next_before is not None else None,
+        "total": len(LOG_STORE)
+    })
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Returns the status (and, once finished, the result) of a queued commit job."""
+    job = COMMIT_QUEUE.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown job id"}), 404
+    return jsonify(job)
+
+def queued_response(job_id):
+    """202 with the job id, or the finished job if the caller asked to ?wait=<seconds>."""
+    wait = request.args.get('wait', type=float)
+    if wait:
+        job = COMMIT_QUEUE.wait(job_id, timeout=min(wait, 60))
+        # None: the job's record was already trimmed from the journal; it was
+        # accepted all the same, so answer as if we had not waited
+        if job is not None and job['status'] in ('succeeded', 'failed'):
+            return jsonify(dict(job, success=job['status'] == 'succeeded', job_id=job_id))
+    return jsonify({"success": True, "job_id": job_id, "status_url": f"/api/jobs/{job_id}"}), 202
 
 @app.route('/api/bot/commit_html', methods=['POST'])
 def bot_commit_html():
-    """Endpoint for the bot to commit HTML content to GitHub."""
+    """Endpoint for the bot to queue an HTML commit to GitHub; returns a job id."""
     if not GITHUB_PAT:
         log_bot_activity("Server", "Commit Attempt (Simulation)", "Error", "GITHUB_PAT not loaded.")
         return jsonify({"success": False, "error": "Server is in simulation mode (GITHUB_PAT not set)."}), 403
@@ -149,30 +348,117 @@ def bot_commit_html():
             log_bot_activity(bot_id, duty, "Error", "Missing required parameters (owner, repo, path, html).")
             return jsonify({"success": False, "error": "Missing required parameters"}), 400
 
-        # Perform the GitHub commit
-        response = commit_to_github(owner, repo, path, html_content, message)
-        
-        if response.status_code in [200, 201]:
-            log_bot_activity(bot_id, duty, "Success", f"File updated: {path}")
-            return jsonify({"success": True, "message": f"Successfully committed {path}", "github_response": response.json()})
-        else:
-            error_message = response.json().get('message', response.text)
-            log_bot_activity(bot_id, duty, "Error", f"GitHub API Failed: {error_message}")
-            return jsonify({"success": False, "error": f"GitHub API failed: {error_message}"}), response.status_code
+        job_id = COMMIT_QUEUE.submit('commit_html', (owner, repo), {
+            "owner": owner, "repo": repo, "path": path, "html": html_content,
+            "message": message, "bot_id": bot_id, "duty": duty
+        })
+        return queued_response(job_id)
 
     except Exception as e:
         log_bot_activity("Server", "Commit Process", "Error", str(e))
         return jsonify({"success": False, "error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@app.route('/api/bot/commit_batch', methods=['POST'])
+def bot_commit_batch():
+    """Endpoint for the bot to queue many HTML files as a single GitHub commit; returns a job id."""
+    if not GITHUB_PAT:
+        log_bot_activity("Server", "Batch Commit Attempt (Simulation)", "Error", "GITHUB_PAT not loaded.")
+        return jsonify({"success": False, "error": "Server is in simulation mode (GITHUB_PAT not set)."}), 403
+
+    try:
+        data = request.json
+        owner = data.get('owner')
+        repo = data.get('repo')
+        files = data.get('files')
+        branch = data.get('branch')
+        message = data.get('message', f"Bot commit: Updated {len(files or [])} files")
+        bot_id = data.get('bot_id', 'Cleaner Bot UI')
+        duty = data.get('duty', 'HTML Batch Update')
+
+        if not all([owner, repo, files]) or not isinstance(files, list) or \
+                not all(isinstance(f, dict) and f.get('path') and f.get('html') is not None for f in files):
+            log_bot_activity(bot_id, duty, "Error", "Missing required parameters (owner, repo, files[path, html]).")
+            return jsonify({"success": False, "error": "Missing required parameters"}), 400
+
+        job_id = COMMIT_QUEUE.submit('commit_batch', (owner, repo), {
+            "owner": owner, "repo": repo, "files": [{"path": f['path'], "html": f['html']} for f in files],
+            "branch": branch, "message": message, "bot_id": bot_id, "duty": duty
+        })
+        return queued_response(job_id)
+
+    except Exception as e:
+        log_bot_activity("Server", "Batch Commit Process", "Error", str(e))
+        return jsonify({"success": False, "error": f"An unexpected error occurred: {str(e)}"}), 500
+
 # --- SERVER LAUNCH ---
 
+def serve(host, port, workers, threads):
+    """
+    Production mode: runs the app under gunicorn with `workers` processes of
+    `threads` threads each.
+
+    Workers do not inherit the app from this process; each imports its own
+    copy of this module, so every worker has its own stores, locks and
+    threads. They share state only through the data files, which are safe
+    for concurrent processes: flock-serialised log appends that every worker
+    tails, an flock-serialised snapshot, and a commit queue journal whose
+    workers run in exactly one elected process. Metrics are shared the same
+    way: every worker dumps its counters and histograms to METRICS_DIR, and
+    /metrics on any worker serves the sum over all of them.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("--- ERROR: --serve needs gunicorn (pip install gunicorn). ---")
+        raise SystemExit(1)
+
+    import importlib
+
+    def post_worker_init(worker):
+        importlib.import_module('server').COMMIT_QUEUE.start()
+
+    class ServerApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('post_worker_init', post_worker_init)
+
+        def load(self):
+            return importlib.import_module('server').app
+
+    if metrics.ENABLED:
+        metrics.multiprocess(METRICS_DIR)
+    print(f"--- Serving on {host}:{port} with {workers} worker(s) x {threads} thread(s) ---")
+    ServerApplication().run()
+
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Infinity Vector bot server")
+    parser.add_argument('--serve', action='store_true', help="run under gunicorn instead of the debug server")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=4, help="worker processes (--serve)")
+    parser.add_argument('--threads', type=int, default=8, help="threads per worker (--serve)")
+    args = parser.parse_args()
+
     if GITHUB_PAT:
         print("--- INFO: GITHUB_PAT successfully loaded for potential API calls. ---")
     else:
         print("--- WARNING: GITHUB_PAT NOT loaded. Server running in SIMULATION mode. ---")
 
-    print("--- Starting Flask Server on Port 5000 ---")
+    if args.serve:
+        serve(args.host, args.port, args.workers, args.threads)
+        raise SystemExit(0)
+
+    # With debug=True this module also runs in the reloader's watcher process;
+    # only the serving child (WERKZEUG_RUN_MAIN) resumes journaled jobs.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        COMMIT_QUEUE.start()
+
+    print(f"--- Starting Flask Server on Port {args.port} ---")
     
     # Running on 0.0.0.0 ensures it is accessible from localhost and external devices on your network
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host=args.host, port=args.port, debug=True)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Append-only ledger of used research terms, shared by concurrent engines.
+
+The ledger is a text file with one term per line. Startup reads it into a set
+in one pass; adding a term appends one line instead of rewriting the whole
+file. Appends take an flock on `<path>.lock`, and each engine first catches up
+on lines that other engines have appended, so `add()` is an atomic
+claim: only one engine ever gets True for a given term. Concurrent engines can
+leave duplicate lines, so the file is compacted (temp file + rename) once it
+holds more than `compact_ratio` lines per distinct term.
+
+A legacy JSON list (the old deep_terms.json) is imported the first time the
+ledger is created.
+
+  python term_ledger.py --bench 1000000
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+
+from filelock import FileLock
+
+
+def _clean(term):
+    return " ".join(str(term).split())
+
+
+class TermLedger:
+    """Set of used terms backed by an append-only, lock-protected file."""
+
+    def __init__(self, path, legacy_json=None, compact_ratio=1.5):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self._lock = FileLock(path + ".lock")
+        self._terms = set()
+        self._lines = 0
+        self._pos = 0
+        self._ino = None
+        with self._lock:
+            if not os.path.exists(path) and legacy_json and os.path.exists(legacy_json):
+                self._import_legacy(legacy_json)
+            self._catch_up()
+            if self._lines > self.compact_ratio * max(len(self._terms), 1000):
+                self._compact()
+
+    def _import_legacy(self, legacy_json):
+        try:
+            with open(legacy_json, encoding="utf-8") as f:
+                terms = json.load(f)
+        except (OSError, ValueError):
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for term in dict.fromkeys(_clean(t) for t in terms):
+                if term:
+                    f.write(term + "\n")
+        os.replace(tmp, self.path)
+
+    def _catch_up(self):
+        """Reads lines appended since the last call (file lock held)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._ino:
+            # First read, or another engine compacted: re-read from the start
+            self._ino = st.st_ino
+            self._pos = 0
+            self._lines = 0
+            self._terms = set()
+        if st.st_size <= self._pos:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._pos)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # ignore a torn final line
+        lines = data[:end].decode("utf-8", "replace").splitlines()
+        self._terms.update(lines)
+        self._terms.discard("")
+        self._lines += len(lines)
+        self._pos += end
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for term in self._terms:
+                f.write(term + "\n")
+        os.replace(tmp, self.path)
+        st = os.stat(self.path)
+        self._ino, self._pos, self._lines = st.st_ino, st.st_size, len(self._terms)
+
+    # --- API ---
+
+    def add(self, term):
+        """Records `term`; False if it was already used (by any engine)."""
+        term = _clean(term)
+        if not term or term in self._terms:
+            return False
+        line = (term + "\n").encode("utf-8")
+        with self._lock:
+            self._catch_up()
+            if term in self._terms:
+                return False
+            with open(self.path, "ab") as f:
+                f.write(line)
+            self._ino = os.stat(self.path).st_ino
+            self._pos += len(line)
+            self._lines += 1
+            self._terms.add(term)
+            if self._lines > self.compact_ratio * max(len(self._terms), 1000):
+                self._compact()
+        return True
+
+    def refresh(self):
+        """Picks up terms other engines have added."""
+        with self._lock:
+            self._catch_up()
+
+    def __contains__(self, term):
+        return _clean(term) in self._terms
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __iter__(self):
+        return iter(set(self._terms))
+
+
+# --- BENCHMARK ---
+
+def bench(n, adds):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "terms.ledger")
+        with open(path, "w") as f:
+            for i in range(n):
+                f.write(f"term {i} quantum lattice\n")
+        legacy = os.path.join(tmp, "terms.json")
+        terms = [f"term {i} quantum lattice" for i in range(n)]
+        with open(legacy, "w") as f:
+            json.dump(terms, f)
+
+        start = time.perf_counter()
+        ledger = TermLedger(path)
+        startup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(adds):
+            ledger.add(f"new term {i}")
+        per_add = (time.perf_counter() - start) / adds
+
+        start = time.perf_counter()
+        with open(legacy) as f:
+            used = set(json.load(f))
+        legacy_startup = time.perf_counter() - start
+
+        start = time.perf_counter()
+        used.add("one more")
+        json.dump(list(used), open(legacy, "w"))
+        legacy_add = time.perf_counter() - start
+
+        print(f"terms:               {n}")
+        print(f"ledger startup:      {startup * 1000:.0f} ms")
+        print(f"ledger add:          {per_add * 1e6:.1f} us/term ({adds} adds)")
+        print(f"legacy json startup: {legacy_startup * 1000:.0f} ms")
+        print(f"legacy json add:     {legacy_add * 1000:.0f} ms/term (full rewrite)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append-only term ledger")
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark startup on an N-term ledger")
+    parser.add_argument("--adds", type=int, default=10000)
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.bench, args.adds)
+    else:
+        parser.print_help()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Persisted priority queue of research terms, shared by the engines.
+
+Every candidate term carries (uses, last_used) and is due at
+
+  last_used + reuse_penalty * uses
+
+so never-used terms (due 0) come first in the order they were discovered, and
+a used term comes back once it is stale, later the more often it has been
+used. next() pops the most-due term from a heap (O(log n), no network) and
+records the use; heap entries made stale by later uses are skipped lazily.
+
+State lives in a JSON-lines journal, one event per line:
+
+  {"t": "plasma", "e": "add"}
+  {"t": "plasma", "e": "use", "at": 1735689600.0}
+  {"t": "plasma", "e": "exp", "kids": ["ion", "charge"]}
+
+Writes take an flock on `<path>.lock` after catching up on lines other
+engines appended (by offset, like term_ledger.py), so a pop is an atomic claim
+across processes. The journal is compacted to one line per term once it holds
+more than `compact_ratio` lines per term.
+
+Expansions (related terms found in a term's research) are recorded once per
+term with record_expansion() and the new terms queued; `expanded(term)` tells
+an engine it need not compute them again.
+
+  python term_scheduler.py show term_queue.jsonl -n 20
+  python term_scheduler.py --bench 100000
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+import tempfile
+
+from filelock import FileLock
+
+
+def _clean(term):
+    return " ".join(str(term).split())
+
+
+def load_seeds(*paths):
+    """Terms from CART250_TOPIC_MATRIX.json-style files ({"terms": [...]}) or JSON lists; missing files are skipped."""
+    out = []
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict):
+            data = data.get("terms", [])
+        out.extend(t for t in data if isinstance(t, str))
+    return out
+
+
+class TermScheduler:
+    def __init__(self, path, seeds=(), reuse_penalty=3600.0, compact_ratio=2.0, clock=time.time):
+        self.path = path
+        self.reuse_penalty = reuse_penalty
+        self.compact_ratio = compact_ratio
+        self.clock = clock
+        self._lock = FileLock(path + ".lock")
+        self._reset()
+        with self._lock:
+            self._catch_up()
+            new = [t for t in dict.fromkeys(_clean(s) for s in seeds) if t and t not in self._state]
+            self._write([{"t": t, "e": "add"} for t in new])
+            if self._lines > self.compact_ratio * max(len(self._state), 1000):
+                self._compact()
+
+    def _reset(self):
+        self._state = {}      # term -> [uses, last_used, expanded, seq]
+        self._heap = []       # (due, seq, term); stale entries skipped on pop
+        self._lines = 0
+        self._pos = 0
+        self._ino = None
+
+    def _due(self, st):
+        return st[1] + self.reuse_penalty * st[0]
+
+    def _push(self, term):
+        st = self._state[term]
+        heapq.heappush(self._heap, (self._due(st), st[3], term))
+
+    # --- JOURNAL ---
+
+    def _apply(self, rec):
+        term = rec.get("t")
+        if not term:
+            return
+        st = self._state.get(term)
+        if st is None:
+            st = self._state[term] = [0, 0.0, False, len(self._state)]
+            fresh = True
+        else:
+            fresh = False
+        kind = rec.get("e")
+        if kind == "use":
+            st[0] += 1
+            st[1] = max(st[1], rec.get("at", 0.0))
+        elif kind == "exp":
+            st[2] = True
+            for kid in rec.get("kids", ()):
+                if kid not in self._state:
+                    self._state[kid] = [0, 0.0, False, len(self._state)]
+                    self._push(kid)
+        elif kind == "state":
+            st[0], st[1], st[2] = rec.get("uses", 0), rec.get("last", 0.0), rec.get("exp", False)
+        if fresh or kind in ("use", "state"):
+            self._push(term)
+
+    def _catch_up(self):
+        """Applies lines appended since the last call (file lock held)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._ino:
+            # First read, or another engine compacted: replay from the start
+            self._reset()
+            self._ino = st.st_ino
+        if st.st_size <= self._pos:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._pos)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # ignore a torn final line
+        for line in data[:end].splitlines():
+            try:
+                self._apply(json.loads(line))
+            except ValueError:
+                continue
+            self._lines += 1
+        self._pos += end
+        if len(self._heap) > 2 * len(self._state) + 1000:
+            self._heap = [(self._due(s), s[3], t) for t, s in self._state.items()]
+            heapq.heapify(self._heap)
+
+    def _write(self, records):
+        """Appends and applies `records` (file lock held, caught up)."""
+        if not records:
+            return
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self._ino = os.stat(self.path).st_ino
+        self._pos += len(data)
+        self._lines += len(records)
+        for r in records:
+            self._apply(r)
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for term, (uses, last, exp, _) in sorted(self._state.items(), key=lambda kv: kv[1][3]):
+                f.write(json.dumps({"t": term, "e": "state", "uses": uses, "last": last, "exp": exp},
+                                   ensure_ascii=False) + "\n")
+        os.replace(tmp, self.path)
+        st = os.stat(self.path)
+        self._ino, self._pos, self._lines = st.st_ino, st.st_size, len(self._state)
+
+    # --- API ---
+
+    def next(self, claim=None, fresh_only=False):
+        """
+        Pops and records the most-due term. With `claim`, a term for which
+        claim(term) is False is recorded as used and skipped. With
+        `fresh_only`, returns None instead of a term that was used before.
+        """
+        with self._lock:
+            self._catch_up()
+            while self._heap:
+                due, seq, term = self._heap[0]
+                st = self._state[term]
+                if due != self._due(st):
+                    heapq.heappop(self._heap)  # superseded by a later use
+                    continue
+                if fresh_only and st[0]:
+                    return None
+                heapq.heappop(self._heap)
+                self._write([{"t": term, "e": "use", "at": self.clock()}])
+                if claim is None or claim(term):
+                    if self._lines > self.compact_ratio * max(len(self._state), 1000):
+                        self._compact()
+                    return term
+            return None
+
+    def add(self, term):
+        """Queues `term` as a new candidate; False if it is already known."""
+        term = _clean(term)
+        if not term:
+            return False
+        with self._lock:
+            self._catch_up()
+            if term in self._state:
+                return False
+            self._write([{"t": term, "e": "add"}])
+        return True
+
+    def expanded(self, term):
+        st = self._state.get(_clean(term))
+        return bool(st and st[2])
+
+    def record_expansion(self, term, kids):
+        """Caches `term`'s expansion and queues the new terms in it; returns how many were new."""
+        term = _clean(term)
+        with self._lock:
+            self._catch_up()
+            new = [k for k in dict.fromkeys(_clean(k) for k in kids) if k and k not in self._state and k != term]
+            self._write([{"t": term, "e": "exp", "kids": new}])
+        return len(new)
+
+    def refresh(self):
+        """Picks up what other engines have queued and used."""
+        with self._lock:
+            self._catch_up()
+
+    def peek(self, n=10):
+        """The `n` most-due terms as (term, uses, last_used), without using them."""
+        with self._lock:
+            live = [(self._due(st), st[3], term) for term, st in self._state.items()]
+        return [(term, self._state[term][0], self._state[term][1]) for _, _, term in heapq.nsmallest(n, live)]
+
+    def stats(self):
+        with self._lock:
+            used = sum(1 for st in self._state.values() if st[0])
+            return {"terms": len(self._state), "used": used, "fresh": len(self._state) - used,
+                    "expanded": sum(1 for st in self._state.values() if st[2]),
+                    "journal_lines": self._lines, "heap": len(self._heap)}
+
+    def __contains__(self, term):
+        return _clean(term) in self._state
+
+    def __len__(self):
+        return len(self._state)
+
+
+# --- BENCHMARK ---
+
+def bench(n, picks):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "term_queue.jsonl")
+        seeds = [f"term {i} quantum lattice" for i in range(n)]
+
+        start = time.perf_counter()
+        sched = TermScheduler(path, seeds=seeds)
+        seed_secs = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sched = TermScheduler(path, seeds=seeds)
+        startup = time.perf_counter() - start
+
+        times = []
+        for i in range(picks):
+            t = time.perf_counter()
+            term = sched.next()
+            times.append(time.perf_counter() - t)
+            if i % 10 == 0:
+                sched.record_expansion(term, [f"{term} kid {j}" for j in range(3)])
+        times.sort()
+
+        # the old cart6000 scan: one expand() (an arXiv query) per theme until an unused candidate
+        used = set(seeds[:picks])
+        themes = seeds[:picks + 1]
+        legacy_calls = next(i + 1 for i, t in enumerate(themes) if t not in used)
+
+        print(f"terms:                {n} (+{sched.stats()['terms'] - n} from expansions)")
+        print(f"first seeding:        {seed_secs * 1000:.0f} ms")
+        print(f"startup (replay):     {startup * 1000:.0f} ms")
+        print(f"next():               p50 {times[len(times) // 2] * 1e6:.0f} us, "
+              f"p99 {times[int(len(times) * 0.99)] * 1e6:.0f} us over {picks} picks, 0 network calls")
+        print(f"legacy THEMES scan:   {legacy_calls} expand() calls for pick #{picks + 1}")
+        print(f"state:                {sched.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persisted research term scheduler")
+    parser.add_argument("command", nargs="?", choices=["show"])
+    parser.add_argument("path", nargs="?", help="scheduler journal (e.g. term_queue.jsonl)")
+    parser.add_argument("-n", type=int, default=20, help="show: how many upcoming terms")
+    parser.add_argument("--bench", type=int, metavar="N", help="benchmark an N-term queue")
+    parser.add_argument("--picks", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench, args.picks)
+    elif args.command == "show" and args.path:
+        sched = TermScheduler(args.path)
+        print(json.dumps(sched.stats()))
+        for term, uses, last in sched.peek(args.n):
+            print(f"{uses:>5}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(last)) if last else 'never':>16}  {term}")
+    else:
+        parser.print_help()
+        sys.exit(1)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Crash-safe token number allocator shared by concurrent cart889 processes.
+
+The counter file ({"count": N}, the format cart889 always used) holds the
+high-water mark: every number below N has been handed to some process. A
+process reserves numbers in blocks: under an flock on `<path>.lock` it reads
+N, durably writes N + block (temp file, fsync, rename) and then hands out
+N .. N+block-1 from memory. The file is touched once per block instead of once
+per token, and since a number is reserved before anything is written with
+it, a crash can only leave gaps, never hand out a number twice.
+
+  python token_counter.py --stress --procs 8 --per-proc 5000 --block 100
+"""
+import os
+import sys
+import json
+import time
+import signal
+import random
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+from filelock import FileLock
+
+
+class TokenCounter:
+    def __init__(self, path, block=1000):
+        self.path = path
+        self.block = block
+        self._file_lock = FileLock(path + ".lock")
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0      # exclusive end of this process's current block
+        self._pid = os.getpid()
+        self.reservations = 0
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return int(data["count"])
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError, TypeError):
+            # A corrupt file would restart numbering at 0 and reissue numbers: refuse
+            raise RuntimeError(f"{self.path} is unreadable; fix it before issuing tokens")
+
+    def _write(self, count):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"count": count}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        # make the rename itself durable
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _reserve(self):
+        with self._file_lock:
+            start = self._read()
+            self._write(start + self.block)
+        self._next, self._end = start, start + self.block
+        self.reservations += 1
+
+    def next(self):
+        """A token number no other call, thread or process will ever get."""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # A forked child must not reuse the parent's block
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            if self._next >= self._end:
+                self._reserve()
+            n = self._next
+            self._next += 1
+            return n
+
+    def peek(self):
+        """The persisted high-water mark (numbers handed out or reserved so far)."""
+        with self._file_lock:
+            return self._read()
+
+
+# --- STRESS TEST ---
+
+def _worker(path, block, count, out_path, crash_after):
+    counter = TokenCounter(path, block)
+    with open(out_path, "a") as out:
+        for i in range(count):
+            if crash_after is not None and i == crash_after:
+                out.flush()
+                os.kill(os.getpid(), signal.SIGKILL)
+            out.write(f"{counter.next()}\n")
+
+
+def stress(procs, per_proc, block, crashes):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "infinity_token_counter.json")
+        with open(path, "w") as f:
+            json.dump({"count": 0}, f)
+        start = time.perf_counter()
+        jobs = []
+        for p in range(procs):
+            # The first `crashes` workers are SIGKILLed part-way, then a replacement runs
+            crash_after = random.randint(1, per_proc - 1) if p < crashes else None
+            jobs.append(multiprocessing.Process(target=_worker, args=(path, block, per_proc,
+                                                                       os.path.join(tmp, f"out{p}"), crash_after)))
+        for j in jobs:
+            j.start()
+        for j in jobs:
+            j.join()
+        for p in range(crashes):
+            j = multiprocessing.Process(target=_worker, args=(path, block, per_proc, os.path.join(tmp, f"out{p}.r"), None))
+            j.start()
+            j.join()
+        secs = time.perf_counter() - start
+
+        issued = []
+        for name in os.listdir(tmp):
+            if name.startswith("out"):
+                with open(os.path.join(tmp, name)) as f:
+                    issued.extend(int(line) for line in f if line.strip())
+        high = TokenCounter(path).peek()
+        dupes = len(issued) - len(set(issued))
+        print(f"processes:   {procs} (+{crashes} SIGKILLed and restarted), block {block}")
+        print(f"issued:      {len(issued)} tokens in {secs:.2f}s ({len(issued) / secs:,.0f}/s)")
+        print(f"duplicates:  {dupes}")
+        print(f"high-water:  {high} (gaps from unused block remainders: {high - len(issued)})")
+        ok = dupes == 0 and max(issued) < high
+        print("PASS" if ok else "FAIL")
+        return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Block-reserving token counter")
+    parser.add_argument("--stress", action="store_true", help="run the multi-process stress test")
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--per-proc", type=int, default=5000)
+    parser.add_argument("--block", type=int, default=100)
+    parser.add_argument("--crashes", type=int, default=2, help="workers to SIGKILL mid-run")
+    args = parser.parse_args()
+    if args.stress:
+        sys.exit(0 if stress(args.procs, args.per_proc, args.block, min(args.crashes, args.procs)) else 1)
+    parser.print_help()